@@ -0,0 +1,81 @@
+"""
+Bulk and sorted ResizableArray operations against the per-element path.
+
+    python -m benchmarks.bench_array
+"""
+import time
+
+import numpy as np
+
+from pytrading.container import ResizableArray
+
+
+def bench(name, fn, repeat=5):
+    fn()
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{name:<40} {best * 1e3:10.3f} ms")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(n=100_000):
+    values = np.random.default_rng(0).random(n)
+    sorted_values = np.sort(values)
+
+    def append_loop():
+        arr = ResizableArray(np.float64, 16)
+        for v in values:
+            arr.append(v)
+
+    def extend_bulk():
+        arr = ResizableArray(np.float64, 16)
+        arr.extend(values)
+
+    def insert_loop():
+        arr = ResizableArray(np.float64, 16)
+        for v in values[:10_000]:
+            arr.insert(0, v)
+
+    def insert_range_bulk():
+        arr = ResizableArray(np.float64, 16)
+        arr.extend(values[:10])
+        arr.insert_range(0, values[:10_000])
+
+    def delete_loop():
+        arr = ResizableArray(np.float64, n)
+        arr.extend(values)
+        for _ in range(10_000):
+            arr.delete(0)
+
+    def delete_range_bulk():
+        arr = ResizableArray(np.float64, n)
+        arr.extend(values)
+        arr.delete_range(0, 10_000)
+
+    def sorted_insert_loop():
+        arr = ResizableArray(np.float64, 16)
+        for v in values[:10_000]:
+            arr.sorted_insert(v)
+
+    def sorted_extend_bulk():
+        arr = ResizableArray(np.float64, 16)
+        arr.extend(sorted_values[::2])
+        arr.sorted_extend(values[:10_000])
+
+    bench(f"append x{n}", append_loop)
+    bench(f"extend({n})", extend_bulk)
+    bench("insert(0) x10000", insert_loop)
+    bench("insert_range(0, 10000)", insert_range_bulk)
+    bench("delete(0) x10000", delete_loop)
+    bench("delete_range(0, 10000)", delete_range_bulk)
+    bench("sorted_insert x10000", sorted_insert_loop)
+    bench("sorted_extend(10000)", sorted_extend_bulk)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Decoding cost per websocket message: stdlib json and gzip against the pytrading.network.decoder decoders,
+and raw frames handed straight to a LOB parser.
+
+Frames are recorded payloads, one JSON message per line, or generated depth updates when no file is given.
+
+    python -m benchmarks.bench_decode [--frames recorded.jsonl] [--count 10000]
+"""
+import argparse
+import gzip
+import json
+import random
+import time
+import zlib
+from typing import List
+
+from pytrading.md.lob import LOB
+from pytrading.network.decoder import DeflateDecoder, GzipDecoder, JsonDecoder, RawDecoder
+
+
+def bench(name, fn, calls, repeat=5):
+    fn()
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{name:<40} {best / calls * 1e9:10.1f} ns/msg")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def depth_updates(count: int, levels: int = 20, seed: int = 7) -> List[bytes]:
+    rnd = random.Random(seed)
+    frames = []
+    for i in range(count):
+        bids = [[f"{100.0 - rnd.randint(0, 500) * 0.01:.2f}", f"{rnd.random() * 10:.6f}"] for _ in range(levels)]
+        asks = [[f"{100.01 + rnd.randint(0, 500) * 0.01:.2f}", f"{rnd.random() * 10:.6f}"] for _ in range(levels)]
+        frames.append(json.dumps({"e": "depthUpdate", "E": 1700000000000 + i, "s": "BTCUSDT", "U": i, "u": i,
+                                  "b": bids, "a": asks}, separators=(",", ":")).encode())
+    return frames
+
+
+def load_frames(file_path: str, count: int) -> List[bytes]:
+    with open(file_path, "rb") as f:
+        frames = [line.rstrip(b"\r\n") for line in f if line.strip()]
+    return frames[:count]
+
+
+def deflate(frame: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-15)
+    return compressor.compress(frame) + compressor.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", help="recorded frames, one JSON message per line")
+    parser.add_argument("--count", type=int, default=10000)
+    args = parser.parse_args(argv)
+    frames = load_frames(args.frames, args.count) if args.frames else depth_updates(args.count)
+    n = len(frames)
+    texts = [frame.decode() for frame in frames]
+    gzipped = [gzip.compress(frame) for frame in frames]
+    deflated = [deflate(frame) for frame in frames]
+    compressor = zlib.compressobj(wbits=-15)
+    streamed = [compressor.compress(frame) + compressor.flush(zlib.Z_SYNC_FLUSH) for frame in frames]
+    print(f"{n} frames, {sum(map(len, frames)) / n:.0f} bytes per frame, "
+          f"{sum(map(len, gzipped)) / n:.0f} gzipped, {sum(map(len, streamed)) / n:.0f} streamed deflate")
+
+    json_decoder = JsonDecoder()
+    gzip_decoder = GzipDecoder()
+    deflate_decoder = DeflateDecoder()
+    stream_decoder = DeflateDecoder(streaming=True)
+    lob = LOB("BTCUSDT")
+    raw_decoder = RawDecoder(lob.delta_update_json)
+    gzip_raw_decoder = GzipDecoder(RawDecoder(lob.delta_update_json))
+
+    def stdlib_json():
+        for text in texts:
+            json.loads(text)
+
+    def orjson_text():
+        for text in texts:
+            json_decoder.decode(text)
+
+    def orjson_bytes():
+        for frame in frames:
+            json_decoder.decode(frame)
+
+    def stdlib_gzip_json():
+        for frame in gzipped:
+            json.loads(gzip.decompress(frame))
+
+    def gzip_orjson():
+        for frame in gzipped:
+            gzip_decoder.decode(frame)
+
+    def deflate_orjson():
+        for frame in deflated:
+            deflate_decoder.decode(frame)
+
+    def streaming_deflate_orjson():
+        stream_decoder.reset()
+        for frame in streamed:
+            stream_decoder.decode(frame)
+
+    def decode_then_lob():
+        for frame in frames:
+            message = json_decoder.decode(frame)
+            lob.bid_delta_update_raw(message["b"])
+            lob.ask_delta_update_raw(message["a"])
+
+    def raw_lob():
+        for frame in frames:
+            raw_decoder.decode(frame)
+
+    def gzip_raw_lob():
+        for frame in gzipped:
+            gzip_raw_decoder.decode(frame)
+
+    bench("json.loads", stdlib_json, n)
+    bench("JsonDecoder (orjson) str", orjson_text, n)
+    bench("JsonDecoder (orjson) bytes", orjson_bytes, n)
+    bench("gzip.decompress + json.loads", stdlib_gzip_json, n)
+    bench("GzipDecoder", gzip_orjson, n)
+    bench("DeflateDecoder", deflate_orjson, n)
+    bench("DeflateDecoder streaming", streaming_deflate_orjson, n)
+    if frames[0].lstrip().startswith(b"{") and b'"b"' in frames[0]:
+        bench("JsonDecoder + LOB delta_update_raw", decode_then_lob, n)
+        bench("RawDecoder(LOB.delta_update_json)", raw_lob, n)
+        bench("GzipDecoder(RawDecoder(LOB))", gzip_raw_lob, n)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,422 @@
+"""
+Latency percentiles and throughput of the IPC paths and loopback transports between two processes:
+the mmap ring buffer (RecordCacheWriter/Reader), LMDB, asyncio TCP and UDP (TCPServer/UDPServer)
+and multiprocessing pipes as a baseline.
+
+Every message carries the sender's CLOCK_MONOTONIC time, the echo process adds its receive time, so one round
+trip gives both the round-trip and the one-way latency. Throughput streams messages with a bounded window in flight.
+
+    python -m benchmarks.bench_ipc [--count 20000] [--only ring,pipe,tcp,udp,lmdb] [--output report.json]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import struct
+import sys
+import tempfile
+import time
+from asyncio import DatagramProtocol, Protocol
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from pytrading.ipc.lmdb import LMDB, LMDBMode
+from pytrading.ipc.mmap import MMapFile, MMapMode, MMapRecord
+from pytrading.ipc.record_cache import RingBuffer, RecordCacheReader, RecordCacheWriter
+from pytrading.network.tcp import TCPServer
+from pytrading.network.udp import UDPServer
+
+MESSAGE = struct.Struct("<qq")  # sender time, echo receive time
+STOP = -1
+now = time.monotonic_ns
+# polls before a spinning reader yields the cpu, spinning only helps when the peer has a core of its own
+SPINS = 1000 if (os.cpu_count() or 1) > 1 else 0
+
+
+def summary(name: str, metric: str, latencies: Optional[np.ndarray] = None, count: int = 0,
+            elapsed_ns: int = 0, lost: Optional[int] = None) -> Dict:
+    result = {"name": name, "metric": metric}
+    if lost is not None:
+        result["lost"] = lost
+    if latencies is not None and len(latencies):
+        p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9])
+        result.update(count=len(latencies), mean_ns=float(latencies.mean()), p50_ns=float(p50), p99_ns=float(p99),
+                      p999_ns=float(p999), max_ns=int(latencies.max()))
+    if elapsed_ns:
+        result.update(count=count, elapsed_ns=elapsed_ns, msgs_per_s=count / elapsed_ns * 1e9)
+    return result
+
+
+def pad(data: bytes, size: int) -> bytes:
+    return data + bytes(size - len(data))
+
+
+def free_port(kind=socket.SOCK_STREAM) -> int:
+    with socket.socket(socket.AF_INET, kind) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+# Synchronous transports, opened once per process after the fork
+
+class RingTransport:
+    name = "mmap_ring"
+
+    def __init__(self, directory: str, message_size: int, ring_size: int = 4096):
+        self.file_path = os.path.join(directory, "bench_ring.bin")
+        self.message_size = message_size
+        self.ring_size = ring_size
+        self.itemsize = (message_size + 8) * ring_size + 8
+        # created and prefaulted once before the fork, the file pages are then in the page cache for both sides
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+        MMapFile(self.file_path, MMapMode.WRITE, 2 * self.itemsize, populate=True).release()
+        self.buf = np.zeros(message_size, dtype=np.uint8)
+
+    def open(self, side: str):
+        self.mf = MMapFile(self.file_path, MMapMode.WRITE)
+        rings = [RingBuffer(self.ring_size, self.message_size, MMapRecord(self.mf, i * self.itemsize, self.itemsize,
+                                                                          MMapMode.WRITE)) for i in range(2)]
+        out, back = rings if side == "client" else rings[::-1]
+        self.writer = RecordCacheWriter(out)
+        # the file is new, the reader starts at sequence 0 and misses nothing written before it opened
+        self.reader = RecordCacheReader(back)
+
+    def send(self, data: bytes):
+        self.writer.write(data)
+
+    def poll(self) -> Optional[bytes]:
+        if self.reader.read_next_into(self.buf):
+            return self.buf.tobytes()
+        return None
+
+    def recv(self) -> bytes:
+        # spins, then yields the cpu so that both processes make progress when they share a core
+        n = 0
+        while True:
+            data = self.poll()
+            if data is not None:
+                return data
+            n += 1
+            if n > SPINS:
+                os.sched_yield()
+
+
+class PipeTransport:
+    name = "multiprocessing_pipe"
+
+    def __init__(self, directory: str, message_size: int):
+        self.conns = multiprocessing.Pipe(duplex=True)
+
+    def open(self, side: str):
+        self.conn = self.conns[0] if side == "client" else self.conns[1]
+
+    def send(self, data: bytes):
+        self.conn.send_bytes(data)
+
+    def poll(self) -> Optional[bytes]:
+        return self.conn.recv_bytes() if self.conn.poll() else None
+
+    def recv(self) -> bytes:
+        return self.conn.recv_bytes()
+
+
+def serve_sync(transport):
+    transport.open("server")
+    while True:
+        data = transport.recv()
+        sent = MESSAGE.unpack_from(data)[0]
+        if sent == STOP:
+            return
+        transport.send(pad(MESSAGE.pack(sent, now()), len(data)))
+
+
+def bench_sync(transport, count: int, window: int, message_size: int) -> List[Dict]:
+    process = multiprocessing.Process(target=serve_sync, args=(transport,))
+    process.start()
+    transport.open("client")
+    rtt = np.empty(count, dtype=np.int64)
+    one_way = np.empty(count, dtype=np.int64)
+    for i in range(-min(count, 1000), count):
+        sent = now()
+        transport.send(pad(MESSAGE.pack(sent, 0), message_size))
+        received = MESSAGE.unpack_from(transport.recv())[1]
+        if i >= 0:
+            rtt[i] = now() - sent
+            one_way[i] = received - sent
+    in_flight = done = 0
+    start = now()
+    while done < count:
+        if in_flight < window and done + in_flight < count:
+            transport.send(pad(MESSAGE.pack(now(), 0), message_size))
+            in_flight += 1
+        elif transport.poll() is not None:
+            in_flight -= 1
+            done += 1
+        elif not SPINS:
+            os.sched_yield()
+    elapsed = now() - start
+    transport.send(pad(MESSAGE.pack(STOP, 0), message_size))
+    process.join()
+    return [summary(transport.name, "round_trip", rtt), summary(transport.name, "one_way", one_way),
+            summary(transport.name, "throughput", count=count, elapsed_ns=elapsed)]
+
+
+# asyncio transports, the echo servers are TCPServer and UDPServer with an echo protocol
+
+class TCPEchoProtocol(Protocol):
+    def __init__(self, message_size: int = 64):
+        self.message_size = message_size
+        self.buffer = bytearray()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        received = now()
+        self.buffer += data
+        size = self.message_size
+        n = len(self.buffer) // size
+        for i in range(n):
+            sent = MESSAGE.unpack_from(self.buffer, i * size)[0]
+            self.transport.write(pad(MESSAGE.pack(sent, received), size))
+        del self.buffer[:n * size]
+
+
+class UDPEchoProtocol(DatagramProtocol):
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        sent = MESSAGE.unpack_from(data)[0]
+        self.transport.sendto(pad(MESSAGE.pack(sent, now()), len(data)), addr)
+
+
+def serve_async(kind: str, port: int, message_size: int):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    if kind == "tcp":
+        server = TCPServer("127.0.0.1", port, lambda: TCPEchoProtocol(message_size), loop=loop)
+    else:
+        server = UDPServer("127.0.0.1", port, UDPEchoProtocol, loop=loop)
+    loop.run_until_complete(server.run())
+
+
+class ClientProtocol(Protocol, DatagramProtocol):
+    def __init__(self, message_size: int):
+        self.message_size = message_size
+        self.buffer = bytearray()
+        self.received: asyncio.Queue = asyncio.Queue()
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def data_received(self, data):
+        self.buffer += data
+        size = self.message_size
+        n = len(self.buffer) // size
+        for i in range(n):
+            self.received.put_nowait(bytes(self.buffer[i * size:(i + 1) * size]))
+        del self.buffer[:n * size]
+
+    def datagram_received(self, data, addr):
+        self.received.put_nowait(data)
+
+
+async def client_async(kind: str, port: int, count: int, window: int, message_size: int) -> List[Dict]:
+    loop = asyncio.get_running_loop()
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            if kind == "tcp":
+                transport, protocol = await loop.create_connection(lambda: ClientProtocol(message_size),
+                                                                   "127.0.0.1", port)
+                send = transport.write
+            else:
+                transport, protocol = await loop.create_datagram_endpoint(lambda: ClientProtocol(message_size),
+                                                                          remote_addr=("127.0.0.1", port))
+                send = transport.sendto
+                send(pad(MESSAGE.pack(0, 0), message_size))
+                await asyncio.wait_for(protocol.received.get(), 0.1)
+            break
+        except (ConnectionRefusedError, asyncio.TimeoutError):
+            if kind == "udp":
+                transport.close()
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+    name = f"asyncio_{kind}"
+    rtt = np.empty(count, dtype=np.int64)
+    one_way = np.empty(count, dtype=np.int64)
+    n = lost = 0
+    for i in range(-min(count, 1000), count):
+        sent = now()
+        send(pad(MESSAGE.pack(sent, 0), message_size))
+        try:
+            while True:
+                echoed, received = MESSAGE.unpack_from(await asyncio.wait_for(protocol.received.get(), 1))
+                # the echo of an earlier message given up as lost
+                if echoed == sent:
+                    break
+        except asyncio.TimeoutError:
+            # a datagram lost on loopback, the sample is left out
+            if i >= 0:
+                lost += 1
+            continue
+        if i >= 0:
+            rtt[n] = now() - sent
+            one_way[n] = received - sent
+            n += 1
+    rtt, one_way = rtt[:n], one_way[:n]
+    stream_lost = 0
+    in_flight = done = 0
+    start = now()
+    while done < count:
+        while in_flight < window and done + in_flight < count:
+            send(pad(MESSAGE.pack(now(), 0), message_size))
+            in_flight += 1
+        try:
+            await asyncio.wait_for(protocol.received.get(), 1)
+        except asyncio.TimeoutError:
+            # datagrams lost on loopback under load, counted as done to keep the window moving
+            stream_lost += 1
+        in_flight -= 1
+        done += 1
+    elapsed = now() - start
+    transport.close()
+    return [summary(name, "round_trip", rtt, lost=lost), summary(name, "one_way", one_way, lost=lost),
+            summary(name, "throughput", count=count, elapsed_ns=elapsed, lost=stream_lost)]
+
+
+def bench_async(kind: str, count: int, window: int, message_size: int) -> List[Dict]:
+    port = free_port(socket.SOCK_STREAM if kind == "tcp" else socket.SOCK_DGRAM)
+    process = multiprocessing.Process(target=serve_async, args=(kind, port, message_size), daemon=True)
+    process.start()
+    try:
+        return asyncio.run(client_async(kind, port, count, window, message_size))
+    finally:
+        process.terminate()
+        process.join()
+
+
+# LMDB: per operation latency in process and visibility of a put to a reader in another process
+
+def lmdb_reader(db_path: str, count: int, conn):
+    # opened before the writer, so it creates the environment
+    db = LMDB(db_path, LMDBMode.WRITE, map_size=1 << 30)
+    latencies = np.empty(count, dtype=np.int64)
+    db.begin_read()
+    conn.send_bytes(b"ready")
+    for i in range(count):
+        key = struct.pack(">Q", i)
+        while True:
+            value = db.get(key)
+            if value is not None:
+                break
+            db.refresh()
+        latencies[i] = now() - struct.unpack_from("<q", value)[0]
+    db.end_read()
+    conn.send_bytes(latencies.tobytes())
+
+
+def bench_lmdb(directory: str, count: int, message_size: int) -> List[Dict]:
+    name = "lmdb"
+    db_path = os.path.join(directory, "bench_ops.lmdb")
+    db = LMDB(db_path, LMDBMode.WRITE, map_size=1 << 30)
+    value = bytes(message_size)
+    put = np.empty(count, dtype=np.int64)
+    for i in range(count):
+        start = now()
+        db.put(struct.pack(">Q", i), value)
+        put[i] = now() - start
+    get = np.empty(count, dtype=np.int64)
+    for i in range(count):
+        start = now()
+        db.get(struct.pack(">Q", i))
+        get[i] = now() - start
+    get_reused = np.empty(count, dtype=np.int64)
+    with db.reading():
+        for i in range(count):
+            start = now()
+            db.get(struct.pack(">Q", i))
+            get_reused[i] = now() - start
+    start = now()
+    db.put_many((struct.pack(">Q", count + i), value) for i in range(count))
+    put_many = now() - start
+    del db
+
+    # the reader process opens the environment first, a process can open an environment only once
+    db_path = os.path.join(directory, "bench_visibility.lmdb")
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=lmdb_reader, args=(db_path, count, child))
+    process.start()
+    parent.recv_bytes()
+    db = LMDB(db_path, LMDBMode.WRITE, map_size=1 << 30)
+    for i in range(count):
+        db.put(struct.pack(">Q", i), pad(struct.pack("<q", now()), message_size))
+    visibility = np.frombuffer(parent.recv_bytes(), dtype=np.int64)
+    process.join()
+    del db
+    return [summary(name, "put", put), summary(name, "get", get), summary(name, "get_reused_txn", get_reused),
+            summary(name, "put_many_throughput", count=count, elapsed_ns=put_many),
+            summary(name, "one_way_visibility", visibility)]
+
+
+def host_info() -> Dict:
+    return {"platform": platform.platform(), "machine": platform.machine(), "processor": platform.processor(),
+            "cpus": os.cpu_count(), "python": sys.version.split()[0], "numpy": np.__version__,
+            "timestamp": time.time()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--window", type=int, default=64)
+    parser.add_argument("--message-size", type=int, default=64)
+    parser.add_argument("--only", default="ring,pipe,tcp,udp,lmdb")
+    parser.add_argument("--output", help="path of the JSON report")
+    args = parser.parse_args(argv)
+    assert args.message_size >= MESSAGE.size and args.message_size % 8 == 0
+    if sys.platform != "win32":
+        multiprocessing.set_start_method("fork", force=True)
+    only = set(args.only.split(","))
+    directory = tempfile.mkdtemp()
+    results = []
+    if "ring" in only:
+        results += bench_sync(RingTransport(directory, args.message_size), args.count, args.window, args.message_size)
+    if "pipe" in only:
+        results += bench_sync(PipeTransport(directory, args.message_size), args.count, args.window,
+                              args.message_size)
+    if "tcp" in only:
+        results += bench_async("tcp", args.count, args.window, args.message_size)
+    if "udp" in only:
+        results += bench_async("udp", args.count, args.window, args.message_size)
+    if "lmdb" in only:
+        results += bench_lmdb(directory, args.count, args.message_size)
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+    os.rmdir(directory)
+
+    for r in results:
+        line = f"{r['name']:<22} {r['metric']:<22}"
+        if "p50_ns" in r:
+            line += f" p50 {r['p50_ns'] / 1e3:9.2f} us  p99 {r['p99_ns'] / 1e3:9.2f} us  " \
+                    f"p99.9 {r['p999_ns'] / 1e3:9.2f} us"
+        if "msgs_per_s" in r:
+            line += f" {r['msgs_per_s']:14,.0f} msg/s"
+        if r.get("lost"):
+            line += f"  lost {r['lost']}"
+        print(line)
+    report = {"host": host_info(), "args": vars(args), "results": results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == '__main__':
+    main()
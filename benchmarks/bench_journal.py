@@ -0,0 +1,49 @@
+"""
+Journal append cost per message against a plain copy of the payload into a bytearray.
+
+    python -m benchmarks.bench_journal
+"""
+import shutil
+import tempfile
+import time
+
+from pytrading.ipc.journal import JournalWriter
+
+
+def bench(name, fn, calls, repeat=5):
+    fn()
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{name:<40} {best / calls * 1e9:10.1f} ns/message")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(n=100_000, payload_size=64):
+    directory = tempfile.mkdtemp()
+    payload = bytes(payload_size)
+    writer = JournalWriter(directory, "bench", rollover=None, chunk_size=64 << 20)
+    buf = bytearray(n * payload_size)
+    ts = time.time_ns()
+
+    def copy():
+        mv = memoryview(buf)
+        for i in range(n):
+            mv[i * payload_size:(i + 1) * payload_size] = payload
+
+    def write():
+        for _ in range(n):
+            writer.write(payload, timestamp=ts)
+
+    bench(f"memoryview copy of {payload_size} bytes", copy, n)
+    bench(f"JournalWriter.write of {payload_size} bytes", write, n)
+    writer.close()
+    shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
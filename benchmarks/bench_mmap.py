@@ -0,0 +1,49 @@
+"""
+First-touch latency of every page of a fresh mapping with and without prefaulting.
+
+    python -m benchmarks.bench_mmap
+"""
+import mmap
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapFile, MMapMode, MMapReadFileRegistry, MMapWriteFileRegistry
+
+
+def first_touch(file_path, **options):
+    t0 = time.perf_counter_ns()
+    mf = MMapFile(file_path, MMapMode.WRITE, **options)
+    map_ns = time.perf_counter_ns() - t0
+    pages = np.frombuffer(mf.mm, dtype=np.uint8)[::mmap.PAGESIZE]
+    latencies = np.empty(len(pages), dtype=np.int64)
+    clock = time.perf_counter_ns
+    for i in range(len(pages)):
+        t = clock()
+        pages[i] = 1
+        latencies[i] = clock() - t
+    del pages
+    MMapWriteFileRegistry.pop(file_path, None)
+    del mf
+    return map_ns, latencies
+
+
+def main(size=64 << 20):
+    file_path = os.path.join(tempfile.mkdtemp(), "bench_mmap.bin")
+    with open(file_path, "wb") as f:
+        f.truncate(size)
+    # a warm-up pass brings the file into the page cache, both runs then pay only the mapping faults
+    first_touch(file_path)
+    for name, options in [("default", {}), ("populate", {"populate": True})]:
+        map_ns, latencies = first_touch(file_path, **options)
+        p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9])
+        print(f"{name:<10} map {map_ns / 1e3:9.1f} us  first touch p50 {p50:7.0f} ns  p99 {p99:7.0f} ns  "
+              f"p99.9 {p999:7.0f} ns  max {latencies.max():7d} ns  ({len(latencies)} pages)")
+    MMapReadFileRegistry.pop(file_path, None)
+    os.remove(file_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Polling cost per call of the RingBuffer view accessors against seek + read + struct.unpack.
+
+    python -m benchmarks.bench_record_cache
+"""
+import os
+import struct
+import tempfile
+import time
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapFile, MMapMode, MMapRecord
+from pytrading.ipc.record_cache import RingBuffer, RecordCacheReader, RecordCacheWriter
+
+
+def bench(name, fn, calls, repeat=5):
+    fn()
+    best = min(_timed(fn) for _ in range(repeat))
+    print(f"{name:<40} {best / calls * 1e9:10.1f} ns/call")
+    return best
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main(n=100_000, size=1024, record_size=64):
+    itemsize = (record_size + 8) * size + 8
+    file_path = os.path.join(tempfile.mkdtemp(), "bench_record_cache.bin")
+    mf = MMapFile(file_path, MMapMode.WRITE, size=itemsize)
+    ring = RingBuffer(size, record_size, MMapRecord(file_path, 0, itemsize, MMapMode.WRITE))
+    writer = RecordCacheWriter(ring)
+    for i in range(size // 2):
+        writer.write(bytes(record_size))
+    reader = RecordCacheReader(ring)
+    reader.sequence = writer.sequence
+    mm = mf.mm
+    out = np.zeros(record_size, dtype=np.uint8)
+
+    def header_struct():
+        for _ in range(n):
+            mm.seek(0)
+            struct.unpack("<Q", mm.read(8))[0] % (1 << 32)
+
+    def header_view():
+        for _ in range(n):
+            ring.get_latest_idx()
+
+    def sequence_struct():
+        for _ in range(n):
+            mm.seek(8 + 7 * (record_size + 8))
+            struct.unpack("<Q", mm.read(8))
+
+    def sequence_view():
+        for _ in range(n):
+            ring.get_sequence(7)
+
+    def poll_empty():
+        for _ in range(n):
+            reader.read_next()
+
+    def poll_empty_into():
+        for _ in range(n):
+            reader.read_next_into(out)
+
+    def changed_since():
+        for _ in range(n // 100):
+            ring.changed_since(writer.sequence - 16)
+
+    bench("header seek+read+unpack", header_struct, n)
+    bench("get_latest_idx (view)", header_view, n)
+    bench("sequence seek+read+unpack", sequence_struct, n)
+    bench("get_sequence (view)", sequence_view, n)
+    bench("read_next, nothing new", poll_empty, n)
+    bench("read_next_into, nothing new", poll_empty_into, n)
+    bench(f"changed_since over {size} slots", changed_since, n // 100)
+
+    del reader, writer, ring
+    del mm, mf
+    os.remove(file_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,7 @@
 from .array import ResizableArray
+from .ring import CircularBuffer
 
 __all__ = [
-    'ResizableArray'
+    'ResizableArray',
+    'CircularBuffer'
 ]
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Union
 
 import numpy as np
 from numba import njit
@@ -11,11 +11,10 @@ def bulk_update(arr1: np.ndarray, arr2: np.ndarray, s1: int, e1: int, s2: int, e
 # Define a class to create a resizable array
 class ResizableArray:
 
-    # Initialize the resizable array with a given data type, capacity, and resize factor
-    def __init__(self, dtype: type, capacity: int, resize_factor: float = 1.5):
+    # Initialize the resizable array with a given data type (including structured dtypes), capacity, and resize factor
+    def __init__(self, dtype: Union[type, np.dtype], capacity: int, resize_factor: float = 1.5):
         assert capacity > 0
-        assert issubclass(dtype, np.generic)
-        self._arr = np.empty(capacity, dtype=dtype)
+        self._arr = np.empty(capacity, dtype=np.dtype(dtype))
         self._capacity = capacity
         self._size = 0
         self._resize_factor = resize_factor
@@ -51,10 +50,19 @@ class ResizableArray:
     def capacity(self) -> int:
         return self._capacity
 
+    # Return the data type of the array
+    @property
+    def dtype(self) -> np.dtype:
+        return self._arr.dtype
+
     # Return the underlying array
     def underlying(self) -> np.ndarray:
         return self._arr
 
+    # Return a view of the used part of the array
+    def view(self) -> np.ndarray:
+        return self._arr[:self._size]
+
     # Delete an element at a given index
     def delete(self, index):
         if index >= self._size:
@@ -62,17 +70,33 @@ class ResizableArray:
         bulk_update(self._arr, self._arr, index, self._size - 1, index + 1, self._size)
         self._size -= 1
 
+    # Delete the elements in [start, stop)
+    def delete_range(self, start: int, stop: int):
+        if start < 0 or stop > self._size or start > stop:
+            raise IndexError
+        bulk_update(self._arr, self._arr, start, self._size - (stop - start), stop, self._size)
+        self._size -= stop - start
+
     # Resize the array to a given size
     def resize(self, size: int):
         if size <= self._capacity:
             self._size = size
         else:
             self.extend(size)
+            self._size = size
+
+    # Grow the capacity to hold at least the given number of elements, growing by the resize factor
+    def reserve(self, capacity: int):
+        if capacity > self._capacity:
+            self.extend(max(capacity, int(self._capacity * self._resize_factor)))
 
-    # Extend the array to a given capacity
-    def extend(self, capacity: Optional[int] = None):
+    # Extend the array to a given capacity, or append all values of an array
+    def extend(self, capacity: Optional[Union[int, np.ndarray]] = None):
+        if isinstance(capacity, np.ndarray):
+            self.insert_range(self._size, capacity)
+            return
         if capacity is None:
-            capacity = int(self._capacity * self._resize_factor)
+            capacity = max(int(self._capacity * self._resize_factor), self._capacity + 1)
         if capacity < self._capacity:
             return
         new_arr = np.empty(capacity, dtype=self._arr.dtype)
@@ -88,6 +112,16 @@ class ResizableArray:
         self._arr[index] = value
         self._size += 1
 
+    # Insert all values of an array at a given index
+    def insert_range(self, index: int, values: np.ndarray):
+        if index < 0 or index > self._size:
+            raise IndexError
+        n = len(values)
+        self.reserve(self._size + n)
+        bulk_update(self._arr, self._arr, index + n, self._size + n, index, self._size)
+        self._arr[index:index + n] = values
+        self._size += n
+
     # Append a value to the end of the array
     def append(self, value):
         if self._size == self._capacity:
@@ -100,12 +134,58 @@ class ResizableArray:
         self._size = 0
 
     # Shrink the array to fit the given size
-    def shrink_to_fit(self, size: Optional[int]):
-        assert size < self._capacity
+    def shrink_to_fit(self, size: Optional[int] = None):
         if size is not None:
             assert size >= self._size
         else:
-            size = self._size
+            size = max(self._size, 1)
+        assert size <= self._capacity
         new_arr = np.empty(size, dtype=self._arr.dtype)
         bulk_update(new_arr, self._arr, 0, self._size, 0, self._size)
+        self._arr = new_arr
         self._capacity = size
+
+    # Return the keys used by the sorted operations, a field of a structured array when key is given
+    def _keys(self, key: Optional[str]) -> np.ndarray:
+        if key is None:
+            return self._arr[:self._size]
+        return self._arr[key][:self._size]
+
+    # Return the insertion index of a value in an array sorted in ascending order
+    def searchsorted(self, value, side: str = 'left', key: Optional[str] = None) -> int:
+        return int(np.searchsorted(self._keys(key), value, side=side))
+
+    # Insert a value keeping the array sorted, after any equal values, and return its index
+    def sorted_insert(self, value, key: Optional[str] = None) -> int:
+        index = self.searchsorted(value if key is None else value[key], 'right', key)
+        self.insert(index, value)
+        return index
+
+    # Replace the value with an equal key or insert it keeping the array sorted, and return its index
+    def sorted_upsert(self, value, key: Optional[str] = None) -> int:
+        k = value if key is None else value[key]
+        index = self.searchsorted(k, 'left', key)
+        if index < self._size and self._keys(key)[index] == k:
+            self._arr[index] = value
+        else:
+            self.insert(index, value)
+        return index
+
+    # Remove the first value with an equal key from a sorted array, return whether it was found
+    def sorted_remove(self, value, key: Optional[str] = None) -> bool:
+        index = self.searchsorted(value, 'left', key)
+        if index < self._size and self._keys(key)[index] == value:
+            self.delete(index)
+            return True
+        return False
+
+    # Insert all values of an array keeping the array sorted
+    def sorted_extend(self, values: np.ndarray, key: Optional[str] = None):
+        keys = values if key is None else values[key]
+        order = np.argsort(keys, kind='stable')
+        positions = np.searchsorted(self._keys(key), keys[order], side='right')
+        n = len(values)
+        self.reserve(self._size + n)
+        new_arr = np.insert(self._arr[:self._size], positions, values[order])
+        self._arr[:self._size + n] = new_arr
+        self._size += n
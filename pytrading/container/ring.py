@@ -0,0 +1,238 @@
+from typing import Optional, Union
+
+import numpy as np
+from numba import njit
+
+# Indices into the integer state array
+COUNT = 0  # number of items pushed since creation
+START = 1  # absolute index of the oldest item in the window
+MIN_HEAD = 2
+MIN_TAIL = 3
+MAX_HEAD = 4
+MAX_TAIL = 5
+SINCE_RESYNC = 6
+
+# Indices into the float state array
+SUM = 0
+SUM_SQ = 1
+
+
+# Define a function to recompute the window sums from the stored values to bound rounding drift
+@njit
+def ring_resync(values, istate, fstate):
+    capacity = len(values) // 2
+    total = 0.0
+    total_sq = 0.0
+    for i in range(istate[START], istate[COUNT]):
+        v = values[i % capacity]
+        total += v
+        total_sq += v * v
+    fstate[SUM] = total
+    fstate[SUM_SQ] = total_sq
+    istate[SINCE_RESYNC] = 0
+
+
+# Define a function to drop the oldest item of the window
+@njit
+def ring_pop(values, istate, fstate, min_queue, max_queue):
+    capacity = len(values) // 2
+    start = istate[START]
+    v = values[start % capacity]
+    fstate[SUM] -= v
+    fstate[SUM_SQ] -= v * v
+    if istate[MIN_HEAD] < istate[MIN_TAIL] and min_queue[istate[MIN_HEAD] % capacity] == start:
+        istate[MIN_HEAD] += 1
+    if istate[MAX_HEAD] < istate[MAX_TAIL] and max_queue[istate[MAX_HEAD] % capacity] == start:
+        istate[MAX_HEAD] += 1
+    istate[START] = start + 1
+
+
+# Define a function to push a value and its time, evicting the oldest item when the window is full
+@njit
+def ring_push(values, times, istate, fstate, min_queue, max_queue, value, ts):
+    capacity = len(values) // 2
+    count = istate[COUNT]
+    if count - istate[START] == capacity:
+        ring_pop(values, istate, fstate, min_queue, max_queue)
+    pos = count % capacity
+    # every item is stored twice so the most recent items are always contiguous
+    values[pos] = value
+    values[pos + capacity] = value
+    times[pos] = ts
+    times[pos + capacity] = ts
+    fstate[SUM] += value
+    fstate[SUM_SQ] += value * value
+    # monotonic queues of absolute indices, increasing values for min and decreasing for max
+    while (istate[MIN_HEAD] < istate[MIN_TAIL]
+           and values[min_queue[(istate[MIN_TAIL] - 1) % capacity] % capacity] >= value):
+        istate[MIN_TAIL] -= 1
+    min_queue[istate[MIN_TAIL] % capacity] = count
+    istate[MIN_TAIL] += 1
+    while (istate[MAX_HEAD] < istate[MAX_TAIL]
+           and values[max_queue[(istate[MAX_TAIL] - 1) % capacity] % capacity] <= value):
+        istate[MAX_TAIL] -= 1
+    max_queue[istate[MAX_TAIL] % capacity] = count
+    istate[MAX_TAIL] += 1
+    istate[COUNT] = count + 1
+    istate[SINCE_RESYNC] += 1
+    if istate[SINCE_RESYNC] >= capacity:
+        ring_resync(values, istate, fstate)
+
+
+# Define a function to push many values and times at once
+@njit
+def ring_push_many(values, times, istate, fstate, min_queue, max_queue, new_values, new_times):
+    for i in range(len(new_values)):
+        ring_push(values, times, istate, fstate, min_queue, max_queue, new_values[i], new_times[i])
+
+
+# Define a function to evict every item older than ts and return the number of evicted items
+@njit
+def ring_evict_before(values, times, istate, fstate, min_queue, max_queue, ts):
+    capacity = len(values) // 2
+    n = 0
+    while istate[START] < istate[COUNT] and times[istate[START] % capacity] < ts:
+        ring_pop(values, istate, fstate, min_queue, max_queue)
+        n += 1
+    if istate[START] == istate[COUNT]:
+        fstate[SUM] = 0.0
+        fstate[SUM_SQ] = 0.0
+    return n
+
+
+# Define a function to return the mean of the window
+@njit
+def ring_mean(istate, fstate):
+    n = istate[COUNT] - istate[START]
+    if n == 0:
+        return np.nan
+    return fstate[SUM] / n
+
+
+# Define a function to return the sample variance of the window
+@njit
+def ring_var(istate, fstate):
+    n = istate[COUNT] - istate[START]
+    if n < 2:
+        return np.nan
+    mean = fstate[SUM] / n
+    return max((fstate[SUM_SQ] - mean * fstate[SUM]) / (n - 1), 0.0)
+
+
+# Define a function to return the minimum of the window
+@njit
+def ring_min(values, istate, min_queue):
+    if istate[MIN_HEAD] == istate[MIN_TAIL]:
+        return np.nan
+    capacity = len(values) // 2
+    return values[min_queue[istate[MIN_HEAD] % capacity] % capacity]
+
+
+# Define a function to return the maximum of the window
+@njit
+def ring_max(values, istate, max_queue):
+    if istate[MAX_HEAD] == istate[MAX_TAIL]:
+        return np.nan
+    capacity = len(values) // 2
+    return values[max_queue[istate[MAX_HEAD] % capacity] % capacity]
+
+
+# Define a class for a fixed capacity time series window with rolling statistics.
+# The state lives in plain arrays so @njit code can call the ring_* kernels on them directly.
+class CircularBuffer:
+
+    # Initialize the buffer with a capacity and a value data type
+    def __init__(self, capacity: int, dtype: Union[type, np.dtype] = np.float64):
+        assert capacity > 0
+        self._capacity = capacity
+        self.values = np.zeros(capacity * 2, dtype=dtype)
+        self.times = np.zeros(capacity * 2, dtype=np.int64)
+        self.istate = np.zeros(7, dtype=np.int64)
+        self.fstate = np.zeros(2, dtype=np.float64)
+        self.min_queue = np.zeros(capacity, dtype=np.int64)
+        self.max_queue = np.zeros(capacity, dtype=np.int64)
+
+    # Return the number of items in the window
+    def __len__(self) -> int:
+        return int(self.istate[COUNT] - self.istate[START])
+
+    # Return the capacity of the buffer
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+
+    # Return the number of items pushed since creation
+    @property
+    def count(self) -> int:
+        return int(self.istate[COUNT])
+
+    # Push a value with an optional time
+    def append(self, value, ts: int = 0):
+        ring_push(self.values, self.times, self.istate, self.fstate, self.min_queue, self.max_queue, value, ts)
+
+    # Push many values with optional times
+    def extend(self, values: np.ndarray, times: Optional[np.ndarray] = None):
+        if times is None:
+            times = np.zeros(len(values), dtype=np.int64)
+        ring_push_many(self.values, self.times, self.istate, self.fstate, self.min_queue, self.max_queue,
+                       np.asarray(values, dtype=self.values.dtype), np.asarray(times, dtype=np.int64))
+
+    # Evict every item older than ts and return the number of evicted items
+    def evict_before(self, ts: int) -> int:
+        return ring_evict_before(self.values, self.times, self.istate, self.fstate, self.min_queue,
+                                 self.max_queue, ts)
+
+    # Return the position after the most recent item in the doubled storage
+    def _end(self) -> int:
+        return int(self.istate[COUNT] % self._capacity + self._capacity)
+
+    # Return a view (no copy) of the most recent n items in time order, all items by default
+    def last(self, n: Optional[int] = None) -> np.ndarray:
+        if n is None or n > len(self):
+            n = len(self)
+        end = self._end()
+        return self.values[end - n:end]
+
+    # Return a view (no copy) of the times of the most recent n items
+    def last_times(self, n: Optional[int] = None) -> np.ndarray:
+        if n is None or n > len(self):
+            n = len(self)
+        end = self._end()
+        return self.times[end - n:end]
+
+    # Return the most recent item
+    def latest(self):
+        if len(self) == 0:
+            raise IndexError
+        return self.values[self._end() - 1]
+
+    # Remove every item
+    def clear(self):
+        self.istate[START] = self.istate[COUNT]
+        self.istate[MIN_HEAD] = self.istate[MIN_TAIL]
+        self.istate[MAX_HEAD] = self.istate[MAX_TAIL]
+        self.fstate[:] = 0.0
+
+    # Return the rolling sum
+    def sum(self) -> float:
+        return float(self.fstate[SUM])
+
+    # Return the rolling mean
+    def mean(self) -> float:
+        return ring_mean(self.istate, self.fstate)
+
+    # Return the rolling sample variance
+    def var(self) -> float:
+        return ring_var(self.istate, self.fstate)
+
+    # Return the rolling sample standard deviation
+    def std(self) -> float:
+        return float(np.sqrt(self.var()))
+
+    # Return the rolling minimum
+    def min(self) -> float:
+        return ring_min(self.values, self.istate, self.min_queue)
+
+    # Return the rolling maximum
+    def max(self) -> float:
+        return ring_max(self.values, self.istate, self.max_queue)
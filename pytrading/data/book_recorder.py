@@ -0,0 +1,187 @@
+"""
+Design:
+    64 byte header (magic, book depth, record count, record size, symbol)
+    followed by fix_lob_factory records in arrival order.
+    The writer publishes the count after the records, so readers only see complete records.
+    Records are ordered by time and sequence, the columns are searched in place for lookups.
+"""
+import os
+from typing import Optional
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapFile, MMapMode
+from pytrading.md.lob import LOB, FixedLOB, copy_levels, fix_lob_factory
+
+MAGIC = b"PTLOB001"
+HEADER_SIZE = 64
+
+header_dtype = np.dtype([
+    ('magic', 'S8'), ('size', '<i8'), ('count', '<i8'), ('itemsize', '<i8'), ('symbol', 'S32')
+])
+
+
+class BookRecorder:
+
+    def __init__(self, file_path: str, symbol: str = "", size: int = 32, capacity: int = 4096):
+        self.file_path = file_path
+        self.size = size
+        self.record_dtype = fix_lob_factory(size)
+        exists = os.path.exists(file_path) and os.path.getsize(file_path) >= HEADER_SIZE
+        self.mf = MMapFile.acquire(file_path, MMapMode.WRITE, HEADER_SIZE + capacity * self.record_dtype.itemsize)
+        self._map()
+        if exists:
+            try:
+                assert self._header['magic'][0] == MAGIC
+                assert self._header['size'][0] == size
+                assert self._header['itemsize'][0] == self.record_dtype.itemsize
+            except AssertionError:
+                self.close()
+                raise
+        else:
+            self._header['magic'] = MAGIC
+            self._header['size'] = size
+            self._header['itemsize'] = self.record_dtype.itemsize
+            self._header['symbol'] = symbol.encode()
+            self._header['count'] = 0
+        self.symbol = self._header['symbol'][0].decode()
+        self._count = int(self._header['count'][0])
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def capacity(self) -> int:
+        return len(self._records)
+
+    def _map(self):
+        self._header = self.mf.as_array(header_dtype, 0, 1)
+        self._records = self.mf.as_array(self.record_dtype, HEADER_SIZE,
+                                         (self.mf.size - HEADER_SIZE) // self.record_dtype.itemsize)
+
+    def _reserve(self, count: int):
+        if count <= len(self._records):
+            return
+        capacity = max(count, len(self._records) * 2)
+        # the mapping can not be resized while views are alive
+        self._header = self._records = None
+        self.mf.extend(HEADER_SIZE + capacity * self.record_dtype.itemsize)
+        self._map()
+
+    def _publish(self, count: int):
+        self._count = count
+        self._header['count'] = count
+
+    # Appends fix_lob_factory records
+    def append_many(self, records: np.ndarray):
+        assert records.dtype == self.record_dtype, f"records are not {self.size}-level fix_lob_factory records"
+        n = len(records)
+        self._reserve(self._count + n)
+        self._records[self._count:self._count + n] = records
+        self._publish(self._count + n)
+
+    # Appends a FixedLOB of the same depth
+    def append_fixed(self, lob: FixedLOB):
+        self.append_many(lob.record)
+
+    # Appends the top levels of a LOB
+    def append_lob(self, lob: LOB):
+        self._reserve(self._count + 1)
+        record = self._records[self._count]
+        record['bid_size'] = copy_levels(lob.bids.underlying(), lob.bid_volumes.underlying(), lob.bid_size,
+                                         record['bids'], record['bids_volume'])
+        record['ask_size'] = copy_levels(lob.asks.underlying(), lob.ask_volumes.underlying(), lob.ask_size,
+                                         record['asks'], record['asks_volume'])
+        record['timestamp'] = lob.timestamp
+        record['sequence'] = lob.sequence
+        self._publish(self._count + 1)
+
+    def flush(self):
+        self.mf.mm.flush()
+
+    # Releases the mapping, the file is closed with its last owner
+    def close(self):
+        if self.mf is None:
+            return
+        self.flush()
+        self._header = self._records = None
+        self.mf.release()
+        self.mf = None
+
+
+class BookHistory:
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.mf: Optional[MMapFile] = None
+        try:
+            self.refresh()
+        except AssertionError:
+            self.close()
+            raise
+
+    # Remaps the file when the recorder grew it and picks up newly published records
+    def refresh(self):
+        if self.mf is None or os.path.getsize(self.file_path) != self.mf.size:
+            self._header = self._records = None
+            if self.mf is None:
+                self.mf = MMapFile.acquire(self.file_path, MMapMode.READ)
+            self.mf.refresh()
+            self._header = self.mf.as_array(header_dtype, 0, 1)
+            assert self._header['magic'][0] == MAGIC
+            self.size = int(self._header['size'][0])
+            self.symbol = self._header['symbol'][0].decode()
+            self.record_dtype = fix_lob_factory(self.size)
+            assert self._header['itemsize'][0] == self.record_dtype.itemsize
+            self._records = self.mf.as_array(self.record_dtype, HEADER_SIZE,
+                                             (self.mf.size - HEADER_SIZE) // self.record_dtype.itemsize)
+        self._count = min(int(self._header['count'][0]), len(self._records))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        return self.records[index]
+
+    # Memory-mapped read-only records, nothing is read until accessed
+    @property
+    def records(self) -> np.ndarray:
+        return self._records[:self._count]
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.records['timestamp']
+
+    @property
+    def sequences(self) -> np.ndarray:
+        return self.records['sequence']
+
+    def view(self, index: int) -> FixedLOB:
+        return FixedLOB(self.symbol, self.size, record=self._records[index:index + 1])
+
+    # Index of the first record at or after a timestamp
+    def index_at(self, timestamp: int) -> int:
+        return int(np.searchsorted(self.timestamps, timestamp, side='left'))
+
+    # Index of the first record at or after a sequence
+    def index_of_sequence(self, sequence: int) -> int:
+        return int(np.searchsorted(self.sequences, sequence, side='left'))
+
+    # Records with start <= timestamp < end
+    def between(self, start: int, end: int) -> np.ndarray:
+        return self.records[self.index_at(start):self.index_at(end)]
+
+    # Book in force at a timestamp, the last record at or before it
+    def book_at(self, timestamp: int) -> Optional[FixedLOB]:
+        index = int(np.searchsorted(self.timestamps, timestamp, side='right')) - 1
+        if index < 0:
+            return None
+        return self.view(index)
+
+    # Releases the mapping, the file is closed with its last owner
+    def close(self):
+        if self.mf is None:
+            return
+        self._header = self._records = None
+        self.mf.release()
+        self.mf = None
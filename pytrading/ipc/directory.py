@@ -0,0 +1,190 @@
+"""
+Design:
+    64 byte header (magic, table capacity, symbol count, end of the allocated data)
+    followed by an open addressing hash table of entries (symbol, state, offset, record size, ring size, record dtype)
+    and the RingBuffer of every symbol.
+
+    Symbols hash with crc32 so every process probes the same entries and a lookup is O(1).
+    A publisher fills an entry and sets its state to READY last, consumers stop probing at the first EMPTY entry,
+    so a half written entry is never seen. Rings are appended at the end of the file and never move:
+    growing the file maps it again and rings attached before keep their mapping.
+    Publishers of different processes allocate under an exclusive file lock.
+"""
+import ast
+import zlib
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapFile, MMapMode, MMapRecord
+from pytrading.ipc.record_cache import RingBuffer, RecordCacheReader, RecordCacheWriter
+
+try:
+    import fcntl
+except ImportError:  # a single publisher process per directory on windows
+    fcntl = None
+
+MAGIC = b"PTDIR001"
+HEADER_SIZE = 64
+ALIGNMENT = 64
+EMPTY = 0
+READY = 1
+
+header_dtype = np.dtype([
+    ('magic', 'S8'), ('capacity', '<i8'), ('count', '<i8'), ('data_end', '<i8'), ('reserved', 'S32')
+])
+
+entry_dtype = np.dtype([
+    ('symbol', 'S32'), ('state', '<i8'), ('offset', '<i8'), ('record_size', '<i8'), ('ring_size', '<i8'),
+    ('dtype', 'S224')
+])
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _ring_itemsize(record_size: int, ring_size: int) -> int:
+    return (record_size + 8) * ring_size + 8
+
+
+def encode_dtype(dtype: np.dtype) -> bytes:
+    return repr(dtype.descr if dtype.names else dtype.str).encode()
+
+
+def decode_dtype(encoded: bytes) -> np.dtype:
+    return np.dtype(ast.literal_eval(encoded.decode()))
+
+
+class MMapDirectory:
+
+    def __init__(self, file_path: str, mode: MMapMode = MMapMode.READ, capacity: int = 1024, size: int = 1 << 20):
+        self.file_path = file_path
+        self.mode = mode
+        if mode == MMapMode.WRITE:
+            self.mf = MMapFile(file_path, mode, size=max(size, _align(HEADER_SIZE + capacity * entry_dtype.itemsize)))
+            self._header = self.mf.as_array(header_dtype, 0, 1)
+            with self._lock():
+                if self._header['magic'][0] != MAGIC:
+                    self._header['capacity'] = capacity
+                    self._header['count'] = 0
+                    self._header['data_end'] = _align(HEADER_SIZE + capacity * entry_dtype.itemsize)
+                    self._header['magic'] = MAGIC
+        else:
+            self.mf = MMapFile(file_path, mode)
+            self._header = self.mf.as_array(header_dtype, 0, 1)
+        assert self._header['magic'][0] == MAGIC
+        self.capacity = int(self._header['capacity'][0])
+        self._table = self.mf.as_array(entry_dtype, HEADER_SIZE, self.capacity)
+        self._states = self._table['state']
+        self._symbols = self._table['symbol']
+        # entry of every symbol looked up by this process, entries never move once READY
+        self._entries: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return int(self._header['count'][0])
+
+    def __contains__(self, symbol: str) -> bool:
+        return self._lookup(symbol) >= 0
+
+    @contextmanager
+    def _lock(self):
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self.mf.file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.mf.file.fileno(), fcntl.LOCK_UN)
+
+    # Returns the entry of a symbol or the EMPTY entry where it would go, -1 when the table is full
+    def _probe(self, name: bytes) -> int:
+        i = zlib.crc32(name) % self.capacity
+        for _ in range(self.capacity):
+            if self._states[i] == EMPTY or self._symbols[i] == name:
+                return i
+            i = (i + 1) % self.capacity
+        return -1
+
+    # Returns the READY entry of a symbol, -1 when it is not published
+    def _lookup(self, symbol: str) -> int:
+        i = self._entries.get(symbol)
+        if i is not None:
+            return i
+        i = self._probe(symbol.encode())
+        if i < 0 or self._states[i] != READY:
+            return -1
+        self._entries[symbol] = i
+        return i
+
+    def _ring(self, i: int) -> RingBuffer:
+        entry = self._table[i]
+        offset = int(entry['offset'])
+        record_size = int(entry['record_size'])
+        ring_size = int(entry['ring_size'])
+        itemsize = _ring_itemsize(record_size, ring_size)
+        if offset + itemsize > self.mf.size:
+            # published by another process after this one mapped the file
+            self.mf.refresh()
+        return RingBuffer(ring_size, record_size, MMapRecord(self.mf, offset, itemsize, self.mode))
+
+    def symbols(self) -> List[str]:
+        return [symbol.decode() for symbol in self._symbols[self._states == READY]]
+
+    # Returns (offset, record dtype, ring size) of a symbol, None when it is not published
+    def entry(self, symbol: str) -> Optional[Tuple[int, np.dtype, int]]:
+        i = self._lookup(symbol)
+        if i < 0:
+            return None
+        entry = self._table[i]
+        return int(entry['offset']), decode_dtype(entry['dtype']), int(entry['ring_size'])
+
+    def dtype(self, symbol: str) -> Optional[np.dtype]:
+        entry = self.entry(symbol)
+        return None if entry is None else entry[1]
+
+    # Allocates the ring of a symbol, or reuses it when the symbol is already published, and returns its writer
+    def publish(self, symbol: str, dtype, ring_size: int = 1024, notifier=None) -> RecordCacheWriter:
+        assert self.mode == MMapMode.WRITE
+        dtype = np.dtype(dtype)
+        name = symbol.encode()
+        encoded = encode_dtype(dtype)
+        assert len(name) <= entry_dtype['symbol'].itemsize
+        assert len(encoded) <= entry_dtype['dtype'].itemsize
+        with self._lock():
+            # another publisher may have grown the file
+            self.mf.refresh()
+            i = self._probe(name)
+            assert i >= 0, "directory is full"
+            entry = self._table[i]
+            if self._states[i] == READY:
+                assert entry['dtype'] == encoded and entry['ring_size'] == ring_size
+            else:
+                itemsize = _ring_itemsize(dtype.itemsize, ring_size)
+                offset = int(self._header['data_end'][0])
+                end = _align(offset + itemsize)
+                if end > self.mf.size:
+                    self.mf.extend(max(end, self.mf.size * 2))
+                entry['symbol'] = name
+                entry['offset'] = offset
+                entry['record_size'] = dtype.itemsize
+                entry['ring_size'] = ring_size
+                entry['dtype'] = encoded
+                self._header['data_end'] = end
+                self._header['count'] += 1
+                entry['state'] = READY
+        self._entries[symbol] = i
+        return RecordCacheWriter(self._ring(i), notifier)
+
+    # Returns a reader of the ring of a symbol, None when it is not published yet
+    def attach(self, symbol: str) -> Optional[RecordCacheReader]:
+        i = self._lookup(symbol)
+        if i < 0:
+            return None
+        return RecordCacheReader(self._ring(i))
+
+    def close(self):
+        self._header = self._table = self._states = self._symbols = None
+        self.mf = None
@@ -0,0 +1,335 @@
+"""
+Design:
+    One file per rollover period (hour, day or a single file), named <name>.<period>.journal,
+    64 byte header (magic, period start, first sequence and timestamp, last sequence and timestamp,
+    commit offset, closed flag) followed by 8 byte aligned messages:
+        4 byte length, 4 byte message type, 8 byte sequence, 8 byte timestamp, payload
+
+    Single writer. A message is copied in place and published by moving the commit offset,
+    readers never read past it so they never see a partial message. Files grow by whole chunks.
+    At rollover the next file is created before the current one is marked closed,
+    so a tailing reader that reaches the end of a closed file always finds the next one.
+    Sequences continue across files. Timestamps are nanoseconds since the epoch and must not decrease.
+
+    Every index_interval messages the writer appends (sequence, timestamp, offset) to a sparse index
+    in <file>.idx (64 byte header with the entry count, then the entries). A reader seeks to a sequence
+    or timestamp with a binary search over the files and then over the index,
+    and scans at most index_interval messages from there.
+"""
+import bisect
+import glob
+import os
+import struct
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapFile, MMapMode, MMapReadFileRegistry, MMapWriteFileRegistry
+
+MAGIC = b"PTJRN001"
+INDEX_MAGIC = b"PTJIX001"
+HEADER_SIZE = 64
+
+HEADER = struct.Struct("<8sqqqqqqq")
+MESSAGE_HEADER = struct.Struct("<IIQq")
+
+# header field offsets
+PERIOD_START = 8
+FIRST_SEQUENCE = 16
+FIRST_TIMESTAMP = 24
+LAST_SEQUENCE = 32
+LAST_TIMESTAMP = 40
+COMMIT = 48
+CLOSED = 56
+
+index_dtype = np.dtype([('sequence', '<i8'), ('timestamp', '<i8'), ('offset', '<i8')])
+
+ROLLOVER = {
+    "hour": (3600 * 10 ** 9, "%Y%m%d%H"),
+    "day": (86400 * 10 ** 9, "%Y%m%d"),
+    None: (None, None),
+}
+
+Message = Tuple[int, int, int, bytes]  # sequence, timestamp, message type, payload
+
+
+def _pad(n: int) -> int:
+    return (n + 7) & ~7
+
+
+def journal_files(directory: str, name: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(glob.escape(directory), f"{glob.escape(name)}.*.journal")))
+
+
+def index_path(file_path: str) -> str:
+    return file_path + ".idx"
+
+
+def _release(mf: MMapFile):
+    # the registries would keep every file a long running process went through mapped
+    registry = MMapReadFileRegistry if mf.mode == MMapMode.READ else MMapWriteFileRegistry
+    if registry.get(mf.file_path) is mf:
+        del registry[mf.file_path]
+
+
+class JournalWriter:
+
+    def __init__(self, directory: str, name: str, rollover: Optional[str] = "day", chunk_size: int = 64 << 20,
+                 index_interval: int = 64):
+        self.directory = directory
+        self.name = name
+        self.period_ns, self._period_format = ROLLOVER[rollover]
+        self.chunk_size = _pad(chunk_size)
+        self.index_interval = index_interval
+        self.sequence = 0
+        self.file_path: Optional[str] = None
+        self.mf: Optional[MMapFile] = None
+        self._period_end = -1
+        os.makedirs(directory, exist_ok=True)
+        files = journal_files(directory, name)
+        if files:
+            # a restarted writer appends to the last file and continues its sequence
+            self._open(files[-1])
+
+    def _open(self, file_path: str):
+        self.file_path = file_path
+        self.mf = MMapFile(file_path, MMapMode.WRITE)
+        self._mv = memoryview(self.mf.mm)
+        header = HEADER.unpack_from(self._mv, 0)
+        assert header[0] == MAGIC
+        period_start, self._first_sequence, _, self.sequence, _, self._commit, closed = header[1:]
+        self._period_end = period_start + self.period_ns if self.period_ns else (1 << 63) - 1
+        if closed:
+            self._period_end = -1
+        self._index = MMapFile(index_path(file_path), MMapMode.WRITE)
+        self._map_index()
+
+    def _map_index(self):
+        self._index_count = self._index.as_array('<i8', 8, 1)
+        self._index_entries = self._index.as_array(index_dtype, HEADER_SIZE,
+                                                   (self._index.size - HEADER_SIZE) // index_dtype.itemsize)
+
+    def _file_path(self, period_start: int) -> str:
+        suffix = time.strftime(self._period_format, time.gmtime(period_start // 10 ** 9)) if self.period_ns else "0"
+        return os.path.join(self.directory, f"{self.name}.{suffix}.journal")
+
+    # Starts the file of the period of timestamp, the previous file is closed once the new one exists
+    def _roll(self, timestamp: int):
+        period_start = timestamp - timestamp % self.period_ns if self.period_ns else 0
+        file_path = self._file_path(period_start)
+        assert file_path != self.file_path, "timestamps must not decrease"
+        idx = MMapFile(index_path(file_path), MMapMode.WRITE, size=HEADER_SIZE + 1024 * index_dtype.itemsize)
+        idx.mm[:8] = INDEX_MAGIC
+        _release(idx)
+        del idx
+        mf = MMapFile(file_path, MMapMode.WRITE, size=self.chunk_size)
+        HEADER.pack_into(mf.mm, 0, MAGIC, period_start, self.sequence + 1, timestamp, self.sequence, timestamp,
+                         HEADER_SIZE, 0)
+        _release(mf)
+        del mf
+        previous = self.mf
+        if previous is not None:
+            self._mv.release()
+            self._index_count = self._index_entries = None
+            _release(self._index)
+        self._open(file_path)
+        if previous is not None:
+            struct.pack_into("<q", previous.mm, CLOSED, 1)
+            previous.mm.flush()
+            _release(previous)
+
+    def _grow(self, end: int):
+        self._mv.release()
+        self.mf.extend((end + self.chunk_size - 1) // self.chunk_size * self.chunk_size)
+        self._mv = memoryview(self.mf.mm)
+
+    def _add_index(self, sequence: int, timestamp: int, offset: int):
+        count = int(self._index_count[0])
+        if count == len(self._index_entries):
+            self._index_count = self._index_entries = None
+            self._index.extend(HEADER_SIZE + 2 * count * index_dtype.itemsize)
+            self._map_index()
+        self._index_entries[count] = (sequence, timestamp, offset)
+        self._index_count[0] = count + 1
+
+    # Appends a message (any bytes-like object) and returns its sequence
+    def write(self, payload, msg_type: int = 0, timestamp: Optional[int] = None) -> int:
+        if timestamp is None:
+            timestamp = time.time_ns()
+        if timestamp >= self._period_end:
+            self._roll(timestamp)
+        if not isinstance(payload, bytes):
+            payload = memoryview(payload).cast('B')
+        n = len(payload)
+        offset = self._commit
+        start = offset + MESSAGE_HEADER.size
+        end = _pad(start + n)
+        if end > self.mf.size:
+            self._grow(end)
+        sequence = self.sequence + 1
+        mv = self._mv
+        MESSAGE_HEADER.pack_into(mv, offset, n, msg_type, sequence, timestamp)
+        mv[start:start + n] = payload
+        if (sequence - self._first_sequence) % self.index_interval == 0:
+            self._add_index(sequence, timestamp, offset)
+        struct.pack_into("<qq", mv, LAST_SEQUENCE, sequence, timestamp)
+        # publishes the message
+        struct.pack_into("<q", mv, COMMIT, end)
+        self._commit = end
+        self.sequence = sequence
+        return sequence
+
+    def flush(self):
+        if self.mf is not None:
+            self.mf.mm.flush()
+            self._index.mm.flush()
+
+    def close(self):
+        self.flush()
+        if self.mf is not None:
+            self._mv.release()
+            self._index_count = self._index_entries = None
+            _release(self.mf)
+            _release(self._index)
+        self.mf = self._index = None
+
+
+class JournalReader:
+
+    def __init__(self, directory: str, name: str):
+        self.directory = directory
+        self.name = name
+        # sequence of the last message read
+        self.sequence = 0
+        self.files: List[str] = []
+        self.file_path: Optional[str] = None
+        self.mf: Optional[MMapFile] = None
+        self._file_index = -1
+        self._position = HEADER_SIZE
+        # (first sequence, first timestamp) of every file, they never change once written
+        self._firsts: Dict[str, Tuple[int, int]] = {}
+
+    def _refresh_files(self):
+        self.files = journal_files(self.directory, self.name)
+
+    def _first(self, file_path: str) -> Tuple[int, int]:
+        first = self._firsts.get(file_path)
+        if first is None:
+            with open(file_path, "rb") as f:
+                header = HEADER.unpack(f.read(HEADER.size))
+            first = self._firsts[file_path] = (header[2], header[3])
+        return first
+
+    def _open(self, file_index: int):
+        self._close()
+        self._file_index = file_index
+        self.file_path = self.files[file_index]
+        self.mf = MMapFile(self.file_path, MMapMode.READ)
+        self._mv = memoryview(self.mf.mm)
+        assert self._mv[:8] == MAGIC
+        self._position = HEADER_SIZE
+
+    def _close(self):
+        if self.mf is not None:
+            self._mv.release()
+            _release(self.mf)
+        self.mf = None
+
+    def _header(self, offset: int) -> int:
+        return struct.unpack_from("<q", self._mv, offset)[0]
+
+    # Maps the file again when the writer grew it past this mapping
+    def _ensure(self, end: int):
+        if end > self.mf.size:
+            self._mv.release()
+            self.mf.refresh()
+            self._mv = memoryview(self.mf.mm)
+
+    def _message(self, position: int) -> Tuple[int, int, int, int]:
+        # length, message type, sequence, timestamp
+        return MESSAGE_HEADER.unpack_from(self._mv, position)
+
+    # Returns the next message, None when the reader caught up with the writer
+    def read(self) -> Optional[Message]:
+        while True:
+            if self.mf is None:
+                self._refresh_files()
+                if not self.files:
+                    return None
+                self._open(0)
+            commit = self._header(COMMIT)
+            if self._position < commit:
+                self._ensure(commit)
+                n, msg_type, sequence, timestamp = self._message(self._position)
+                start = self._position + MESSAGE_HEADER.size
+                payload = self._mv[start:start + n].tobytes()
+                self._position = _pad(start + n)
+                self.sequence = sequence
+                return sequence, timestamp, msg_type, payload
+            if not self._header(CLOSED):
+                return None
+            if self._file_index + 1 >= len(self.files):
+                self._refresh_files()
+            if self._file_index + 1 >= len(self.files):
+                return None
+            self._open(self._file_index + 1)
+
+    def __iter__(self) -> Iterator[Message]:
+        while True:
+            message = self.read()
+            if message is None:
+                return
+            yield message
+
+    # Positions the reader in the file of the last first key at or before key,
+    # at the last index entry at or before key
+    def _seek(self, key: int, field: str):
+        self._refresh_files()
+        if not self.files:
+            return
+        column = 0 if field == 'sequence' else 1
+        firsts = [self._first(file_path)[column] for file_path in self.files]
+        self._open(max(bisect.bisect_right(firsts, key) - 1, 0))
+        idx = MMapFile(index_path(self.file_path), MMapMode.READ)
+        _release(idx)
+        count = idx.as_array('<i8', 8, 1)[0]
+        entries = idx.as_array(index_dtype, HEADER_SIZE, min(count, (idx.size - HEADER_SIZE) // index_dtype.itemsize))
+        i = int(np.searchsorted(entries[field], key, side='right')) - 1
+        if i >= 0:
+            self._position = int(entries['offset'][i])
+        del count, entries, idx
+
+    # Skips the messages of the current file before key
+    def _skip(self, key: int, field: int):
+        commit = self._header(COMMIT)
+        self._ensure(commit)
+        while self._position < commit:
+            message = self._message(self._position)
+            if message[field] >= key:
+                break
+            self.sequence = message[2]
+            self._position = _pad(self._position + MESSAGE_HEADER.size + message[0])
+
+    # The next read returns the first message with a sequence at or after sequence
+    def seek_sequence(self, sequence: int):
+        self._seek(sequence, 'sequence')
+        if self.mf is not None:
+            self._skip(sequence, 2)
+
+    # The next read returns the first message with a timestamp at or after timestamp
+    def seek_timestamp(self, timestamp: int):
+        self._seek(timestamp, 'timestamp')
+        if self.mf is not None:
+            self._skip(timestamp, 3)
+
+    # The next read returns the next message the writer appends
+    def seek_end(self):
+        self._refresh_files()
+        if self.files:
+            self._open(len(self.files) - 1)
+            self._position = self._header(COMMIT)
+            self.sequence = self._header(LAST_SEQUENCE)
+
+    def close(self):
+        self._close()
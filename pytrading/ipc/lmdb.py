@@ -1,5 +1,6 @@
+from contextlib import contextmanager
 from enum import Enum
-from typing import Optional
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 import lmdb
 
@@ -9,22 +10,70 @@ class LMDBMode(Enum):
     WRITE = 1
 
 
+Items = Union[Dict[bytes, bytes], Iterable[Tuple[bytes, bytes]]]
+
+
 class LMDB:
-    def __init__(self, db_path, mode: LMDBMode = LMDBMode.READ, db: Optional[int] = None):
+    def __init__(self, db_path, mode: LMDBMode = LMDBMode.READ, db: Optional[int] = None, buffers: bool = False,
+                 max_dbs: int = 0, map_size: int = 10485760):
+        # long-lived read transaction shared by lookups, see begin_read
+        self._txn: Optional[lmdb.Transaction] = None
         if mode == LMDBMode.READ:
-            self.env: lmdb.Environment = lmdb.open(db_path, subdir=False, readonly=True)
+            self.env: lmdb.Environment = lmdb.open(db_path, subdir=False, readonly=True, max_dbs=max_dbs,
+                                                   map_size=map_size)
         else:
-            self.env: lmdb.Environment = lmdb.open(db_path, subdir=False)
+            self.env: lmdb.Environment = lmdb.open(db_path, subdir=False, max_dbs=max_dbs, map_size=map_size)
         self.db = db
+        # values are memoryviews into the map, valid only until the transaction ends
+        self.buffers = buffers
 
     def __del__(self):
+        self.end_read()
         self.env.close()
 
+    # Starts a read transaction reused by every lookup until end_read, lookups see the data as of this call
+    def begin_read(self):
+        self.end_read()
+        self._txn = self.env.begin(db=self.db, buffers=self.buffers)
+
+    # Starts a new reused read transaction to see data written since begin_read
+    def refresh(self):
+        self.begin_read()
+
+    def end_read(self):
+        if self._txn is not None:
+            self._txn.abort()
+            self._txn = None
+
+    @contextmanager
+    def reading(self):
+        self.begin_read()
+        try:
+            yield self
+        finally:
+            self.end_read()
+
+    @contextmanager
+    def _read_txn(self, buffers: Optional[bool] = None):
+        if self._txn is not None and (buffers is None or buffers == self.buffers):
+            yield self._txn
+        else:
+            with self.env.begin(db=self.db, buffers=self.buffers if buffers is None else buffers) as txn:
+                yield txn
+
     def get(self, key: bytes):
+        if self._txn is not None:
+            return self._txn.get(key)
         with self.env.begin(db=self.db) as txn:
             with txn.cursor() as cursor:
                 return cursor.get(key)
 
+    # Values of many keys in one transaction, None for missing keys.
+    # Values are memoryviews only inside a reused read transaction with buffers=True.
+    def get_many(self, keys: Iterable[bytes]) -> List[Optional[bytes]]:
+        with self._read_txn(None if self._txn is not None else False) as txn:
+            return [txn.get(key) for key in keys]
+
     def get_all_records(self):
         d = {}
         with self.env.begin(db=self.db) as txn:
@@ -33,7 +82,71 @@ class LMDB:
                     d[key] = value
         return d
 
+    # Streams (key, value) pairs in key order with start <= key < end, without building a dict.
+    # With buffers=True the pairs are memoryviews, valid only until the next step of the iteration.
+    def iterate(self, start: Optional[bytes] = None, end: Optional[bytes] = None, reverse: bool = False,
+                buffers: Optional[bool] = None) -> Iterator[Tuple[bytes, bytes]]:
+        with self._read_txn(buffers) as txn:
+            with txn.cursor() as cursor:
+                if not reverse:
+                    if not (cursor.set_range(start) if start is not None else cursor.first()):
+                        return
+                    for key, value in cursor.iternext():
+                        if end is not None and bytes(key) >= end:
+                            return
+                        yield key, value
+                else:
+                    if end is None:
+                        positioned = cursor.last()
+                    elif cursor.set_range(end):
+                        positioned = cursor.prev()
+                    else:
+                        positioned = cursor.last()
+                    if not positioned:
+                        return
+                    for key, value in cursor.iterprev():
+                        if start is not None and bytes(key) < start:
+                            return
+                        yield key, value
+
+    # Streams the (key, value) pairs with start <= key < end
+    def range(self, start: Optional[bytes], end: Optional[bytes], reverse: bool = False,
+              buffers: Optional[bool] = None) -> Iterator[Tuple[bytes, bytes]]:
+        return self.iterate(start, end, reverse, buffers)
+
+    # Streams the (key, value) pairs whose key starts with prefix
+    def prefix(self, prefix: bytes, reverse: bool = False,
+               buffers: Optional[bool] = None) -> Iterator[Tuple[bytes, bytes]]:
+        return self.iterate(prefix, _prefix_end(prefix), reverse, buffers)
+
+    # Streams the keys in key order
+    def keys(self, start: Optional[bytes] = None, end: Optional[bytes] = None) -> Iterator[bytes]:
+        for key, _ in self.iterate(start, end, buffers=False):
+            yield key
+
     def put(self, key: bytes, value: bytes) -> bool:
         with self.env.begin(db=self.db, write=True) as txn:
             with txn.cursor() as cursor:
                 return cursor.put(key, value)
+
+    # Puts many pairs in one write transaction and returns the number of pairs added
+    def put_many(self, items: Items, overwrite: bool = True) -> int:
+        if isinstance(items, dict):
+            items = items.items()
+        with self.env.begin(db=self.db, write=True) as txn:
+            with txn.cursor() as cursor:
+                _, added = cursor.putmulti(items, overwrite=overwrite)
+        return added
+
+    # Deletes many keys in one write transaction and returns the number of keys deleted
+    def delete_many(self, keys: Iterable[bytes]) -> int:
+        with self.env.begin(db=self.db, write=True) as txn:
+            return sum(txn.delete(key) for key in keys)
+
+
+# Returns the smallest key greater than every key starting with prefix, None when there is none
+def _prefix_end(prefix: bytes) -> Optional[bytes]:
+    stripped = prefix.rstrip(b"\xff")
+    if not stripped:
+        return None
+    return stripped[:-1] + bytes([stripped[-1] + 1])
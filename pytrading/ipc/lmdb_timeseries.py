@@ -0,0 +1,206 @@
+"""
+Design:
+    One LMDB named sub-database per dataset, keys sort by symbol, then time, then sequence:
+        symbol, 0 byte, 8 byte big-endian timestamp offset by 2 ** 63 [, 8 byte big-endian sequence]
+    so negative timestamps sort before positive ones.
+    Values are the raw bytes of one numpy structured record of the dataset dtype.
+    The dtype of every dataset is kept in the __meta__ sub-database, readers open datasets by name.
+    Range queries walk a cursor over buffers of the map and copy every value straight into the result array.
+"""
+import ast
+import struct
+from typing import List, Optional, Tuple
+
+import lmdb
+import numpy as np
+
+from pytrading.ipc.directory import decode_dtype, encode_dtype
+from pytrading.ipc.lmdb import LMDB, LMDBMode
+
+META = b"__meta__"
+OFFSET = 1 << 63
+TIMESTAMP = struct.Struct(">Q")
+TIMESTAMP_SEQUENCE = struct.Struct(">QQ")
+
+key_dtype = np.dtype([('timestamp', '<i8'), ('sequence', '<u8')])
+
+
+def encode_key(symbol: bytes, timestamp: int, sequence: Optional[int] = None) -> bytes:
+    if sequence is None:
+        return symbol + b"\0" + TIMESTAMP.pack(timestamp + OFFSET)
+    return symbol + b"\0" + TIMESTAMP_SEQUENCE.pack(timestamp + OFFSET, sequence)
+
+
+def decode_key(key) -> Tuple[bytes, int, Optional[int]]:
+    key = bytes(key)
+    i = key.index(b"\0")
+    if len(key) - i - 1 == TIMESTAMP_SEQUENCE.size:
+        timestamp, sequence = TIMESTAMP_SEQUENCE.unpack_from(key, i + 1)
+        return key[:i], timestamp - OFFSET, sequence
+    return key[:i], TIMESTAMP.unpack_from(key, i + 1)[0] - OFFSET, None
+
+
+def _symbol(symbol: str) -> bytes:
+    name = symbol.encode()
+    assert b"\0" not in name
+    return name
+
+
+class TimeSeries:
+
+    def __init__(self, store: "TimeSeriesStore", name: str, dtype: np.dtype, sequence: bool):
+        self.store = store
+        self.env = store.env
+        self.name = name
+        self.dtype = dtype
+        # keys carry a sequence to keep many records at the same timestamp
+        self.sequence = sequence
+        self.db = self.env.open_db(name.encode(), create=store.mode == LMDBMode.WRITE)
+
+    def _key(self, name: bytes, timestamp: int, sequence: int) -> bytes:
+        return encode_key(name, timestamp, sequence if self.sequence else None)
+
+    def _record(self, value) -> np.void:
+        return np.frombuffer(value, dtype=self.dtype, count=1)[0].copy()
+
+    def put(self, symbol: str, timestamp: int, record, sequence: int = 0) -> bool:
+        record = np.asarray(record, dtype=self.dtype)
+        with self.env.begin(db=self.db, write=True) as txn:
+            return txn.put(self._key(_symbol(symbol), timestamp, sequence), record.tobytes())
+
+    # Puts many records of a symbol in one transaction and returns the number of records added
+    def put_many(self, symbol: str, timestamps: np.ndarray, records: np.ndarray,
+                 sequences: Optional[np.ndarray] = None) -> int:
+        name = _symbol(symbol)
+        records = np.ascontiguousarray(records, dtype=self.dtype)
+        raw = memoryview(records.view(np.uint8))
+        itemsize = self.dtype.itemsize
+        if sequences is None:
+            sequences = np.zeros(len(records), dtype=np.uint64)
+        items = ((self._key(name, int(timestamps[i]), int(sequences[i])), raw[i * itemsize:(i + 1) * itemsize])
+                 for i in range(len(records)))
+        with self.env.begin(db=self.db, write=True) as txn:
+            with txn.cursor() as cursor:
+                _, added = cursor.putmulti(items)
+        return added
+
+    def get(self, symbol: str, timestamp: int, sequence: int = 0) -> Optional[np.void]:
+        with self.env.begin(db=self.db, buffers=True) as txn:
+            value = txn.get(self._key(_symbol(symbol), timestamp, sequence))
+            return None if value is None else self._record(value)
+
+    # Returns the (timestamp, record) of the last record of a symbol
+    def latest(self, symbol: str) -> Optional[Tuple[int, np.void]]:
+        name = _symbol(symbol)
+        with self.env.begin(db=self.db, buffers=True) as txn:
+            with txn.cursor() as cursor:
+                positioned = cursor.prev() if cursor.set_range(name + b"\x01") else cursor.last()
+                if not positioned:
+                    return None
+                symbol_, timestamp, _ = decode_key(cursor.key())
+                if symbol_ != name:
+                    return None
+                return timestamp, self._record(cursor.value())
+
+    # Returns the keys (timestamp, sequence) and the records of a symbol with start <= timestamp < end
+    def range(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None,
+              limit: Optional[int] = None, capacity: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+        name = _symbol(symbol)
+        prefix = name + b"\0"
+        plen = len(prefix)
+        itemsize = self.dtype.itemsize
+        first = prefix if start is None else encode_key(name, start)
+        last = OFFSET * 2 if end is None else end + OFFSET
+        keys = np.empty(capacity, dtype=key_dtype)
+        records = np.empty(capacity, dtype=self.dtype)
+        raw = memoryview(records.view(np.uint8))
+        n = 0
+        with self.env.begin(db=self.db, buffers=True) as txn:
+            with txn.cursor() as cursor:
+                if cursor.set_range(first):
+                    for key, value in cursor.iternext():
+                        if key[:plen] != prefix:
+                            break
+                        if self.sequence:
+                            timestamp, sequence = TIMESTAMP_SEQUENCE.unpack_from(key, plen)
+                        else:
+                            timestamp, sequence = TIMESTAMP.unpack_from(key, plen)[0], 0
+                        if timestamp >= last or (limit is not None and n >= limit):
+                            break
+                        if n == len(records):
+                            keys = np.resize(keys, 2 * n)
+                            raw.release()
+                            records = np.resize(records, 2 * n)
+                            raw = memoryview(records.view(np.uint8))
+                        keys[n] = (timestamp - OFFSET, sequence)
+                        raw[n * itemsize:(n + 1) * itemsize] = value
+                        n += 1
+        raw.release()
+        return keys[:n], records[:n]
+
+    # Deletes the records of a symbol with start <= timestamp < end and returns their number
+    def delete_range(self, symbol: str, start: Optional[int] = None, end: Optional[int] = None) -> int:
+        name = _symbol(symbol)
+        prefix = name + b"\0"
+        first = prefix if start is None else encode_key(name, start)
+        last = None if end is None else encode_key(name, end)
+        n = 0
+        with self.env.begin(db=self.db, write=True) as txn:
+            with txn.cursor() as cursor:
+                positioned = cursor.set_range(first)
+                while positioned:
+                    key = cursor.key()
+                    if not key.startswith(prefix) or (last is not None and key >= last):
+                        break
+                    positioned = cursor.delete()
+                    n += 1
+        return n
+
+    # Symbols with records, skipping from one symbol to the next without scanning their records
+    def symbols(self) -> List[str]:
+        symbols = []
+        with self.env.begin(db=self.db) as txn:
+            with txn.cursor() as cursor:
+                positioned = cursor.first()
+                while positioned:
+                    name = cursor.key().split(b"\0", 1)[0]
+                    symbols.append(name.decode())
+                    positioned = cursor.set_range(name + b"\x01")
+        return symbols
+
+
+class TimeSeriesStore:
+
+    def __init__(self, db_path, mode: LMDBMode = LMDBMode.READ, max_datasets: int = 63, map_size: int = 1 << 30):
+        self.mode = mode
+        self.lmdb = LMDB(db_path, mode, max_dbs=max_datasets + 1, map_size=map_size)
+        self.env: lmdb.Environment = self.lmdb.env
+        self._meta = self.env.open_db(META, create=mode == LMDBMode.WRITE)
+        self._datasets = {}
+
+    def datasets(self) -> List[str]:
+        with self.env.begin(db=self._meta) as txn:
+            return [key.decode() for key in txn.cursor().iternext(values=False)]
+
+    # Opens a dataset, creating it with dtype when it does not exist
+    def dataset(self, name: str, dtype=None, sequence: bool = False) -> TimeSeries:
+        ds = self._datasets.get(name)
+        if ds is not None:
+            return ds
+        with self.env.begin(db=self._meta) as txn:
+            meta = txn.get(name.encode())
+        if meta is None:
+            assert self.mode == LMDBMode.WRITE and dtype is not None, f"no dataset {name}"
+            dtype = np.dtype(dtype)
+            with self.env.begin(db=self._meta, write=True) as txn:
+                txn.put(name.encode(), repr((encode_dtype(dtype), sequence)).encode())
+        else:
+            encoded, sequence = ast.literal_eval(meta.decode())
+            stored = decode_dtype(encoded)
+            assert dtype is None or np.dtype(dtype) == stored
+            dtype = stored
+        ds = self._datasets[name] = TimeSeries(self, name, dtype, sequence)
+        return ds
+
+    def __getitem__(self, name: str) -> TimeSeries:
+        return self.dataset(name)
@@ -1,8 +1,12 @@
+import ctypes
+import ctypes.util
 import os
 import mmap
 import sys
 from enum import Enum
-from typing import Optional
+from typing import Optional, Union
+
+import numpy as np
 
 
 class MMapMode(Enum):
@@ -10,24 +14,56 @@ class MMapMode(Enum):
     WRITE = 1
 
 
+# Expected access pattern of a mapping, passed to madvise
+class MMapAdvice(Enum):
+    NORMAL = getattr(mmap, "MADV_NORMAL", 0)
+    SEQUENTIAL = getattr(mmap, "MADV_SEQUENTIAL", 2)
+    RANDOM = getattr(mmap, "MADV_RANDOM", 1)
+    WILLNEED = getattr(mmap, "MADV_WILLNEED", 3)
+
+
+# Linux madvise values, missing from the mmap module before Python 3.13
+MADV_POPULATE_READ = 22
+MADV_POPULATE_WRITE = 23
+
+_libc = None
+
+
+def _mlock(mm: mmap.mmap, size: int):
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        _libc.mlock.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+    address = np.frombuffer(mm, dtype=np.uint8).ctypes.data
+    if _libc.mlock(ctypes.c_void_p(address), ctypes.c_size_t(size)) != 0:
+        errno = ctypes.get_errno()
+        raise OSError(errno, f"mlock failed: {os.strerror(errno)}, check ulimit -l")
+
+
 MMapReadFileRegistry = {}
 MMapWriteFileRegistry = {}
 
 
 class MMapFile:
 
-    def __init__(self, file_path: str, mode: MMapMode, size: Optional[int] = None):
+    # populate prefaults every page when mapping so the first touch does not fault,
+    # lock keeps the pages in RAM (mlock, bounded by ulimit -l) and advice hints the access pattern
+    def __init__(self, file_path: str, mode: MMapMode, size: Optional[int] = None, populate: bool = False,
+                 lock: bool = False, advice: Optional[MMapAdvice] = None):
         self.file_path = file_path
         self.mode = mode
+        self.populate = populate
+        self.lock = lock
+        self.advice = advice
+        # owners sharing this mapping through acquire, the mapping is closed when the last one releases it
+        self.refs = 1
         if self.mode == MMapMode.READ:
             self.size = os.path.getsize(file_path)
             self.file = open(file_path, "rb")
-            if sys.platform == "win32":
-                self.mm = mmap.mmap(self.file.fileno(), self.size, access=mmap.ACCESS_READ)
-            else:
-                self.mm = mmap.mmap(self.file.fileno(), 0, prot=mmap.PROT_READ)
+            self.mm = self._map(self.size)
             MMapReadFileRegistry[self.file_path] = self
         else:
+            fresh = None
             if os.path.exists(file_path):
                 self.size = os.path.getsize(file_path)
                 self.file = open(file_path, "r+b")
@@ -36,12 +72,90 @@ class MMapFile:
                 assert size > 0
                 self.size = size
                 self.file.truncate(size)
-            if sys.platform == "win32":
-                self.mm = mmap.mmap(self.file.fileno(), self.size)
-            else:
-                self.mm = mmap.mmap(self.file.fileno(), 0)
+                fresh = 0
+            self.mm = self._map(self.size, fresh)
             MMapWriteFileRegistry[self.file_path] = self
 
+    def _map(self, size: int, fresh: Optional[int] = None) -> mmap.mmap:
+        if sys.platform == "win32":
+            if self.mode == MMapMode.READ:
+                return mmap.mmap(self.file.fileno(), size, access=mmap.ACCESS_READ)
+            return mmap.mmap(self.file.fileno(), size)
+        flags = mmap.MAP_SHARED
+        if self.populate and hasattr(mmap, "MAP_POPULATE"):
+            flags |= mmap.MAP_POPULATE
+        if self.mode == MMapMode.READ:
+            mm = mmap.mmap(self.file.fileno(), 0, flags=flags, prot=mmap.PROT_READ)
+        else:
+            mm = mmap.mmap(self.file.fileno(), 0, flags=flags)
+        self._configure(mm, size, fresh=fresh)
+        return mm
+
+    # Prefaults the pages of [start, size) and applies the advice and the lock. Pages from fresh on were just
+    # created by a truncate and nobody else wrote them yet, only those may be prefaulted by writing.
+    def _configure(self, mm: mmap.mmap, size: int, start: int = 0, fresh: Optional[int] = None):
+        if self.advice is not None:
+            mm.madvise(self.advice.value)
+        if self.populate and size > start:
+            start -= start % mmap.PAGESIZE
+            if not self._populate(mm, start, size - start):
+                if hasattr(mmap, "MADV_WILLNEED"):
+                    mm.madvise(mmap.MADV_WILLNEED, start, size - start)
+                end = size
+                if self.mode == MMapMode.WRITE and fresh is not None:
+                    # MAP_POPULATE maps shared file pages read-only, the first write would still fault.
+                    # The fresh pages only hold the zeros of the truncate, writing them again loses nothing.
+                    end = max(-(-fresh // mmap.PAGESIZE) * mmap.PAGESIZE, start)
+                    pages = np.frombuffer(mm, dtype=np.uint8)[end:size:mmap.PAGESIZE]
+                    pages[:] = 0
+                    del pages
+                if start > 0 or not hasattr(mmap, "MAP_POPULATE"):
+                    pages = np.frombuffer(mm, dtype=np.uint8)[start:end:mmap.PAGESIZE]
+                    pages.sum()
+                    del pages
+        if self.lock:
+            _mlock(mm, size)
+
+    # Faults the range in with MADV_POPULATE_WRITE/READ (Linux 5.14+) without touching its content,
+    # returns False when the kernel does not support it
+    def _populate(self, mm: mmap.mmap, start: int, length: int) -> bool:
+        if not sys.platform.startswith("linux"):
+            return False
+        if self.mode == MMapMode.WRITE:
+            advice = getattr(mmap, "MADV_POPULATE_WRITE", MADV_POPULATE_WRITE)
+        else:
+            advice = getattr(mmap, "MADV_POPULATE_READ", MADV_POPULATE_READ)
+        try:
+            mm.madvise(advice, start, length)
+        except OSError:
+            return False
+        return True
+
+    # Returns the registered mapping of a path shared with its other owners, mapping the file when there is none
+    @classmethod
+    def acquire(cls, file_path: str, mode: MMapMode, size: Optional[int] = None, **options) -> "MMapFile":
+        registry = MMapReadFileRegistry if mode == MMapMode.READ else MMapWriteFileRegistry
+        mf = registry.get(file_path)
+        if mf is None or mf.mm.closed:
+            return cls(file_path, mode, size, **options)
+        mf.refs += 1
+        return mf
+
+    # Drops one owner, the last one unregisters and closes the mapping
+    def release(self):
+        self.refs -= 1
+        if self.refs > 0:
+            return
+        registry = MMapReadFileRegistry if self.mode == MMapMode.READ else MMapWriteFileRegistry
+        if registry.get(self.file_path) is self:
+            del registry[self.file_path]
+        try:
+            self.mm.close()
+        except BufferError:
+            # views are alive, the mapping goes away with them
+            pass
+        self.file.close()
+
     def __del__(self):
         self.mm.close()
         self.file.close()
@@ -49,16 +163,66 @@ class MMapFile:
     def extend(self, size: int):
         assert self.mode == MMapMode.WRITE
         if size > self.size:
-            self.mm.resize(size)
+            try:
+                self.mm.resize(size)
+                if sys.platform != "win32":
+                    self._configure(self.mm, size, self.size, self.size)
+            except BufferError:
+                # views are alive, grow the file and map it again. The old mapping stays valid for
+                # its views and shares the same pages, so nothing written through it is lost.
+                self.file.truncate(size)
+                self.mm = self._map(size, self.size)
             self.size = size
 
+    # Maps the file again when another process grew it, views of the old mapping stay valid.
+    # Returns True when the mapping changed.
+    def refresh(self) -> bool:
+        size = os.path.getsize(self.file_path)
+        if size <= self.size:
+            return False
+        self.mm = self._map(size)
+        self.size = size
+        return True
+
+    # Returns a numpy view of the mapping, writable in WRITE mode and read-only in READ mode.
+    # A view keeps the mapping it was taken from, take it again after extend or refresh to see the new size.
+    def as_array(self, dtype, offset: int = 0, count: int = -1) -> np.ndarray:
+        return np.frombuffer(self.mm, dtype=dtype, count=count, offset=offset)
+
 
 class MMapRecord:
 
-    def __init__(self, mmap_file: str, offset: int, size: int, mode: MMapMode = MMapMode.READ):
-        if mode == MMapMode.READ:
-            self.mf = MMapReadFileRegistry[mmap_file]
+    # Shares the mapping of the file, mapping it when no other owner did
+    def __init__(self, mmap_file: Union[str, MMapFile], offset: int, size: int, mode: MMapMode = MMapMode.READ):
+        if isinstance(mmap_file, MMapFile):
+            self.mf = mmap_file
+            self.mf.refs += 1
         else:
-            self.mf = MMapWriteFileRegistry[mmap_file]
+            self.mf = MMapFile.acquire(mmap_file, mode)
         self.offset = offset
         self.size = size
+
+    def __del__(self):
+        self.close()
+
+    @property
+    def mm(self) -> MMapFile:
+        return self.mf
+
+    # Same as mm, which returns the MMapFile and not its mmap
+    @property
+    def mfile(self) -> MMapFile:
+        return self.mf
+
+    def close(self):
+        if self.mf is not None:
+            self.mf.release()
+            self.mf = None
+
+    # Returns a numpy view of the record region, count defaults to as many items as fit in the region
+    def as_array(self, dtype, count: Optional[int] = None) -> np.ndarray:
+        dtype = np.dtype(dtype)
+        if count is None:
+            count = self.size // dtype.itemsize
+        assert count * dtype.itemsize <= self.size
+        return self.mf.as_array(dtype, self.offset, count)
@@ -2,13 +2,23 @@
 Design:
     8 byte header for each ring buffer for version and latest index
     8 byte header for each record for sequence
+
+    Single writer, many readers. Sequences start at 1 and record n goes to slot n % size.
+    The writer sets the record sequence to BUSY while it copies the payload and to n once done,
+    then publishes the slot as the latest index. A reader copies the payload between two reads
+    of the sequence and retries when they differ or are BUSY (seqlock), so torn records are never returned.
+    The version is bumped by every new writer so readers can tell a writer restarted.
 """
-import mmap
-import struct
-from typing import Optional
+import sys
+from typing import List, Optional, Tuple
+
+import numpy as np
 
 from pytrading.ipc.mmap import MMapRecord
 
+MAX_READ_RETRIES = 1000
+BUSY = (1 << 64) - 1
+
 
 class RingBuffer:
     def __init__(self, size = 4, record_size = 0, mmrecord: Optional[MMapRecord] = None):
@@ -18,6 +28,20 @@ class RingBuffer:
         self.record_size = record_size
         self.mmrecord = mmrecord
         self.idx = None
+        assert mmrecord.size >= self.itemsize
+        # views over the mapping are built once, reads and writes never seek or go through struct.
+        # The mapping can not be resized while they are alive.
+        mm = mmrecord.mf.mm
+        stride = record_size + 8
+        # word view for scalar header and sequence access when the slots are 8 byte aligned
+        self._words = None
+        if mmrecord.offset % 8 == 0 and stride % 8 == 0 and sys.byteorder == 'little':
+            self._words = memoryview(mm)[mmrecord.offset:mmrecord.offset + self.itemsize].cast('Q')
+        self._stride = stride // 8
+        self._header = np.ndarray((1,), dtype='<u8', buffer=mm, offset=mmrecord.offset)
+        self._sequences = np.ndarray((size,), dtype='<u8', buffer=mm, offset=mmrecord.offset + 8, strides=(stride,))
+        self._records = np.ndarray((size, record_size), dtype=np.uint8, buffer=mm, offset=mmrecord.offset + 16,
+                                   strides=(stride, 1))
 
     @property
     def itemsize(self):
@@ -26,24 +50,191 @@ class RingBuffer:
     def __len__(self):
         return self.size
 
+    def get_header(self):
+        if self._words is not None:
+            return self._words[0]
+        return int(self._header[0])
+
     def get_latest_idx(self):
-        mm: mmap.mmap = self.mmrecord.mf.mm
-        mm.seek(self.mmrecord.offset)
-        b = mm.read(8)
-        i = struct.unpack("<Q", b)[0]
-        idx = i % (1 << 32)
+        i = self.get_header()
+        idx = i & 0xFFFFFFFF
         return idx
 
+    def get_version(self):
+        return self.get_header() >> 32
+
+    def set_header(self, version, idx):
+        self._header[0] = (version << 32) | idx
+
     def get_sequence(self, idx):
-        mm: mmap.mmap = self.mmrecord.mf.mm
-        mm.seek(self.mmrecord.offset + 8 + idx * (self.record_size + 8))
-        b = mm.read(8)
-        i = struct.unpack("<Q", b)[0]
-        return i
+        if self._words is not None:
+            return self._words[1 + idx * self._stride]
+        return int(self._sequences[idx])
+
+    def set_sequence(self, idx, sequence):
+        self._sequences[idx] = sequence
+
+    def get_sequences(self) -> np.ndarray:
+        """Live view of the sequence of every slot"""
+        return self._sequences
+
+    def changed_since(self, sequence) -> np.ndarray:
+        """Slots holding complete records newer than sequence, oldest first"""
+        sequences = self._sequences.copy()
+        idx = np.flatnonzero((sequences > sequence) & (sequences != BUSY))
+        return idx[np.argsort(sequences[idx])]
+
+    def get_record(self, idx) -> bytes:
+        return self._records[idx].tobytes()
+
+    def record_view(self, idx) -> np.ndarray:
+        """Live view of the payload of a slot, check the sequence around any use of it"""
+        return self._records[idx]
+
+    def copy_record(self, idx, out: np.ndarray):
+        out[:] = self._records[idx]
+
+    def set_record(self, idx, data):
+        self._records[idx] = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) \
+            else data.view(np.uint8).reshape(-1)
+
 
 class RecordCacheReader:
-    pass
+
+    def __init__(self, ring: RingBuffer):
+        self.ring = ring
+        # sequence of the last record returned
+        self.sequence = 0
+        # records overwritten by the writer before this reader got to them
+        self.missed = 0
+
+    @property
+    def version(self):
+        return self.ring.get_version()
+
+    def _read(self, idx) -> Tuple[int, Optional[bytes]]:
+        ring = self.ring
+        for _ in range(MAX_READ_RETRIES):
+            s1 = ring.get_sequence(idx)
+            if s1 == 0:
+                return 0, None
+            if s1 == BUSY:
+                continue
+            data = ring.get_record(idx)
+            if ring.get_sequence(idx) == s1:
+                return s1, data
+        return 0, None
+
+    def latest_sequence(self) -> int:
+        ring = self.ring
+        sequence = ring.get_sequence(ring.get_latest_idx())
+        return 0 if sequence == BUSY else sequence
+
+    def latest(self) -> Optional[Tuple[int, bytes]]:
+        """Latest complete record as (sequence, payload), None when nothing was written"""
+        ring = self.ring
+        sequence, data = self._read(ring.get_latest_idx())
+        if data is None:
+            return None
+        self.sequence = max(self.sequence, sequence)
+        return sequence, data
+
+    def read_since(self, sequence: int) -> Optional[Tuple[int, bytes]]:
+        """First record after sequence as (sequence, payload), None when it is not written yet.
+        When the writer lapped the reader the oldest record still in the ring is returned."""
+        target = sequence + 1
+        s, data = self._read(target % self.ring.size)
+        if data is None or s < target:
+            return None
+        if s > target:
+            oldest = max(self.latest_sequence() - self.ring.size + 1, target)
+            s, data = self._read(oldest % self.ring.size)
+            if data is None or s < oldest:
+                return None
+        self.missed += s - target
+        self.sequence = s
+        return s, data
+
+    def read_next(self) -> Optional[Tuple[int, bytes]]:
+        """Next record after the last one returned by this reader"""
+        return self.read_since(self.sequence)
+
+    def has_next(self) -> bool:
+        """True when a record after the last one returned by this reader is published"""
+        s = self.ring.get_sequence((self.sequence + 1) % self.ring.size)
+        return self.sequence < s != BUSY
+
+    def wait_next(self, strategy, timeout_ns: Optional[int] = None) -> Optional[Tuple[int, bytes]]:
+        """Waits for the next record with a pytrading.ipc.wait strategy, None on timeout"""
+        if not strategy.wait(self.has_next, timeout_ns):
+            return None
+        return self.read_next()
+
+    # Copies the record of slot idx into out when its sequence is at least minimum, returns the sequence
+    # (below minimum when nothing was copied, 0 when the slot is empty or keeps changing)
+    def _read_into(self, idx: int, out: np.ndarray, minimum: int) -> int:
+        ring = self.ring
+        for _ in range(MAX_READ_RETRIES):
+            s1 = ring.get_sequence(idx)
+            if s1 == BUSY:
+                continue
+            if s1 < minimum:
+                return s1
+            ring.copy_record(idx, out)
+            if ring.get_sequence(idx) == s1:
+                return s1
+        return 0
+
+    def read_next_into(self, out: np.ndarray) -> int:
+        """Copies the next record into a uint8 array of record_size bytes without allocating,
+        returns its sequence or 0 when it is not written yet, out is left untouched then.
+        When the writer lapped the reader the oldest record still in the ring is copied, like read_since."""
+        ring = self.ring
+        target = self.sequence + 1
+        s = ring.get_sequence(target % ring.size)
+        if s < target or s == BUSY:
+            return 0
+        start = target if s == target else max(self.latest_sequence() - ring.size + 1, target)
+        s = self._read_into(start % ring.size, out, start)
+        if s < start:
+            return 0
+        self.missed += s - target
+        self.sequence = s
+        return s
+
+    def read_all(self) -> List[Tuple[int, bytes]]:
+        """Every complete record newer than the last one returned by this reader, oldest first"""
+        records = []
+        for idx in self.ring.changed_since(self.sequence):
+            sequence, data = self._read(idx)
+            if data is not None and sequence > self.sequence:
+                self.missed += sequence - self.sequence - 1
+                self.sequence = sequence
+                records.append((sequence, data))
+        return records
 
 
 class RecordCacheWriter:
-    pass
\ No newline at end of file
+
+    def __init__(self, ring: RingBuffer, notifier=None):
+        self.ring = ring
+        # signalled after every write, a pytrading.ipc.wait strategy or WaitFanout
+        self.notifier = notifier
+        self.version = (ring.get_version() + 1) % (1 << 32)
+        # a restarted writer continues the sequence of the records already in the ring
+        self.sequence = max((s for s in (ring.get_sequence(i) for i in range(ring.size)) if s != BUSY), default=0)
+        ring.set_header(self.version, ring.get_latest_idx())
+
+    def write(self, data) -> int:
+        """Publishes a record of record_size bytes (any bytes-like object) and returns its sequence"""
+        ring = self.ring
+        sequence = self.sequence + 1
+        idx = sequence % ring.size
+        ring.set_sequence(idx, BUSY)
+        ring.set_record(idx, data)
+        ring.set_sequence(idx, sequence)
+        ring.set_header(self.version, idx)
+        self.sequence = sequence
+        if self.notifier is not None:
+            self.notifier.signal()
+        return sequence
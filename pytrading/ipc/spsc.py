@@ -0,0 +1,177 @@
+"""
+Design:
+    Bounded single-producer single-consumer queue of fixed size records in a shared MMapFile.
+    192 byte header, one cache line each for (magic, capacity, slot size), the head and the tail,
+    so the producer and the consumer never write to the same line, followed by capacity slots.
+
+    head and tail are counters that only grow, slot = counter % capacity (capacity is a power of two).
+    The producer copies a record into slot head and then publishes it by storing head + 1,
+    the consumer copies slot tail out and then frees it by storing tail + 1.
+    Each side caches the other side's counter and reads the shared one only when the cache says full or empty.
+    Stores are 8 byte aligned and x86 keeps stores in program order, so a published slot is always complete.
+    A full queue is reported to the producer (try_push returns False) instead of blocking, the caller decides
+    whether to retry, drop or reject the order.
+
+    Slots are preallocated record views, pushing and popping copy records without creating buffers.
+"""
+from typing import Optional
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapFile, MMapMode
+
+MAGIC = b"PTSPSC01"
+CACHE_LINE = 64
+HEADER_SIZE = 3 * CACHE_LINE
+HEAD = CACHE_LINE // 8
+TAIL = 2 * CACHE_LINE // 8
+
+# commands
+NEW = 1
+CANCEL = 2
+MODIFY = 3
+
+# acknowledgement status
+ACCEPTED = 1
+REJECTED = 2
+CANCELLED = 3
+MODIFIED = 4
+FILLED = 5
+
+BUY = 1
+SELL = -1
+
+order_command_dtype = np.dtype([
+    ('command', '<i4'), ('side', '<i4'), ('request_id', '<u8'), ('order_id', '<u8'), ('timestamp', '<i8'),
+    ('price', '<f8'), ('quantity', '<f8'), ('symbol', 'S32'), ('account', 'S16')
+])
+
+order_ack_dtype = np.dtype([
+    ('status', '<i4'), ('reason', '<i4'), ('request_id', '<u8'), ('order_id', '<u8'), ('timestamp', '<i8'),
+    ('price', '<f8'), ('quantity', '<f8'), ('filled', '<f8'), ('symbol', 'S32')
+])
+
+
+class SPSCQueue:
+
+    # populate prefaults the pages of this side's mapping without rewriting them, the other side may be running
+    def __init__(self, file_path: str, dtype, capacity: int = 1024, populate: bool = False, notifier=None):
+        assert capacity > 0 and capacity & (capacity - 1) == 0, "capacity must be a power of two"
+        self.file_path = file_path
+        self.dtype = np.dtype(dtype)
+        self.mf = MMapFile.acquire(file_path, MMapMode.WRITE, HEADER_SIZE + capacity * self.dtype.itemsize,
+                                   populate=populate)
+        self._header = self.mf.as_array('<i8', 0, 3)
+        if self.mf.mm[:8] != MAGIC:
+            self._header[1] = capacity
+            self._header[2] = self.dtype.itemsize
+            self.mf.mm[:8] = MAGIC
+        assert self._header[1] == capacity and self._header[2] == self.dtype.itemsize
+        self.capacity = capacity
+        self._mask = capacity - 1
+        self._words = memoryview(self.mf.mm)[:HEADER_SIZE].cast('Q')
+        self._slots = self.mf.as_array(self.dtype, HEADER_SIZE, capacity)
+        # 0-d views, fields are assigned in place for structured dtypes and with view[...] = value otherwise
+        self._views = [self._slots[i:i + 1].reshape(()) for i in range(capacity)]
+        # producer side
+        self._head = self._words[HEAD]
+        self._cached_tail = self._words[TAIL]
+        # consumer side
+        self._tail = self._words[TAIL]
+        self._cached_head = self._words[HEAD]
+        # pushes refused because the queue was full
+        self.rejected = 0
+        # signalled after every push, a pytrading.ipc.wait strategy
+        self.notifier = notifier
+
+    def __len__(self) -> int:
+        return self._words[HEAD] - self._words[TAIL]
+
+    def empty(self) -> bool:
+        return self._words[HEAD] == self._words[TAIL]
+
+    def full(self) -> bool:
+        return self._words[HEAD] - self._words[TAIL] >= self.capacity
+
+    # Producer: returns the slot to fill in place before publish, None when the queue is full
+    def claim(self) -> Optional[np.ndarray]:
+        head = self._head
+        if head - self._cached_tail >= self.capacity:
+            self._cached_tail = self._words[TAIL]
+            if head - self._cached_tail >= self.capacity:
+                self.rejected += 1
+                return None
+        return self._views[head & self._mask]
+
+    # Producer: publishes the claimed slot
+    def publish(self):
+        self._head += 1
+        self._words[HEAD] = self._head
+        if self.notifier is not None:
+            self.notifier.signal()
+
+    # Producer: copies a record in, returns False when the queue is full
+    def try_push(self, record) -> bool:
+        slot = self.claim()
+        if slot is None:
+            return False
+        slot[...] = record
+        self.publish()
+        return True
+
+    # Consumer: returns the next slot to read in place before advance, None when the queue is empty
+    def peek(self) -> Optional[np.ndarray]:
+        tail = self._tail
+        if tail == self._cached_head:
+            self._cached_head = self._words[HEAD]
+            if tail == self._cached_head:
+                return None
+        return self._views[tail & self._mask]
+
+    # Consumer: frees the peeked slot
+    def advance(self):
+        self._tail += 1
+        self._words[TAIL] = self._tail
+
+    # Consumer: copies the next record into out[index], returns False when the queue is empty
+    def try_pop(self, out: np.ndarray, index: int = 0) -> bool:
+        slot = self.peek()
+        if slot is None:
+            return False
+        out[index] = slot
+        self.advance()
+        return True
+
+    # Consumer: copies up to len(out) records into out and returns their number
+    def pop_many(self, out: np.ndarray) -> int:
+        tail = self._tail
+        self._cached_head = self._words[HEAD]
+        n = min(self._cached_head - tail, len(out))
+        if n <= 0:
+            return 0
+        start = tail & self._mask
+        first = min(n, self.capacity - start)
+        out[:first] = self._slots[start:start + first]
+        out[first:n] = self._slots[:n - first]
+        self._tail = tail + n
+        self._words[TAIL] = self._tail
+        return n
+
+    def close(self):
+        self._views = self._slots = self._header = None
+        self._words.release()
+        self.mf.release()
+        self.mf = None
+
+
+class OrderChannel:
+    """Order flow between a strategy and a gateway: the strategy pushes commands and pops acknowledgements,
+    the gateway pops commands and pushes acknowledgements"""
+
+    def __init__(self, file_path: str, capacity: int = 1024, populate: bool = False):
+        self.commands = SPSCQueue(file_path + ".cmd", order_command_dtype, capacity, populate)
+        self.acks = SPSCQueue(file_path + ".ack", order_ack_dtype, capacity, populate)
+
+    def close(self):
+        self.commands.close()
+        self.acks.close()
@@ -0,0 +1,275 @@
+"""
+Design:
+    A reader waits for a predicate (usually "the next record is published") with one of:
+        BusySpinWait     polls without pause, lowest latency, burns a dedicated core
+        SpinYieldWait    polls, then yields the cpu between polls
+        BackoffWait      polls, yields, then sleeps with a doubling sleep up to a maximum
+        EventfdWait      blocks on an eventfd the writer signals, shared with processes forked after creation
+        PipeWait         blocks on a named FIFO the writer signals, any process can open it by path
+
+    Every strategy records the wake-up latency of successful waits in a WaitStats.
+    Polling strategies measure the time since the last failed poll, an upper bound of how late the record
+    was noticed. Blocking strategies measure the time since the writer signalled, the writer puts its
+    monotonic clock in the signal (CLOCK_MONOTONIC is shared by every process of the host).
+    A blocking strategy wakes one reader, a writer with many readers signals them through a WaitFanout.
+"""
+import mmap
+import os
+import select
+import struct
+import time
+from typing import Callable, Dict, Optional
+
+import numpy as np
+
+Predicate = Callable[[], bool]
+
+sched_yield = getattr(os, "sched_yield", lambda: time.sleep(0))
+
+
+class WaitStats:
+
+    def __init__(self, capacity: int = 65536):
+        self.samples = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+        self.timeouts = 0
+
+    def __len__(self) -> int:
+        return min(self.count, len(self.samples))
+
+    def add(self, latency_ns: int):
+        self.samples[self.count % len(self.samples)] = latency_ns
+        self.count += 1
+
+    # Latencies of the most recent waits, in no particular order
+    def latencies(self) -> np.ndarray:
+        return self.samples[:len(self)]
+
+    def percentile(self, q: float) -> float:
+        if len(self) == 0:
+            return 0.0
+        return float(np.percentile(self.latencies(), q))
+
+    def summary(self) -> Dict[str, float]:
+        latencies = self.latencies()
+        if len(latencies) == 0:
+            return {"count": self.count, "timeouts": self.timeouts}
+        p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9])
+        return {"count": self.count, "timeouts": self.timeouts, "mean": float(latencies.mean()),
+                "p50": float(p50), "p99": float(p99), "p99.9": float(p999), "max": float(latencies.max())}
+
+    def reset(self):
+        self.count = 0
+        self.timeouts = 0
+
+
+class WaitStrategy:
+
+    def __init__(self, stats_capacity: int = 65536):
+        self.stats = WaitStats(stats_capacity)
+
+    # Returns True once predicate() holds, False when timeout_ns elapsed first, waits forever by default
+    def wait(self, predicate: Predicate, timeout_ns: Optional[int] = None) -> bool:
+        raise NotImplementedError
+
+    # Called by the writer after publishing
+    def signal(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class BusySpinWait(WaitStrategy):
+
+    def wait(self, predicate: Predicate, timeout_ns: Optional[int] = None) -> bool:
+        now = time.monotonic_ns
+        deadline = None if timeout_ns is None else now() + timeout_ns
+        last = now()
+        while not predicate():
+            last = now()
+            if deadline is not None and last >= deadline:
+                self.stats.timeouts += 1
+                return False
+        self.stats.add(now() - last)
+        return True
+
+
+class SpinYieldWait(WaitStrategy):
+
+    def __init__(self, spins: int = 1000, stats_capacity: int = 65536):
+        super().__init__(stats_capacity)
+        self.spins = spins
+
+    def wait(self, predicate: Predicate, timeout_ns: Optional[int] = None) -> bool:
+        now = time.monotonic_ns
+        deadline = None if timeout_ns is None else now() + timeout_ns
+        last = now()
+        n = 0
+        while not predicate():
+            n += 1
+            if n > self.spins:
+                sched_yield()
+            last = now()
+            if deadline is not None and last >= deadline:
+                self.stats.timeouts += 1
+                return False
+        self.stats.add(now() - last)
+        return True
+
+
+class BackoffWait(WaitStrategy):
+
+    def __init__(self, spins: int = 100, yields: int = 100, min_sleep_ns: int = 1_000, max_sleep_ns: int = 1_000_000,
+                 stats_capacity: int = 65536):
+        super().__init__(stats_capacity)
+        self.spins = spins
+        self.yields = yields
+        self.min_sleep_ns = min_sleep_ns
+        self.max_sleep_ns = max_sleep_ns
+
+    def wait(self, predicate: Predicate, timeout_ns: Optional[int] = None) -> bool:
+        now = time.monotonic_ns
+        deadline = None if timeout_ns is None else now() + timeout_ns
+        last = now()
+        n = 0
+        sleep_ns = self.min_sleep_ns
+        while not predicate():
+            n += 1
+            if n > self.spins + self.yields:
+                if deadline is not None:
+                    sleep_ns = min(sleep_ns, max(deadline - last, 0))
+                time.sleep(sleep_ns / 1e9)
+                sleep_ns = min(sleep_ns * 2, self.max_sleep_ns)
+            elif n > self.spins:
+                sched_yield()
+            last = now()
+            if deadline is not None and last >= deadline:
+                self.stats.timeouts += 1
+                return False
+        self.stats.add(now() - last)
+        return True
+
+
+class BlockingWait(WaitStrategy):
+    """Blocks on a file descriptor the writer makes readable, the predicate is checked before every block
+    so a signal sent before the reader blocked is never lost"""
+
+    fd = -1
+    _poller = None
+
+    # Reads every pending signal and returns the writer time of the oldest, 0 when unknown
+    def _drain(self) -> int:
+        raise NotImplementedError
+
+    def wait(self, predicate: Predicate, timeout_ns: Optional[int] = None) -> bool:
+        now = time.monotonic_ns
+        deadline = None if timeout_ns is None else now() + timeout_ns
+        signalled = 0
+        poller = self._poller
+        if poller is None:
+            poller = self._poller = select.poll()
+            poller.register(self.fd, select.POLLIN)
+        while not predicate():
+            if deadline is None:
+                timeout_ms = None
+            else:
+                remaining = deadline - now()
+                if remaining <= 0:
+                    self.stats.timeouts += 1
+                    return False
+                timeout_ms = (remaining + 999_999) // 1_000_000
+            if poller.poll(timeout_ms):
+                signalled = self._drain() or signalled
+        # signals of the data seen now would wake the next wait at once with their stale time
+        self._drain()
+        if signalled:
+            self.stats.add(now() - signalled)
+        return True
+
+
+class EventfdWait(BlockingWait):
+    """Linux only. The writer time of the oldest pending signal sits in a shared anonymous page,
+    processes forked after creation share both the eventfd and the page."""
+
+    def __init__(self, stats_capacity: int = 65536):
+        super().__init__(stats_capacity)
+        self.fd = os.eventfd(0, os.EFD_NONBLOCK)
+        self._page = mmap.mmap(-1, mmap.PAGESIZE)
+        self._signalled = np.frombuffer(self._page, dtype=np.int64, count=1)
+
+    def signal(self):
+        if self._signalled[0] == 0:
+            self._signalled[0] = time.monotonic_ns()
+        os.eventfd_write(self.fd, 1)
+
+    def _drain(self) -> int:
+        try:
+            os.eventfd_read(self.fd)
+        except BlockingIOError:
+            return 0
+        signalled = int(self._signalled[0])
+        self._signalled[0] = 0
+        return signalled
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self._poller = None
+        self._signalled = None
+
+
+class PipeWait(BlockingWait):
+    """Named FIFO carrying the writer time of every signal. Both ends open it read-write so neither open
+    blocks and the FIFO never reports end of file. A full FIFO drops signals, the reader has pending ones."""
+
+    SIGNAL = struct.Struct("<q")
+
+    def __init__(self, path: str, stats_capacity: int = 65536):
+        super().__init__(stats_capacity)
+        self.path = path
+        if not os.path.exists(path):
+            os.mkfifo(path)
+        self.fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+
+    def signal(self):
+        try:
+            os.write(self.fd, self.SIGNAL.pack(time.monotonic_ns()))
+        except BlockingIOError:
+            pass
+
+    def _drain(self) -> int:
+        signalled = 0
+        while True:
+            try:
+                data = os.read(self.fd, 4096)
+            except BlockingIOError:
+                return signalled
+            if not signalled and len(data) >= self.SIGNAL.size:
+                signalled = self.SIGNAL.unpack_from(data)[0]
+            if len(data) < 4096:
+                return signalled
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self._poller = None
+
+
+class WaitFanout:
+    """Signals every reader of a writer"""
+
+    def __init__(self, *strategies: WaitStrategy):
+        self.strategies = list(strategies)
+
+    def add(self, strategy: WaitStrategy):
+        self.strategies.append(strategy)
+
+    def remove(self, strategy: WaitStrategy):
+        self.strategies.remove(strategy)
+
+    def signal(self):
+        for strategy in self.strategies:
+            strategy.signal()
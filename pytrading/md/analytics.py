@@ -0,0 +1,144 @@
+from typing import Tuple, Union
+
+import numpy as np
+from numba import njit
+
+from pytrading.md.lob import LOB, FixedLOB
+
+# All kernels take the levels of a side in the LOB layout (top of book at index size - 1)
+
+
+# This function returns the arrays of a LOB or FixedLOB in the argument order of the kernels
+def book_arrays(book: Union[LOB, FixedLOB]) -> Tuple[np.ndarray, np.ndarray, int, np.ndarray, np.ndarray, int]:
+    if isinstance(book, LOB):
+        return (book.bids.underlying(), book.bid_volumes.underlying(), book.bid_size,
+                book.asks.underlying(), book.ask_volumes.underlying(), book.ask_size)
+    return book.bids, book.bid_volumes, book.bid_size, book.asks, book.ask_volumes, book.ask_size
+
+
+# This function returns the fields of fix_lob_factory records in the argument order of the batched kernels
+def records_arrays(records: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    return (records['bids'], records['bids_volume'], records['bid_size'],
+            records['asks'], records['asks_volume'], records['ask_size'])
+
+
+# This function returns the size weighted mid of the top of book
+@njit
+def microprice(bids: np.ndarray, bid_volumes: np.ndarray, bid_size: int, asks: np.ndarray,
+               ask_volumes: np.ndarray, ask_size: int) -> float:
+    if bid_size == 0 or ask_size == 0:
+        return np.nan
+    bid_volume = bid_volumes[bid_size - 1]
+    ask_volume = ask_volumes[ask_size - 1]
+    total = bid_volume + ask_volume
+    if total <= 0:
+        return (bids[bid_size - 1] + asks[ask_size - 1]) * 0.5
+    return (bids[bid_size - 1] * ask_volume + asks[ask_size - 1] * bid_volume) / total
+
+
+# This function returns the sum of the top depth volumes of a side
+@njit
+def depth_volume(volumes: np.ndarray, size: int, depth: int) -> float:
+    total = 0.0
+    for i in range(max(size - depth, 0), size):
+        total += volumes[i]
+    return total
+
+
+# This function returns (bid volume - ask volume) / (bid volume + ask volume) over the top depth levels
+@njit
+def imbalance(bid_volumes: np.ndarray, bid_size: int, ask_volumes: np.ndarray, ask_size: int,
+              depth: int = 1) -> float:
+    bid_volume = depth_volume(bid_volumes, bid_size, depth)
+    ask_volume = depth_volume(ask_volumes, ask_size, depth)
+    total = bid_volume + ask_volume
+    if total <= 0:
+        return np.nan
+    return (bid_volume - ask_volume) / total
+
+
+# This function returns the volume weighted price of the top depth levels of both sides
+@njit
+def weighted_mid(bids: np.ndarray, bid_volumes: np.ndarray, bid_size: int, asks: np.ndarray,
+                 ask_volumes: np.ndarray, ask_size: int, depth: int = 5) -> float:
+    notional = 0.0
+    volume = 0.0
+    for i in range(max(bid_size - depth, 0), bid_size):
+        notional += bids[i] * bid_volumes[i]
+        volume += bid_volumes[i]
+    for i in range(max(ask_size - depth, 0), ask_size):
+        notional += asks[i] * ask_volumes[i]
+        volume += ask_volumes[i]
+    if volume <= 0:
+        return np.nan
+    return notional / volume
+
+
+# This function returns the average price to fill a quantity against a side, nan if the side is too thin
+@njit
+def cost_to_fill(prices: np.ndarray, volumes: np.ndarray, size: int, quantity: float) -> float:
+    if quantity <= 0:
+        return np.nan
+    remaining = quantity
+    notional = 0.0
+    for i in range(size - 1, -1, -1):
+        filled = min(volumes[i], remaining)
+        notional += filled * prices[i]
+        remaining -= filled
+        if remaining <= 0:
+            return notional / quantity
+    return np.nan
+
+
+# This function returns the absolute distance between the average fill price and the top of book
+@njit
+def slippage(prices: np.ndarray, volumes: np.ndarray, size: int, quantity: float) -> float:
+    if size == 0:
+        return np.nan
+    return abs(cost_to_fill(prices, volumes, size, quantity) - prices[size - 1])
+
+
+# This function writes the slippage of each quantity to out
+@njit
+def slippage_curve(prices: np.ndarray, volumes: np.ndarray, size: int, quantities: np.ndarray, out: np.ndarray):
+    for i in range(len(quantities)):
+        out[i] = slippage(prices, volumes, size, quantities[i])
+
+
+# This function writes the microprice of each book to out
+@njit
+def batch_microprice(bids: np.ndarray, bid_volumes: np.ndarray, bid_sizes: np.ndarray, asks: np.ndarray,
+                     ask_volumes: np.ndarray, ask_sizes: np.ndarray, out: np.ndarray):
+    for i in range(len(out)):
+        out[i] = microprice(bids[i], bid_volumes[i], bid_sizes[i], asks[i], ask_volumes[i], ask_sizes[i])
+
+
+# This function writes the imbalance of each book to out
+@njit
+def batch_imbalance(bids: np.ndarray, bid_volumes: np.ndarray, bid_sizes: np.ndarray, asks: np.ndarray,
+                    ask_volumes: np.ndarray, ask_sizes: np.ndarray, depth: int, out: np.ndarray):
+    for i in range(len(out)):
+        out[i] = imbalance(bid_volumes[i], bid_sizes[i], ask_volumes[i], ask_sizes[i], depth)
+
+
+# This function writes the weighted mid of each book to out
+@njit
+def batch_weighted_mid(bids: np.ndarray, bid_volumes: np.ndarray, bid_sizes: np.ndarray, asks: np.ndarray,
+                       ask_volumes: np.ndarray, ask_sizes: np.ndarray, depth: int, out: np.ndarray):
+    for i in range(len(out)):
+        out[i] = weighted_mid(bids[i], bid_volumes[i], bid_sizes[i], asks[i], ask_volumes[i], ask_sizes[i], depth)
+
+
+# This function writes the average price to fill a quantity against one side of each book to out
+@njit
+def batch_cost_to_fill(prices: np.ndarray, volumes: np.ndarray, sizes: np.ndarray, quantity: float,
+                       out: np.ndarray):
+    for i in range(len(out)):
+        out[i] = cost_to_fill(prices[i], volumes[i], sizes[i], quantity)
+
+
+# This function writes the slippage of a quantity against one side of each book to out
+@njit
+def batch_slippage(prices: np.ndarray, volumes: np.ndarray, sizes: np.ndarray, quantity: float, out: np.ndarray):
+    for i in range(len(out)):
+        out[i] = slippage(prices[i], volumes[i], sizes[i], quantity)
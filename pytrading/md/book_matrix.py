@@ -0,0 +1,164 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapRecord
+from pytrading.md.lob import LOB, FixedLOB, copy_levels, fix_lob_factory
+
+
+# This class stores the books of many symbols in one contiguous array of fix_lob_factory records
+class BookMatrix:
+
+    # This function initializes the store with symbols, a book depth and a row capacity
+    def __init__(self, symbols: Iterable[str] = (), size: int = 32, capacity: int = 64, records=None):
+        self.size = size
+        self.record_dtype = fix_lob_factory(size)
+        self._symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._external = records is not None
+        if records is None:
+            self._records = np.zeros(max(capacity, 1), dtype=self.record_dtype)
+        else:
+            assert records.dtype == self.record_dtype
+            self._records = records
+        for symbol in symbols:
+            self.add_symbol(symbol)
+
+    # This function creates a store over a memory-mapped region without copying, capacity is fixed by the region
+    @classmethod
+    def from_mmap(cls, mmrecord: MMapRecord, symbols: Iterable[str] = (), size: int = 32) -> 'BookMatrix':
+        return cls(symbols, size, records=mmrecord.as_array(fix_lob_factory(size)))
+
+    # This function returns the number of symbols
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._index
+
+    def __str__(self):
+        return f"BookMatrix(symbols={len(self)}, size={self.size})"
+
+    # This property returns the symbols in row order
+    @property
+    def symbols(self) -> List[str]:
+        return self._symbols
+
+    # This property returns the capacity of the store
+    @property
+    def capacity(self) -> int:
+        return len(self._records)
+
+    # This property returns the records of all symbols
+    @property
+    def records(self) -> np.ndarray:
+        return self._records[:len(self._symbols)]
+
+    # This function adds a symbol and returns its row, growing the store invalidates existing views
+    def add_symbol(self, symbol: str) -> int:
+        if symbol in self._index:
+            return self._index[symbol]
+        row = len(self._symbols)
+        if row == len(self._records):
+            assert not self._external, "store over external records is full"
+            records = np.zeros(max(row + 1, int(row * 1.5)), dtype=self.record_dtype)
+            records[:row] = self._records
+            self._records = records
+        self._symbols.append(symbol)
+        self._index[symbol] = row
+        return row
+
+    # This function returns the row of a symbol
+    def row(self, symbol: str) -> int:
+        return self._index[symbol]
+
+    # This function returns the rows of many symbols
+    def rows(self, symbols: Iterable[str]) -> np.ndarray:
+        return np.fromiter((self._index[s] for s in symbols), dtype=np.int64)
+
+    # This function returns a FixedLOB sharing the memory of a symbol row
+    def view(self, symbol: str) -> FixedLOB:
+        row = self._index[symbol]
+        return FixedLOB(symbol, self.size, record=self._records[row:row + 1])
+
+    # This function writes whole records for many rows at once
+    def update(self, rows: np.ndarray, records: np.ndarray):
+        self._records[rows] = records
+
+    # This function writes levels for many rows at once, level arrays have shape (len(rows), size)
+    def update_levels(self, rows: np.ndarray, bids: np.ndarray, bids_volume: np.ndarray, bid_sizes: np.ndarray,
+                      asks: np.ndarray, asks_volume: np.ndarray, ask_sizes: np.ndarray,
+                      timestamps: Optional[np.ndarray] = None, sequences: Optional[np.ndarray] = None):
+        records = self._records
+        records['bids'][rows] = bids
+        records['bids_volume'][rows] = bids_volume
+        records['bid_size'][rows] = bid_sizes
+        records['asks'][rows] = asks
+        records['asks_volume'][rows] = asks_volume
+        records['ask_size'][rows] = ask_sizes
+        if timestamps is not None:
+            records['timestamp'][rows] = timestamps
+        if sequences is not None:
+            records['sequence'][rows] = sequences
+
+    # This function copies the top levels of a LOB into the row of its symbol
+    def update_from_lob(self, lob: LOB, symbol: Optional[str] = None):
+        record = self._records[self.add_symbol(symbol or lob.symbol)]
+        record['bid_size'] = copy_levels(lob.bids.underlying(), lob.bid_volumes.underlying(), lob.bid_size,
+                                         record['bids'], record['bids_volume'])
+        record['ask_size'] = copy_levels(lob.asks.underlying(), lob.ask_volumes.underlying(), lob.ask_size,
+                                         record['asks'], record['asks_volume'])
+        record['timestamp'] = lob.timestamp
+        record['sequence'] = lob.sequence
+
+    # This function copies the top levels of many LOBs
+    def update_from_lobs(self, lobs: Iterable[LOB]):
+        for lob in lobs:
+            self.update_from_lob(lob)
+
+    # This function returns the top of book value of a field for each row, nan if the side is empty
+    def _top(self, field: str, size_field: str) -> np.ndarray:
+        records = self.records
+        sizes = records[size_field]
+        values = records[field][np.arange(len(records)), np.maximum(sizes - 1, 0)]
+        return np.where(sizes > 0, values, np.nan)
+
+    # This function returns the sum of the top n volumes for each row
+    def _depth(self, field: str, size_field: str, n: int) -> np.ndarray:
+        records = self.records
+        sizes = records[size_field][:, None]
+        idx = np.arange(self.size)[None, :]
+        mask = (idx < sizes) & (idx >= sizes - n)
+        return np.where(mask, records[field], 0.0).sum(axis=1)
+
+    # This function returns the best bid of every symbol
+    def best_bid(self) -> np.ndarray:
+        return self._top('bids', 'bid_size')
+
+    # This function returns the best ask of every symbol
+    def best_ask(self) -> np.ndarray:
+        return self._top('asks', 'ask_size')
+
+    # This function returns the best bid volume of every symbol
+    def best_bid_volume(self) -> np.ndarray:
+        return self._top('bids_volume', 'bid_size')
+
+    # This function returns the best ask volume of every symbol
+    def best_ask_volume(self) -> np.ndarray:
+        return self._top('asks_volume', 'ask_size')
+
+    # This function returns the spread of every symbol
+    def spread(self) -> np.ndarray:
+        return self.best_ask() - self.best_bid()
+
+    # This function returns the mid price of every symbol
+    def mid(self) -> np.ndarray:
+        return (self.best_ask() + self.best_bid()) * 0.5
+
+    # This function returns the bid volume of the top n levels of every symbol
+    def bid_depth(self, n: int) -> np.ndarray:
+        return self._depth('bids_volume', 'bid_size', n)
+
+    # This function returns the ask volume of the top n levels of every symbol
+    def ask_depth(self, n: int) -> np.ndarray:
+        return self._depth('asks_volume', 'ask_size', n)
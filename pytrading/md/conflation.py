@@ -0,0 +1,113 @@
+import asyncio
+import time
+from typing import Callable, Iterable, List, Optional
+
+import numpy as np
+
+from pytrading.md.book_matrix import BookMatrix
+from pytrading.md.lob import LOB, FixedLOB
+
+# Called with the symbols and a copy of their fix_lob_factory records
+SnapshotCallback = Callable[[List[str], np.ndarray], None]
+
+
+# This class represents a consumer that receives at most one snapshot per dirty symbol per interval
+class ConflatedConsumer:
+
+    # This function initializes the consumer with a callback, an interval and an optional symbol filter
+    def __init__(self, callback: SnapshotCallback, interval_ns: int, rows: Optional[np.ndarray] = None):
+        self.callback = callback
+        self.interval_ns = interval_ns
+        self.rows = rows
+        self.next_due = 0
+        self.seen = np.zeros(0, dtype=np.int64)
+        self.emitted = 0
+
+    # This function emits the rows whose version moved since the last emission
+    def _emit(self, matrix: BookMatrix, versions: np.ndarray, now_ns: int) -> int:
+        self.next_due = now_ns + self.interval_ns
+        n = len(matrix)
+        if len(self.seen) < n:
+            seen = np.zeros(len(versions), dtype=np.int64)
+            seen[:len(self.seen)] = self.seen
+            self.seen = seen
+        if self.rows is None:
+            rows = np.flatnonzero(versions[:n] != self.seen[:n])
+        else:
+            rows = self.rows[versions[self.rows] != self.seen[self.rows]]
+        if len(rows) == 0:
+            return 0
+        self.seen[rows] = versions[rows]
+        symbols = matrix.symbols
+        self.callback([symbols[row] for row in rows], matrix.records[rows])
+        self.emitted += len(rows)
+        return len(rows)
+
+
+# This class conflates book updates of many symbols into periodic top-N FixedLOB-format snapshots
+class BookConflator:
+
+    # This function initializes the conflator with a book depth and a symbol capacity
+    def __init__(self, size: int = 32, capacity: int = 64):
+        self.matrix = BookMatrix(size=size, capacity=capacity)
+        self._versions = np.zeros(self.matrix.capacity, dtype=np.int64)
+        self._consumers: List[ConflatedConsumer] = []
+
+    # This function returns the row of a symbol, adding it when needed
+    def _row(self, symbol: str) -> int:
+        row = self.matrix.add_symbol(symbol)
+        if row >= len(self._versions):
+            versions = np.zeros(self.matrix.capacity, dtype=np.int64)
+            versions[:len(self._versions)] = self._versions
+            self._versions = versions
+        return row
+
+    # This function copies the top levels of a LOB and marks its symbol dirty
+    def update(self, lob: LOB):
+        row = self._row(lob.symbol)
+        self.matrix.update_from_lob(lob)
+        self._versions[row] += 1
+
+    # This function copies a FixedLOB of the same depth and marks its symbol dirty
+    def update_fixed(self, lob: FixedLOB):
+        row = self._row(lob.symbol)
+        self.matrix.update(np.array([row]), lob.record)
+        self._versions[row] += 1
+
+    # This function marks a symbol dirty after its matrix row was written directly
+    def mark_dirty(self, symbol: str):
+        self._versions[self._row(symbol)] += 1
+
+    # This function registers a consumer receiving snapshots every interval_ns, for all symbols by default
+    def add_consumer(self, callback: SnapshotCallback, interval_ns: int,
+                     symbols: Optional[Iterable[str]] = None) -> ConflatedConsumer:
+        rows = None
+        if symbols is not None:
+            rows = np.array([self._row(symbol) for symbol in symbols], dtype=np.int64)
+        consumer = ConflatedConsumer(callback, interval_ns, rows)
+        self._consumers.append(consumer)
+        return consumer
+
+    # This function removes a consumer
+    def remove_consumer(self, consumer: ConflatedConsumer):
+        self._consumers.remove(consumer)
+
+    # This function emits snapshots to every consumer whose interval elapsed and returns the number of snapshots
+    def poll(self, now_ns: Optional[int] = None) -> int:
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
+        n = 0
+        for consumer in self._consumers:
+            if now_ns >= consumer.next_due:
+                n += consumer._emit(self.matrix, self._versions, now_ns)
+        return n
+
+    # This function polls until cancelled, sleeping until the next consumer is due
+    async def run(self):
+        while True:
+            self.poll()
+            if self._consumers:
+                wait_ns = min(consumer.next_due for consumer in self._consumers) - time.monotonic_ns()
+            else:
+                wait_ns = 1_000_000
+            await asyncio.sleep(max(wait_ns, 0) / 1e9)
@@ -1,18 +1,62 @@
-from operator import itemgetter
-from typing import List, Tuple
+from typing import List, Sequence, Tuple, Union
 
 import numpy as np
 from numba import njit
 
 from pytrading.container.array import ResizableArray
+from pytrading.ipc.mmap import MMapRecord
+from pytrading.md.parser import as_bytes, as_chars, count_json_levels, find_json_array, load_levels, \
+    parse_json_levels, parse_string_levels, sort_levels
 
 
-# This function uses numba to speed up the appending of values to two arrays
+# This function returns the position of a price in the first size elements of a sorted side
 @njit
-def bulk_append(arr1: np.ndarray, arr2: np.ndarray, values: List[Tuple[float, float]]):
-    for i in range(len(values)):
-        arr1[i] = values[i][0]
-        arr2[i] = values[i][1]
+def search_level(prices: np.ndarray, size: int, price: float, ascending: bool) -> int:
+    lo = 0
+    hi = size
+    while lo < hi:
+        mid = (lo + hi) >> 1
+        if ascending:
+            before = prices[mid] < price
+        else:
+            before = prices[mid] > price
+        if before:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+# This function sets (or removes when volume is 0) a price level and returns the new side size
+@njit
+def set_level(prices: np.ndarray, volumes: np.ndarray, size: int, price: float, volume: float,
+              ascending: bool) -> int:
+    i = search_level(prices, size, price, ascending)
+    if i < size and prices[i] == price:
+        if volume > 0:
+            volumes[i] = volume
+            return size
+        for j in range(i, size - 1):
+            prices[j] = prices[j + 1]
+            volumes[j] = volumes[j + 1]
+        return size - 1
+    if volume <= 0:
+        return size
+    for j in range(size, i, -1):
+        prices[j] = prices[j - 1]
+        volumes[j] = volumes[j - 1]
+    prices[i] = price
+    volumes[i] = volume
+    return size + 1
+
+
+# This function applies a whole message of level deltas to one side and returns the new side size
+@njit
+def bulk_set_levels(prices: np.ndarray, volumes: np.ndarray, size: int, delta_prices: np.ndarray,
+                    delta_volumes: np.ndarray, ascending: bool) -> int:
+    for k in range(len(delta_prices)):
+        size = set_level(prices, volumes, size, delta_prices[k], delta_volumes[k], ascending)
+    return size
 
 
 # This class represents a Limit Order Book (LOB)
@@ -27,6 +71,8 @@ class LOB:
         self.ask_volumes = ResizableArray(np.float64, capacity)
         self.timestamp = 0
         self.sequence = 0
+        self._delta_prices = np.empty(capacity, dtype=np.float64)
+        self._delta_volumes = np.empty(capacity, dtype=np.float64)
 
     # This property returns the size of the bid array
     @property
@@ -42,27 +88,170 @@ class LOB:
     def __str__(self):
         return f"LOB({self.symbol}: bid size={self.bid_size}, ask size={self.ask_size}))"
 
+    # This function returns the price array, the volume array and the sort order of a side
+    def _side(self, bid: bool) -> Tuple[ResizableArray, ResizableArray, bool]:
+        if bid:
+            # top bid put at end, ascending order
+            return self.bids, self.bid_volumes, True
+        # top ask put at end, descending order
+        return self.asks, self.ask_volumes, False
+
+    # This function returns scratch arrays holding at least n parsed deltas
+    def _scratch(self, n: int) -> Tuple[np.ndarray, np.ndarray]:
+        if len(self._delta_prices) < n:
+            self._delta_prices = np.empty(max(n, 2 * len(self._delta_prices)), dtype=np.float64)
+            self._delta_volumes = np.empty(len(self._delta_prices), dtype=np.float64)
+        return self._delta_prices, self._delta_volumes
+
+    # This function replaces a side with (price, volume) rows
+    def _snapshot(self, bid: bool, levels: np.ndarray):
+        prices, volumes, ascending = self._side(bid)
+        n = len(levels)
+        prices.reserve(n)
+        volumes.reserve(n)
+        load_levels(levels, prices.underlying(), volumes.underlying(), ascending)
+        prices.resize(n)
+        volumes.resize(n)
+
+    # This function replaces a side with levels of decimal strings
+    def _snapshot_raw(self, bid: bool, levels):
+        prices, volumes, ascending = self._side(bid)
+        chars = as_chars(levels)
+        n = len(chars)
+        prices.reserve(n)
+        volumes.reserve(n)
+        parse_string_levels(chars, prices.underlying(), volumes.underlying())
+        sort_levels(prices.underlying(), volumes.underlying(), n, ascending)
+        prices.resize(n)
+        volumes.resize(n)
+
+    # This function replaces a side with the JSON levels in buf[start:end]
+    def _snapshot_json(self, bid: bool, buf: np.ndarray, start: int, end: int):
+        prices, volumes, ascending = self._side(bid)
+        n = count_json_levels(buf, start, end)
+        prices.reserve(n)
+        volumes.reserve(n)
+        n = parse_json_levels(buf, start, end, prices.underlying(), volumes.underlying())
+        sort_levels(prices.underlying(), volumes.underlying(), n, ascending)
+        prices.resize(n)
+        volumes.resize(n)
+
+    # This function applies level deltas to a side, a volume of 0 removes the level
+    def _delta(self, bid: bool, delta_prices: np.ndarray, delta_volumes: np.ndarray):
+        prices, volumes, ascending = self._side(bid)
+        size = prices.size
+        prices.reserve(size + len(delta_prices))
+        volumes.reserve(size + len(delta_prices))
+        size = bulk_set_levels(prices.underlying(), volumes.underlying(), size, delta_prices, delta_volumes,
+                               ascending)
+        prices.resize(size)
+        volumes.resize(size)
+
+    # This function applies level deltas of decimal strings to a side
+    def _delta_raw(self, bid: bool, levels):
+        chars = as_chars(levels)
+        n = len(chars)
+        delta_prices, delta_volumes = self._scratch(n)
+        parse_string_levels(chars, delta_prices, delta_volumes)
+        self._delta(bid, delta_prices[:n], delta_volumes[:n])
+
+    # This function applies the JSON level deltas in buf[start:end] to a side
+    def _delta_json(self, bid: bool, buf: np.ndarray, start: int, end: int):
+        delta_prices, delta_volumes = self._scratch(count_json_levels(buf, start, end))
+        n = parse_json_levels(buf, start, end, delta_prices, delta_volumes)
+        self._delta(bid, delta_prices[:n], delta_volumes[:n])
+
     # This function updates the bid snapshot with a list of tuples
     def bid_snapshot_update(self, arr: List[Tuple[float, float]]):
-        self.bids.clear()
-        self.bids.resize(len(arr))
-        self.bid_volumes.clear()
-        self.bid_volumes.resize(len(arr))
-        # top bid put at end, ascending order
-        arr.sort(key=itemgetter(0))
-        bulk_append(self.bids.underlying(), self.bid_volumes.underlying(), arr)
+        self._snapshot(True, np.asarray(arr, dtype=np.float64).reshape(-1, 2))
 
     # This function updates the ask snapshot with a list of tuples
     def ask_snapshot_update(self, arr: List[Tuple[float, float]]):
-        self.asks.clear()
-        self.asks.resize(len(arr))
-        self.ask_volumes.clear()
-        self.ask_volumes.resize(len(arr))
-        # top ask put at end, descending order
-        arr.sort(key=itemgetter(0), reverse=True)
-        bulk_append(self.asks.underlying(), self.ask_volumes.underlying(), arr)
+        self._snapshot(False, np.asarray(arr, dtype=np.float64).reshape(-1, 2))
 
+    # This function updates the bid snapshot with decoded exchange levels such as [["price", "qty"], ...]
+    def bid_snapshot_update_raw(self, levels: Union[Sequence[Sequence[str]], np.ndarray]):
+        self._snapshot_raw(True, levels)
 
+    # This function updates the ask snapshot with decoded exchange levels such as [["price", "qty"], ...]
+    def ask_snapshot_update_raw(self, levels: Union[Sequence[Sequence[str]], np.ndarray]):
+        self._snapshot_raw(False, levels)
+
+    # This function updates both snapshots from the level arrays of a raw JSON message
+    def snapshot_update_json(self, payload: Union[bytes, str], bids_key: bytes = b"bids", asks_key: bytes = b"asks"):
+        buf = as_bytes(payload)
+        start, end = find_json_array(buf, as_bytes(bids_key))
+        if start >= 0:
+            self._snapshot_json(True, buf, start, end)
+        start, end = find_json_array(buf, as_bytes(asks_key))
+        if start >= 0:
+            self._snapshot_json(False, buf, start, end)
+
+    # This function sets a bid level, a volume of 0 removes the level
+    def bid_update(self, price: float, volume: float):
+        size = self.bids.size
+        self.bids.reserve(size + 1)
+        self.bid_volumes.reserve(size + 1)
+        size = set_level(self.bids.underlying(), self.bid_volumes.underlying(), size, price, volume, True)
+        self.bids.resize(size)
+        self.bid_volumes.resize(size)
+
+    # This function sets an ask level, a volume of 0 removes the level
+    def ask_update(self, price: float, volume: float):
+        size = self.asks.size
+        self.asks.reserve(size + 1)
+        self.ask_volumes.reserve(size + 1)
+        size = set_level(self.asks.underlying(), self.ask_volumes.underlying(), size, price, volume, False)
+        self.asks.resize(size)
+        self.ask_volumes.resize(size)
+
+    # This function removes a bid level
+    def bid_remove(self, price: float):
+        self.bid_update(price, 0.0)
+
+    # This function removes an ask level
+    def ask_remove(self, price: float):
+        self.ask_update(price, 0.0)
+
+    # This function applies all bid deltas of a message, a volume of 0 removes the level
+    def bid_delta_update(self, prices: np.ndarray, volumes: np.ndarray):
+        self._delta(True, np.asarray(prices, dtype=np.float64), np.asarray(volumes, dtype=np.float64))
+
+    # This function applies all ask deltas of a message, a volume of 0 removes the level
+    def ask_delta_update(self, prices: np.ndarray, volumes: np.ndarray):
+        self._delta(False, np.asarray(prices, dtype=np.float64), np.asarray(volumes, dtype=np.float64))
+
+    # This function applies decoded exchange bid deltas such as [["price", "qty"], ...]
+    def bid_delta_update_raw(self, levels: Union[Sequence[Sequence[str]], np.ndarray]):
+        self._delta_raw(True, levels)
+
+    # This function applies decoded exchange ask deltas such as [["price", "qty"], ...]
+    def ask_delta_update_raw(self, levels: Union[Sequence[Sequence[str]], np.ndarray]):
+        self._delta_raw(False, levels)
+
+    # This function applies the bid and ask deltas of a raw JSON message
+    def delta_update_json(self, payload: Union[bytes, str], bids_key: bytes = b"b", asks_key: bytes = b"a"):
+        buf = as_bytes(payload)
+        start, end = find_json_array(buf, as_bytes(bids_key))
+        if start >= 0:
+            self._delta_json(True, buf, start, end)
+        start, end = find_json_array(buf, as_bytes(asks_key))
+        if start >= 0:
+            self._delta_json(False, buf, start, end)
+
+
+# This function copies the top levels of a sorted side into a fixed size side and returns the copied size
+@njit
+def copy_levels(src_prices: np.ndarray, src_volumes: np.ndarray, src_size: int, dst_prices: np.ndarray,
+                dst_volumes: np.ndarray) -> int:
+    n = min(src_size, len(dst_prices))
+    for i in range(n):
+        dst_prices[i] = src_prices[src_size - n + i]
+        dst_volumes[i] = src_volumes[src_size - n + i]
+    return n
+
+
+# Fixed size record of a LOB, levels use the same layout as LOB (top of book at index size - 1)
 def fix_lob_factory(size=32):
     dtype = np.dtype([
         ('bids', '<f8', size), ('bids_volume', '<f8', size), ('asks', '<f8', size), ('asks_volume', '<f8', size),
@@ -80,6 +269,12 @@ class FixedLOB:
         else:
             self.record = record
 
+    # This function creates a FixedLOB over the index-th record of a memory-mapped region without copying
+    @classmethod
+    def from_mmap(cls, symbol: str, mmrecord: MMapRecord, size: int = 32, index: int = 0) -> 'FixedLOB':
+        records = mmrecord.as_array(fix_lob_factory(size))
+        return cls(symbol, size, record=records[index:index + 1])
+
     def update_record(self, record):
         self.record = record
 
@@ -117,3 +312,9 @@ class FixedLOB:
 
     def __str__(self):
         return f"LOB({self.symbol}: bid size={self.bid_size}, ask size={self.ask_size}))"
+
+
+# This function creates one FixedLOB per symbol over consecutive records of a memory-mapped region
+def fixed_lobs_from_mmap(symbols: List[str], mmrecord: MMapRecord, size: int = 32) -> List[FixedLOB]:
+    records = mmrecord.as_array(fix_lob_factory(size), len(symbols))
+    return [FixedLOB(symbol, size, record=records[i:i + 1]) for i, symbol in enumerate(symbols)]
@@ -0,0 +1,442 @@
+from typing import Optional, Tuple
+
+import numpy as np
+from numba import njit, types
+from numba.typed import Dict
+
+from pytrading.md.lob import LOB, FixedLOB, search_level
+
+BID = 0
+ASK = 1
+
+# Actions understood by MBOBook.apply, the Databento MBO action codes where they exist.
+# Trades and fills do not change the book (Databento sends a cancel for the filled quantity),
+# exchange execution messages that do reduce the resting order use EXECUTE.
+ADD = ord('A')
+CANCEL = ord('C')
+MODIFY = ord('M')
+CLEAR = ord('R')
+TRADE = ord('T')
+FILL = ord('F')
+EXECUTE = ord('E')
+
+OK = 0
+DUPLICATE_ORDER = 1
+UNKNOWN_ORDER = 2
+ORDER_POOL_FULL = -1
+LEVEL_POOL_FULL = -2
+
+# Indices into the state array
+ORDER_FREE = 0
+LEVEL_FREE = 1
+BID_SIZE = 2
+ASK_SIZE = 3
+ORDER_COUNT = 4
+ERROR_COUNT = 5
+
+mbo_order_dtype = np.dtype([
+    ('order_id', '<i8'), ('price', '<f8'), ('qty', '<f8'), ('side', '<i8'), ('level', '<i8'),
+    ('prev', '<i8'), ('next', '<i8')
+])
+
+mbo_level_dtype = np.dtype([
+    ('price', '<f8'), ('qty', '<f8'), ('count', '<i8'), ('head', '<i8'), ('tail', '<i8')
+])
+
+
+# This function chains the slots [start, stop) into a free list ending at tail, next_field is the link field
+def _chain_free(pool: np.ndarray, next_field: str, start: int, stop: int, tail: int):
+    links = np.arange(start + 1, stop + 1, dtype=np.int64)
+    links[-1] = tail
+    pool[next_field][start:stop] = links
+
+
+# This function returns the slot of a price on a side and its position in the sorted side
+@njit
+def _find_level(state, side_prices, side_levels, side, price):
+    size = state[BID_SIZE + side]
+    pos = search_level(side_prices[side], size, price, side == BID)
+    if pos < size and side_prices[side, pos] == price:
+        return side_levels[side, pos], pos
+    return -1, pos
+
+
+# This function unlinks an order from its level and releases the order slot and the level when empty
+@njit
+def _remove_order(orders, levels, state, index, side_prices, side_levels, slot):
+    order = orders[slot]
+    level = levels[order.level]
+    if order.prev >= 0:
+        orders[order.prev].next = order.next
+    else:
+        level.head = order.next
+    if order.next >= 0:
+        orders[order.next].prev = order.prev
+    else:
+        level.tail = order.prev
+    level.qty -= order.qty
+    level.count -= 1
+    if level.count == 0:
+        side = order.side
+        size = state[BID_SIZE + side]
+        pos = search_level(side_prices[side], size, level.price, side == BID)
+        for j in range(pos, size - 1):
+            side_prices[side, j] = side_prices[side, j + 1]
+            side_levels[side, j] = side_levels[side, j + 1]
+        state[BID_SIZE + side] = size - 1
+        level.head = state[LEVEL_FREE]
+        state[LEVEL_FREE] = order.level
+    index.pop(order.order_id)
+    order.next = state[ORDER_FREE]
+    state[ORDER_FREE] = slot
+    state[ORDER_COUNT] -= 1
+
+
+# This function appends an order to the queue of its price level, creating the level when needed
+@njit
+def _insert_order(orders, levels, state, index, side_prices, side_levels, order_id, side, price, qty):
+    level_slot, pos = _find_level(state, side_prices, side_levels, side, price)
+    if level_slot < 0:
+        level_slot = state[LEVEL_FREE]
+        level = levels[level_slot]
+        state[LEVEL_FREE] = level.head
+        level.price = price
+        level.qty = 0.0
+        level.count = 0
+        level.head = -1
+        level.tail = -1
+        size = state[BID_SIZE + side]
+        for j in range(size, pos, -1):
+            side_prices[side, j] = side_prices[side, j - 1]
+            side_levels[side, j] = side_levels[side, j - 1]
+        side_prices[side, pos] = price
+        side_levels[side, pos] = level_slot
+        state[BID_SIZE + side] = size + 1
+    level = levels[level_slot]
+    slot = state[ORDER_FREE]
+    order = orders[slot]
+    state[ORDER_FREE] = order.next
+    order.order_id = order_id
+    order.price = price
+    order.qty = qty
+    order.side = side
+    order.level = level_slot
+    order.prev = level.tail
+    order.next = -1
+    if level.tail >= 0:
+        orders[level.tail].next = slot
+    else:
+        level.head = slot
+    level.tail = slot
+    level.qty += qty
+    level.count += 1
+    index[order_id] = slot
+    state[ORDER_COUNT] += 1
+
+
+# This function returns whether an order at a price can be inserted without growing the pools
+@njit
+def _check_capacity(state, side_prices, side_levels, side, price):
+    if state[ORDER_FREE] < 0:
+        return ORDER_POOL_FULL
+    if state[LEVEL_FREE] < 0 and _find_level(state, side_prices, side_levels, side, price)[0] < 0:
+        return LEVEL_POOL_FULL
+    return OK
+
+
+# This function adds an order at the back of the queue of its price level
+@njit
+def add_order(orders, levels, state, index, side_prices, side_levels, order_id, side, price, qty):
+    if order_id in index:
+        return DUPLICATE_ORDER
+    status = _check_capacity(state, side_prices, side_levels, side, price)
+    if status != OK:
+        return status
+    _insert_order(orders, levels, state, index, side_prices, side_levels, order_id, side, price, qty)
+    return OK
+
+
+# This function reduces an order by qty (the whole order when qty <= 0) keeping its queue position
+@njit
+def reduce_order(orders, levels, state, index, side_prices, side_levels, order_id, qty):
+    if order_id not in index:
+        return UNKNOWN_ORDER
+    slot = index[order_id]
+    order = orders[slot]
+    if qty <= 0 or qty >= order.qty:
+        _remove_order(orders, levels, state, index, side_prices, side_levels, slot)
+    else:
+        order.qty -= qty
+        levels[order.level].qty -= qty
+    return OK
+
+
+# This function changes the price and quantity of an order. A smaller quantity at the same price
+# keeps the queue position, any other change sends the order to the back of the queue.
+@njit
+def modify_order(orders, levels, state, index, side_prices, side_levels, order_id, price, qty):
+    if order_id not in index:
+        return UNKNOWN_ORDER
+    slot = index[order_id]
+    order = orders[slot]
+    if qty <= 0:
+        _remove_order(orders, levels, state, index, side_prices, side_levels, slot)
+        return OK
+    if order.price == price and qty <= order.qty:
+        levels[order.level].qty -= order.qty - qty
+        order.qty = qty
+        return OK
+    side = order.side
+    if state[LEVEL_FREE] < 0 and _find_level(state, side_prices, side_levels, side, price)[0] < 0:
+        return LEVEL_POOL_FULL
+    _remove_order(orders, levels, state, index, side_prices, side_levels, slot)
+    _insert_order(orders, levels, state, index, side_prices, side_levels, order_id, side, price, qty)
+    return OK
+
+
+# This function returns the quantity and the number of orders ahead of an order in its queue
+@njit
+def queue_position(orders, index, order_id):
+    if order_id not in index:
+        return -1.0, -1
+    qty = 0.0
+    count = 0
+    slot = orders[index[order_id]].prev
+    while slot >= 0:
+        qty += orders[slot].qty
+        count += 1
+        slot = orders[slot].prev
+    return qty, count
+
+
+# This function removes every order and level
+@njit
+def clear_book(orders, levels, state, index, side_prices, side_levels):
+    for side in range(2):
+        for pos in range(state[BID_SIZE + side]):
+            level_slot = side_levels[side, pos]
+            slot = levels[level_slot].head
+            while slot >= 0:
+                next_slot = orders[slot].next
+                orders[slot].next = state[ORDER_FREE]
+                state[ORDER_FREE] = slot
+                slot = next_slot
+            levels[level_slot].head = state[LEVEL_FREE]
+            state[LEVEL_FREE] = level_slot
+        state[BID_SIZE + side] = 0
+    index.clear()
+    state[ORDER_COUNT] = 0
+
+
+# This function applies a batch of events starting at start and returns the index of the first event
+# not applied, which is len(actions) unless a pool has to grow
+@njit
+def apply_events(orders, levels, state, index, side_prices, side_levels, actions, sides, prices, qtys,
+                 order_ids, start):
+    for i in range(start, len(actions)):
+        action = actions[i]
+        if action == ADD:
+            status = add_order(orders, levels, state, index, side_prices, side_levels, order_ids[i], sides[i],
+                               prices[i], qtys[i])
+        elif action == CANCEL or action == EXECUTE:
+            status = reduce_order(orders, levels, state, index, side_prices, side_levels, order_ids[i], qtys[i])
+        elif action == MODIFY:
+            status = modify_order(orders, levels, state, index, side_prices, side_levels, order_ids[i], prices[i],
+                                  qtys[i])
+        elif action == CLEAR:
+            clear_book(orders, levels, state, index, side_prices, side_levels)
+            status = OK
+        else:
+            status = OK
+        if status < 0:
+            return i
+        if status > 0:
+            state[ERROR_COUNT] += 1
+    return len(actions)
+
+
+# This function writes the aggregated volume of the first size levels of a side to volumes
+@njit
+def aggregate_levels(levels, side_levels, size, volumes):
+    for i in range(size):
+        volumes[i] = levels[side_levels[i]].qty
+
+
+# This class represents a market-by-order (L3) book with array-backed order and level pools
+class MBOBook:
+
+    # This function initializes the book with a symbol and the initial pool capacities
+    def __init__(self, symbol: str, order_capacity: int = 1 << 16, level_capacity: int = 1024):
+        self.symbol = symbol
+        self.timestamp = 0
+        self.sequence = 0
+        self.orders = np.zeros(order_capacity, dtype=mbo_order_dtype)
+        self.levels = np.zeros(level_capacity, dtype=mbo_level_dtype)
+        self.side_prices = np.zeros((2, level_capacity), dtype=np.float64)
+        self.side_levels = np.zeros((2, level_capacity), dtype=np.int64)
+        self.state = np.zeros(6, dtype=np.int64)
+        self.index = Dict.empty(key_type=types.int64, value_type=types.int64)
+        _chain_free(self.orders, 'next', 0, order_capacity, -1)
+        _chain_free(self.levels, 'head', 0, level_capacity, -1)
+
+    # This function returns the number of resting orders
+    def __len__(self) -> int:
+        return int(self.state[ORDER_COUNT])
+
+    def __contains__(self, order_id: int) -> bool:
+        return order_id in self.index
+
+    def __str__(self):
+        return f"MBOBook({self.symbol}: orders={len(self)}, bid size={self.bid_size}, ask size={self.ask_size}))"
+
+    # This property returns the number of bid levels
+    @property
+    def bid_size(self) -> int:
+        return int(self.state[BID_SIZE])
+
+    # This property returns the number of ask levels
+    @property
+    def ask_size(self) -> int:
+        return int(self.state[ASK_SIZE])
+
+    # This property returns the number of events rejected for unknown or duplicate order ids
+    @property
+    def error_count(self) -> int:
+        return int(self.state[ERROR_COUNT])
+
+    # This function doubles the order pool
+    def _grow_orders(self):
+        capacity = len(self.orders)
+        orders = np.zeros(capacity * 2, dtype=mbo_order_dtype)
+        orders[:capacity] = self.orders
+        _chain_free(orders, 'next', capacity, capacity * 2, self.state[ORDER_FREE])
+        self.state[ORDER_FREE] = capacity
+        self.orders = orders
+
+    # This function doubles the level pool and the sorted sides
+    def _grow_levels(self):
+        capacity = len(self.levels)
+        levels = np.zeros(capacity * 2, dtype=mbo_level_dtype)
+        levels[:capacity] = self.levels
+        _chain_free(levels, 'head', capacity, capacity * 2, self.state[LEVEL_FREE])
+        self.state[LEVEL_FREE] = capacity
+        self.levels = levels
+        side_prices = np.zeros((2, capacity * 2), dtype=np.float64)
+        side_prices[:, :capacity] = self.side_prices
+        self.side_prices = side_prices
+        side_levels = np.zeros((2, capacity * 2), dtype=np.int64)
+        side_levels[:, :capacity] = self.side_levels
+        self.side_levels = side_levels
+
+    # This function grows the pool reported full by a kernel status
+    def _grow(self, status: int):
+        if status == ORDER_POOL_FULL:
+            self._grow_orders()
+        else:
+            self._grow_levels()
+
+    # This function adds an order, returns False if the order id already rests in the book
+    def add(self, order_id: int, side: int, price: float, qty: float) -> bool:
+        while True:
+            status = add_order(self.orders, self.levels, self.state, self.index, self.side_prices, self.side_levels,
+                               order_id, side, price, qty)
+            if status >= 0:
+                return status == OK
+            self._grow(status)
+
+    # This function cancels qty of an order (the whole order when qty <= 0), returns False for unknown orders
+    def cancel(self, order_id: int, qty: float = 0.0) -> bool:
+        return reduce_order(self.orders, self.levels, self.state, self.index, self.side_prices, self.side_levels,
+                            order_id, qty) == OK
+
+    # This function executes qty of a resting order, returns False for unknown orders
+    def execute(self, order_id: int, qty: float) -> bool:
+        return self.cancel(order_id, qty)
+
+    # This function modifies the price and quantity of an order, returns False for unknown orders
+    def modify(self, order_id: int, price: float, qty: float) -> bool:
+        while True:
+            status = modify_order(self.orders, self.levels, self.state, self.index, self.side_prices,
+                                  self.side_levels, order_id, price, qty)
+            if status >= 0:
+                return status == OK
+            self._grow(status)
+
+    # This function removes every order
+    def clear(self):
+        clear_book(self.orders, self.levels, self.state, self.index, self.side_prices, self.side_levels)
+
+    # This function applies a batch of events, sides use BID/ASK and actions the codes of this module
+    def apply(self, actions: np.ndarray, sides: np.ndarray, prices: np.ndarray, qtys: np.ndarray,
+              order_ids: np.ndarray):
+        i = 0
+        while True:
+            i = apply_events(self.orders, self.levels, self.state, self.index, self.side_prices, self.side_levels,
+                             actions, sides, prices, qtys, order_ids, i)
+            if i == len(actions):
+                return
+            if self.state[ORDER_FREE] < 0:
+                self._grow_orders()
+            else:
+                self._grow_levels()
+
+    # This function returns the quantity and the number of orders ahead of an order, None for unknown orders
+    def queue_position(self, order_id: int) -> Optional[Tuple[float, int]]:
+        qty, count = queue_position(self.orders, self.index, order_id)
+        if count < 0:
+            return None
+        return qty, count
+
+    # This function returns a copy of the order record of an order id
+    def order(self, order_id: int) -> Optional[np.void]:
+        slot = self.index.get(order_id)
+        if slot is None:
+            return None
+        return self.orders[slot].copy()
+
+    # This function returns the sorted prices of a side in the LOB layout
+    def prices(self, side: int) -> np.ndarray:
+        return self.side_prices[side, :self.state[BID_SIZE + side]]
+
+    # This function returns the aggregated volumes of a side in the LOB layout
+    def volumes(self, side: int) -> np.ndarray:
+        size = self.state[BID_SIZE + side]
+        volumes = np.empty(size, dtype=np.float64)
+        aggregate_levels(self.levels, self.side_levels[side], size, volumes)
+        return volumes
+
+    # This function writes the aggregated levels of one side into the arrays of a LOB side
+    def _to_lob_side(self, side: int, prices, volumes):
+        size = int(self.state[BID_SIZE + side])
+        prices.reserve(size)
+        volumes.reserve(size)
+        prices.resize(size)
+        volumes.resize(size)
+        prices.underlying()[:size] = self.side_prices[side, :size]
+        aggregate_levels(self.levels, self.side_levels[side], size, volumes.underlying())
+
+    # This function aggregates the book into a LOB
+    def to_lob(self, lob: Optional[LOB] = None) -> LOB:
+        if lob is None:
+            lob = LOB(self.symbol, max(self.bid_size, self.ask_size, 1))
+        self._to_lob_side(BID, lob.bids, lob.bid_volumes)
+        self._to_lob_side(ASK, lob.asks, lob.ask_volumes)
+        lob.timestamp = self.timestamp
+        lob.sequence = self.sequence
+        return lob
+
+    # This function aggregates the top levels of the book into a FixedLOB
+    def to_fixed_lob(self, lob: Optional[FixedLOB] = None, size: int = 32) -> FixedLOB:
+        if lob is None:
+            lob = FixedLOB(self.symbol, size)
+        record = lob.record[0]
+        for side, price_field, volume_field, size_field in ((BID, 'bids', 'bids_volume', 'bid_size'),
+                                                            (ASK, 'asks', 'asks_volume', 'ask_size')):
+            n = int(self.state[BID_SIZE + side])
+            k = min(n, len(record[price_field]))
+            record[price_field][:k] = self.side_prices[side, n - k:n]
+            aggregate_levels(self.levels, self.side_levels[side, n - k:n], k, record[volume_field])
+            record[size_field] = k
+        record['timestamp'] = self.timestamp
+        record['sequence'] = self.sequence
+        return lob
@@ -0,0 +1,218 @@
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+from numba import njit
+
+# Exact powers of ten, a mantissa below 2 ** 53 divided by one of them is correctly rounded
+POW10 = np.array([10.0 ** i for i in range(23)])
+
+MINUS = 45  # '-'
+PLUS = 43  # '+'
+DOT = 46  # '.'
+ZERO = 48  # '0'
+NINE = 57  # '9'
+QUOTE = 34  # '"'
+OPEN = 91  # '['
+CLOSE = 93  # ']'
+COMMA = 44  # ','
+COLON = 58  # ':'
+LOWER_E = 101  # 'e'
+UPPER_E = 69  # 'E'
+
+
+# This function parses a decimal number such as -123.456e-2 in buf[start:end], stopping at the first other byte
+@njit
+def parse_decimal(buf: np.ndarray, start: int, end: int) -> float:
+    i = start
+    negative = False
+    if i < end and (buf[i] == MINUS or buf[i] == PLUS):
+        negative = buf[i] == MINUS
+        i += 1
+    mantissa = 0
+    digits = 0
+    scale = 0
+    # significant digits, leading zeros do not count towards the 18 that fit in the mantissa
+    while i < end and ZERO <= buf[i] <= NINE:
+        if digits < 18:
+            mantissa = mantissa * 10 + (buf[i] - ZERO)
+            if mantissa:
+                digits += 1
+        else:
+            scale += 1
+        i += 1
+    if i < end and buf[i] == DOT:
+        i += 1
+        while i < end and ZERO <= buf[i] <= NINE:
+            if digits < 18:
+                mantissa = mantissa * 10 + (buf[i] - ZERO)
+                if mantissa:
+                    digits += 1
+                scale -= 1
+            i += 1
+    if i < end and (buf[i] == LOWER_E or buf[i] == UPPER_E):
+        i += 1
+        exp_negative = False
+        if i < end and (buf[i] == MINUS or buf[i] == PLUS):
+            exp_negative = buf[i] == MINUS
+            i += 1
+        exponent = 0
+        while i < end and ZERO <= buf[i] <= NINE:
+            exponent = exponent * 10 + (buf[i] - ZERO)
+            i += 1
+        scale += -exponent if exp_negative else exponent
+    value = float(mantissa)
+    if scale < 0:
+        if scale >= -22:
+            value /= POW10[-scale]
+        else:
+            value *= 10.0 ** scale
+    elif scale > 0:
+        if scale <= 22:
+            value *= POW10[scale]
+        else:
+            value *= 10.0 ** scale
+    return -value if negative else value
+
+
+# This function puts the first n levels in ascending or descending price order, reversing or sorting only when needed
+@njit
+def sort_levels(prices: np.ndarray, volumes: np.ndarray, n: int, ascending: bool):
+    forward = True
+    backward = True
+    for i in range(1, n):
+        if prices[i - 1] > prices[i]:
+            forward = False
+        elif prices[i - 1] < prices[i]:
+            backward = False
+    if (forward and ascending) or (backward and not ascending):
+        return
+    if forward or backward:
+        for i in range(n // 2):
+            j = n - 1 - i
+            prices[i], prices[j] = prices[j], prices[i]
+            volumes[i], volumes[j] = volumes[j], volumes[i]
+        return
+    order = np.argsort(prices[:n])
+    if not ascending:
+        order = order[::-1]
+    sorted_prices = prices[:n][order]
+    sorted_volumes = volumes[:n][order]
+    prices[:n] = sorted_prices
+    volumes[:n] = sorted_volumes
+
+
+# This function copies (price, volume) rows into level arrays sorted for a side
+@njit
+def load_levels(levels: np.ndarray, prices: np.ndarray, volumes: np.ndarray, ascending: bool) -> int:
+    n = levels.shape[0]
+    for i in range(n):
+        prices[i] = levels[i, 0]
+        volumes[i] = levels[i, 1]
+    sort_levels(prices, volumes, n, ascending)
+    return n
+
+
+# This function parses levels of fixed width byte strings with shape (n, fields, width), only the first two
+# fields (price, volume) are used
+@njit
+def parse_string_levels(chars: np.ndarray, prices: np.ndarray, volumes: np.ndarray) -> int:
+    n = chars.shape[0]
+    width = chars.shape[2]
+    for i in range(n):
+        prices[i] = parse_decimal(chars[i, 0], 0, width)
+        volumes[i] = parse_decimal(chars[i, 1], 0, width)
+    return n
+
+
+# This function returns the number of levels of a JSON array of levels such as [["1.5","2"],["1.4","3"]]
+@njit
+def count_json_levels(buf: np.ndarray, start: int, end: int) -> int:
+    depth = 0
+    n = 0
+    for i in range(start, end):
+        c = buf[i]
+        if c == OPEN:
+            depth += 1
+            if depth == 2:
+                n += 1
+        elif c == CLOSE:
+            depth -= 1
+    return n
+
+
+# This function parses a JSON array of levels in buf[start:end], quoted or not, extra fields per level are skipped
+@njit
+def parse_json_levels(buf: np.ndarray, start: int, end: int, prices: np.ndarray, volumes: np.ndarray) -> int:
+    depth = 0
+    n = 0
+    field = 0
+    i = start
+    while i < end:
+        c = buf[i]
+        if c == OPEN:
+            depth += 1
+            field = 0
+            i += 1
+        elif c == CLOSE:
+            depth -= 1
+            if depth == 1 and field >= 2:
+                n += 1
+            i += 1
+        elif depth == 2 and (ZERO <= c <= NINE or c == MINUS or c == DOT):
+            j = i
+            while j < end and buf[j] != QUOTE and buf[j] != COMMA and buf[j] != CLOSE:
+                j += 1
+            if field == 0:
+                prices[n] = parse_decimal(buf, i, j)
+            elif field == 1:
+                volumes[n] = parse_decimal(buf, i, j)
+            field += 1
+            i = j
+        else:
+            i += 1
+    return n
+
+
+# This function returns the (start, end) byte range of the array value of a key in a JSON object, (-1, -1) if absent
+@njit
+def find_json_array(buf: np.ndarray, key: np.ndarray) -> Tuple[int, int]:
+    k = len(key)
+    n = len(buf)
+    i = 0
+    while i + k + 2 <= n:
+        if buf[i] == QUOTE and buf[i + k + 1] == QUOTE:
+            match = True
+            for j in range(k):
+                if buf[i + 1 + j] != key[j]:
+                    match = False
+                    break
+            if match:
+                p = i + k + 2
+                while p < n and (buf[p] == COLON or buf[p] == 32):
+                    p += 1
+                if p < n and buf[p] == OPEN:
+                    depth = 0
+                    for q in range(p, n):
+                        if buf[q] == OPEN:
+                            depth += 1
+                        elif buf[q] == CLOSE:
+                            depth -= 1
+                            if depth == 0:
+                                return p, q + 1
+        i += 1
+    return -1, -1
+
+
+# This function returns the bytes of a payload as a uint8 array without copying
+def as_bytes(payload: Union[bytes, bytearray, memoryview, str]) -> np.ndarray:
+    if isinstance(payload, str):
+        payload = payload.encode()
+    return np.frombuffer(payload, dtype=np.uint8)
+
+
+# This function returns decoded [["price", "qty", ...], ...] string levels as a uint8 array of shape (n, fields, width)
+def as_chars(levels: Union[Sequence[Sequence[str]], np.ndarray]) -> np.ndarray:
+    arr = levels if isinstance(levels, np.ndarray) and levels.dtype.kind == 'S' else np.array(levels, dtype=np.bytes_)
+    if arr.size == 0:
+        return np.zeros((0, 2, 1), dtype=np.uint8)
+    return arr.view(np.uint8).reshape(arr.shape[0], arr.shape[1], arr.dtype.itemsize)
@@ -0,0 +1,97 @@
+import zlib
+from typing import Any, Callable, Optional, Union
+
+import orjson
+
+# zlib window bits of the compressed formats
+GZIP = 31
+DEFLATE = -15
+ZLIB = 15
+
+Payload = Union[str, bytes, bytearray, memoryview]
+
+
+class Decoder:
+    """Turns a websocket frame into the message ReconnectingWebsocket queues, None skips the frame.
+    Malformed frames raise ValueError or zlib.error"""
+
+    def decode(self, payload: Payload) -> Any:
+        raise NotImplementedError
+
+    # Drops the state kept across frames, called on every new connection
+    def reset(self):
+        pass
+
+
+class JsonDecoder(Decoder):
+
+    def decode(self, payload: Payload) -> Any:
+        return orjson.loads(payload)
+
+
+class RawDecoder(Decoder):
+    """Hands the frame bytes to a parser without decoding them, such as LOB.delta_update_json bound to a book.
+    The parser result is queued when it is not None"""
+
+    def __init__(self, parser: Callable[[bytes], Any]):
+        self.parser = parser
+
+    def decode(self, payload: Payload) -> Any:
+        if isinstance(payload, str):
+            payload = payload.encode()
+        return self.parser(payload)
+
+
+class ZlibDecoder(Decoder):
+    """Decompresses frames and passes them to an inner decoder (JSON by default).
+    With streaming the frames are consecutive pieces of one compressed stream and a single decompressor
+    is kept for the connection, otherwise every frame is a complete compressed message"""
+
+    def __init__(self, wbits: int = ZLIB, inner: Optional[Decoder] = None, streaming: bool = False):
+        self.wbits = wbits
+        self.inner = inner or JsonDecoder()
+        self.streaming = streaming
+        self._stream = zlib.decompressobj(wbits) if streaming else None
+
+    def _decompress_stream(self, payload: Payload) -> bytes:
+        try:
+            data = self._stream.decompress(payload)
+            # a gzip member ended, the bytes after it start the next member
+            while self._stream.eof:
+                rest = self._stream.unused_data
+                self._stream = zlib.decompressobj(self.wbits)
+                if not rest:
+                    break
+                data += self._stream.decompress(rest)
+        except zlib.error:
+            # the decompressor is unusable after an error, the next frame starts a new stream
+            self._stream = zlib.decompressobj(self.wbits)
+            raise
+        return data
+
+    def decode(self, payload: Payload) -> Any:
+        # text frames are never compressed, such as the replies to subscriptions on some venues
+        if not isinstance(payload, str):
+            if self.streaming:
+                payload = self._decompress_stream(payload)
+            else:
+                payload = zlib.decompress(payload, self.wbits)
+        return self.inner.decode(payload)
+
+    def reset(self):
+        if self.streaming:
+            self._stream = zlib.decompressobj(self.wbits)
+        self.inner.reset()
+
+
+class GzipDecoder(ZlibDecoder):
+
+    def __init__(self, inner: Optional[Decoder] = None, streaming: bool = False):
+        super().__init__(GZIP, inner, streaming)
+
+
+class DeflateDecoder(ZlibDecoder):
+    """Raw deflate frames without zlib or gzip header"""
+
+    def __init__(self, inner: Optional[Decoder] = None, streaming: bool = False):
+        super().__init__(DEFLATE, inner, streaming)
@@ -1,19 +1,122 @@
+import asyncio
 import hashlib
 import hmac
 import random
+import socket
 import time
 from base64 import b64encode
+from collections import deque
 from operator import itemgetter
 from pathlib import Path
-from typing import Optional, Dict, Any, Union, List, Tuple
+from types import SimpleNamespace
+from typing import Optional, Dict, Any, Union, List, Tuple, Iterable
 
 import aiohttp
+import numpy as np
 import requests
 from Crypto.Hash import SHA256
 from Crypto.PublicKey import RSA, ECC
 from Crypto.Signature import pkcs1_15, eddsa
 
 
+# Phases of a request timing, in nanoseconds. connect includes the TLS handshake and is 0 on a reused connection,
+# ttfb runs from the request headers sent to the response headers received
+TIMING_PHASES = ("queued", "dns", "connect", "ttfb", "total")
+
+
+class RequestTimings:
+    """Timing of the last requests of a session collected with an aiohttp TraceConfig"""
+
+    def __init__(self, capacity: int = 1024):
+        self.timings = deque(maxlen=capacity)
+        self.trace_config = aiohttp.TraceConfig()
+        self.trace_config.on_request_start.append(self._on_request_start)
+        self.trace_config.on_connection_queued_start.append(self._on_queued_start)
+        self.trace_config.on_connection_queued_end.append(self._on_queued_end)
+        self.trace_config.on_dns_resolvehost_start.append(self._on_dns_start)
+        self.trace_config.on_dns_resolvehost_end.append(self._on_dns_end)
+        self.trace_config.on_connection_create_start.append(self._on_connect_start)
+        self.trace_config.on_connection_create_end.append(self._on_connect_end)
+        self.trace_config.on_connection_reuseconn.append(self._on_reuse)
+        self.trace_config.on_request_headers_sent.append(self._on_headers_sent)
+        self.trace_config.on_request_end.append(self._on_request_end)
+
+    def __len__(self) -> int:
+        return len(self.timings)
+
+    @property
+    def last(self) -> Optional[Dict[str, Any]]:
+        return self.timings[-1] if self.timings else None
+
+    async def _on_request_start(self, session, ctx: SimpleNamespace, params):
+        ctx.start = time.monotonic_ns()
+        ctx.timing = {"method": params.method, "url": str(params.url), "reused": False, "queued": 0, "dns": 0,
+                      "connect": 0, "ttfb": 0, "total": 0}
+
+    async def _on_queued_start(self, session, ctx: SimpleNamespace, params):
+        ctx.queued = time.monotonic_ns()
+
+    async def _on_queued_end(self, session, ctx: SimpleNamespace, params):
+        ctx.timing["queued"] = time.monotonic_ns() - ctx.queued
+
+    async def _on_dns_start(self, session, ctx: SimpleNamespace, params):
+        ctx.dns = time.monotonic_ns()
+
+    async def _on_dns_end(self, session, ctx: SimpleNamespace, params):
+        ctx.timing["dns"] = time.monotonic_ns() - ctx.dns
+
+    async def _on_connect_start(self, session, ctx: SimpleNamespace, params):
+        ctx.connect = time.monotonic_ns()
+
+    async def _on_connect_end(self, session, ctx: SimpleNamespace, params):
+        # the resolution happens inside the connection, it is not counted twice
+        ctx.timing["connect"] = time.monotonic_ns() - ctx.connect - ctx.timing["dns"]
+
+    async def _on_reuse(self, session, ctx: SimpleNamespace, params):
+        ctx.timing["reused"] = True
+
+    async def _on_headers_sent(self, session, ctx: SimpleNamespace, params):
+        ctx.sent = time.monotonic_ns()
+
+    async def _on_request_end(self, session, ctx: SimpleNamespace, params):
+        now = time.monotonic_ns()
+        timing = ctx.timing
+        timing["ttfb"] = now - getattr(ctx, "sent", ctx.start)
+        timing["total"] = now - ctx.start
+        timing["status"] = params.response.status
+        self.timings.append(timing)
+
+    # Returns count, mean, p50, p99 and max in nanoseconds of every phase, new connections only for connect
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        summary = {}
+        for phase in TIMING_PHASES:
+            values = np.array([t[phase] for t in self.timings if phase != "connect" or not t["reused"]],
+                              dtype=np.int64)
+            if len(values) == 0:
+                summary[phase] = {"count": 0}
+                continue
+            p50, p99 = np.percentile(values, [50, 99])
+            summary[phase] = {"count": len(values), "mean": float(values.mean()), "p50": float(p50),
+                              "p99": float(p99), "max": float(values.max())}
+        return summary
+
+    def reset(self):
+        self.timings.clear()
+
+
+# This function creates the sockets of the tuned connector: no Nagle delay and TCP keep-alive probes,
+# so small orders go out at once and idle pooled connections are not silently dropped by NATs
+def low_latency_socket(addr_info) -> socket.socket:
+    family, type_, proto = addr_info[0], addr_info[1], addr_info[2]
+    sock = socket.socket(family, type_, proto)
+    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 30)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 10)
+    return sock
+
+
 class BaseClient:
     # Default request timeout
     REQUEST_TIMEOUT: float = 10.0
@@ -271,6 +374,17 @@ class Client(BaseClient):
 
 
 class AsyncClient(BaseClient):
+    # Connector defaults: a persistent pool per host, cached DNS, idle connections kept open longer than
+    # the keep-alive ping interval
+    CONNECTOR_PARAMS: Dict[str, Any] = {
+        "limit": 100,
+        "limit_per_host": 16,
+        "ttl_dns_cache": 300,
+        "keepalive_timeout": 120,
+    }
+    # Seconds between keep-alive pings
+    KEEPALIVE_INTERVAL: float = 30.0
+
     def __init__(
             self,
             api_key: Optional[str] = None,
@@ -284,6 +398,8 @@ class AsyncClient(BaseClient):
             private_key: Optional[Union[str, Path]] = None,
             private_key_pass: Optional[str] = None,
             https_proxy: Optional[str] = None,
+            connector_params: Optional[Dict[str, Any]] = None,
+            timings_capacity: int = 1024,
     ):
         # Set the https proxy
         self.https_proxy = https_proxy
@@ -291,6 +407,12 @@ class AsyncClient(BaseClient):
         self.loop = loop
         # Set the session parameters
         self._session_params: Dict[str, Any] = session_params or {}
+        # Set the connector parameters, on top of the defaults
+        self._connector_params: Dict[str, Any] = {**self.CONNECTOR_PARAMS, **(connector_params or {})}
+        # Set the request timings
+        self.timings = RequestTimings(timings_capacity)
+        # Set the keep-alive task
+        self._keepalive_task: Optional[asyncio.Task] = None
         super().__init__(
             api_key,
             api_secret,
@@ -302,14 +424,69 @@ class AsyncClient(BaseClient):
             private_key_pass,
         )
 
+    def _init_connector(self) -> aiohttp.TCPConnector:
+        # Set the tuned connector
+        return aiohttp.TCPConnector(
+            loop=self.loop, socket_factory=low_latency_socket, **self._connector_params
+        )
+
     def _init_session(self) -> aiohttp.ClientSession:
+        # Set the session parameters, a connector given in the session parameters is used as is
+        params = dict(self._session_params)
+        params.setdefault("connector", self._init_connector())
+        params["trace_configs"] = list(params.get("trace_configs", [])) + [self.timings.trace_config]
         # Set the session
         session = aiohttp.ClientSession(
-            loop=self.loop, headers=self._get_headers(), **self._session_params
+            loop=self.loop, headers=self._get_headers(), **params
         )
         return session
 
+    async def warmup(self, urls: Iterable[str], connections: int = 1, method: str = "get") -> int:
+        """Opens connections before they are needed, such as at startup before the first order
+
+        :param urls: Cheap endpoints of every host, such as https://api.binance.com/api/v3/ping
+        :param connections: Concurrent requests per url, the connections they open stay in the pool
+        :param method: HTTP method of the requests
+        :returns: Number of requests that got a response
+        """
+
+        async def touch(url: str) -> bool:
+            try:
+                async with getattr(self.session, method)(url, proxy=self.https_proxy) as response:
+                    await response.read()
+                    return True
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                return False
+
+        results = await asyncio.gather(*(touch(url) for url in urls for _ in range(connections)))
+        return sum(results)
+
+    async def _keepalive(self, urls: List[str], connections: int, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            await self.warmup(urls, connections)
+
+    def start_keepalive(self, urls: Iterable[str], connections: int = 1, interval: Optional[float] = None):
+        """Pings the urls every interval seconds so pooled connections stay open and warm
+
+        :param urls: Cheap endpoints of every host
+        :param connections: Pooled connections kept warm per url
+        :param interval: Seconds between pings, KEEPALIVE_INTERVAL by default
+        """
+        self.stop_keepalive()
+        interval = interval or self.KEEPALIVE_INTERVAL
+        # Idle connections must outlive the interval
+        assert interval < self._connector_params.get("keepalive_timeout", 15)
+        self._keepalive_task = asyncio.ensure_future(self._keepalive(list(urls), connections, interval))
+
+    def stop_keepalive(self):
+        # Cancel the keep-alive pings
+        if self._keepalive_task:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+
     async def close_connection(self):
+        self.stop_keepalive()
         # Close the connection
         if self.session:
             assert self.session
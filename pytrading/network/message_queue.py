@@ -0,0 +1,169 @@
+import asyncio
+from collections import deque
+from enum import Enum
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class OverflowPolicy(Enum):
+    # the oldest queued message makes room for the new one
+    DROP_OLDEST = "DropOldest"
+    # the new message replaces the latest queued one with the same key, otherwise the oldest is dropped
+    CONFLATE = "Conflate"
+    # the producer waits for the consumer, the websocket stops being read and the socket buffers fill up
+    BLOCK = "Block"
+
+
+# events carrying a diff of the previous one, dropping any of them corrupts the state built from them
+INCREMENTAL_EVENTS = {"depthUpdate"}
+
+
+# This function returns the conflation key of a decoded message: (stream or symbol, event type),
+# None for messages that must never be conflated, like diff depth updates
+def symbol_channel_key(message) -> Optional[Hashable]:
+    if not isinstance(message, dict):
+        return None
+    stream = message.get("stream")
+    if stream is not None:
+        data = message.get("data")
+        event = data.get("e") if isinstance(data, dict) else None
+        # <symbol>@depth and <symbol>@depth@100ms are diff streams, <symbol>@depth20 is a partial book
+        if stream.split("@")[1:2] == ["depth"]:
+            return None
+    else:
+        stream = message.get("s")
+        if stream is None:
+            return None
+        event = message.get("e")
+    if event in INCREMENTAL_EVENTS:
+        return None
+    return stream, event
+
+
+class MessageQueue:
+    """Bounded FIFO of decoded messages on a ring preallocated to capacity, for a single event loop.
+    get/get_nowait/put/put_nowait/qsize/empty/full behave like asyncio.Queue except when the queue is full,
+    where the overflow policy applies"""
+
+    def __init__(self, capacity: int = 100, policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+                 key: Callable[[Any], Optional[Hashable]] = symbol_channel_key):
+        assert capacity > 0
+        self.capacity = capacity
+        self.policy = policy
+        self.key = key
+        self._items = [None] * capacity
+        self._keys = [None] * capacity
+        # next position to write and to read, they only grow and slot = position % capacity
+        self._head = 0
+        self._tail = 0
+        # position of the latest queued message of every conflation key
+        self._positions: Dict[Hashable, int] = {}
+        self._getters = deque()
+        self._putters = deque()
+        # messages dropped to make room, messages replaced by a newer one with the same key,
+        # puts that had to wait for room, largest depth seen
+        self.dropped = 0
+        self.conflated = 0
+        self.blocked = 0
+        self.high_water = 0
+
+    def qsize(self) -> int:
+        return self._head - self._tail
+
+    def __len__(self) -> int:
+        return self._head - self._tail
+
+    def empty(self) -> bool:
+        return self._head == self._tail
+
+    def full(self) -> bool:
+        return self._head - self._tail >= self.capacity
+
+    def reset_stats(self):
+        self.dropped = self.conflated = self.blocked = 0
+        self.high_water = self.qsize()
+
+    @staticmethod
+    def _wakeup(waiters: deque):
+        while waiters:
+            waiter = waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+
+    async def _wait(self, waiters: deque):
+        waiter = asyncio.get_running_loop().create_future()
+        waiters.append(waiter)
+        try:
+            await waiter
+        except BaseException:
+            waiter.cancel()
+            try:
+                waiters.remove(waiter)
+            except ValueError:
+                pass
+            # cancelled after a wakeup, like asyncio.Queue the wakeup goes to the next waiter
+            if not waiter.cancelled():
+                ready = not self.empty() if waiters is self._getters else not self.full()
+                if ready:
+                    self._wakeup(waiters)
+            raise
+
+    # Removes the oldest message and returns it
+    def _pop(self) -> Any:
+        slot = self._tail % self.capacity
+        item = self._items[slot]
+        key = self._keys[slot]
+        if key is not None and self._positions.get(key) == self._tail:
+            del self._positions[key]
+        self._items[slot] = self._keys[slot] = None
+        self._tail += 1
+        return item
+
+    def _push(self, item: Any, key: Optional[Hashable]):
+        slot = self._head % self.capacity
+        self._items[slot] = item
+        self._keys[slot] = key
+        if key is not None:
+            self._positions[key] = self._head
+        self._head += 1
+        depth = self._head - self._tail
+        if depth > self.high_water:
+            self.high_water = depth
+        self._wakeup(self._getters)
+
+    # Queues a message without waiting, returns False when the queue is full with the BLOCK policy
+    def put_nowait(self, item: Any) -> bool:
+        key = self.key(item) if self.policy == OverflowPolicy.CONFLATE else None
+        if self._head - self._tail >= self.capacity:
+            if self.policy == OverflowPolicy.BLOCK:
+                return False
+            position = self._positions.get(key) if key is not None else None
+            if position is not None:
+                self._items[position % self.capacity] = item
+                self.conflated += 1
+                return True
+            self._pop()
+            self.dropped += 1
+        self._push(item, key)
+        return True
+
+    async def put(self, item: Any):
+        if self.put_nowait(item):
+            return
+        self.blocked += 1
+        while True:
+            await self._wait(self._putters)
+            if self.put_nowait(item):
+                return
+
+    def get_nowait(self) -> Any:
+        if self._head == self._tail:
+            raise asyncio.QueueEmpty
+        item = self._pop()
+        self._wakeup(self._putters)
+        return item
+
+    async def get(self) -> Any:
+        while self._head == self._tail:
+            await self._wait(self._getters)
+        return self.get_nowait()
@@ -29,7 +29,7 @@ class TCPServer:
 
     async def run(self):
         server = await self.loop.create_server(
-            self.protocol, '127.0.0.1', 9999
+            self.protocol, self.host, self.port
         )
 
         async with server:
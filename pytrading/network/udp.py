@@ -24,7 +24,7 @@ class UDPServer:
     async def run(self):
         transport, protocol = await self.loop.create_datagram_endpoint(
             self.protocol,
-            local_addr=('127.0.0.1', 9999))
+            local_addr=(self.host, self.port))
 
         try:
             await asyncio.sleep(3600)  # Serve for 1 hour.
@@ -1,17 +1,21 @@
 import asyncio
-import gzip
-import json
 import logging
+import time
+import zlib
 from asyncio import sleep
 from enum import Enum
 from random import random
 from socket import gaierror
-from typing import Optional
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence, Union
 
+import orjson
 import websockets as ws
 from websockets.exceptions import ConnectionClosedError
 
+from pytrading.ipc.wait import WaitStats
+from pytrading.network.decoder import Decoder, GzipDecoder, JsonDecoder
 from pytrading.network.http import AsyncClient
+from pytrading.network.message_queue import MessageQueue, OverflowPolicy, symbol_channel_key
 
 KEEPALIVE_TIMEOUT = 5 * 60  # 5 minutes
 
@@ -20,6 +24,10 @@ class UnableToConnect(Exception):
     pass
 
 
+class PoolFull(Exception):
+    pass
+
+
 class WSListenerState(Enum):
     INITIALISING = "Initialising"
     STREAMING = "Streaming"
@@ -43,6 +51,11 @@ class ReconnectingWebsocket:
             is_binary: bool = False,
             exit_coro=None,
             loop=None,
+            decoder: Optional[Decoder] = None,
+            overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+            conflate_key=symbol_channel_key,
+            queue_size: Optional[int] = None,
+            queue: Optional[MessageQueue] = None,
             **kwargs,
     ):
         self._loop = loop or asyncio.get_event_loop()
@@ -53,14 +66,23 @@ class ReconnectingWebsocket:
         self._prefix = prefix
         self._reconnects = 0
         self._is_binary = is_binary
+        # gzip compressed JSON for binary streams, JSON otherwise
+        self._decoder = decoder or (GzipDecoder() if is_binary else JsonDecoder())
         self._conn = None
         self._socket = None
         self.ws: Optional[ws.WebSocketClientProtocol] = None  # type: ignore
         self.ws_state = WSListenerState.INITIALISING
-        self._queue = asyncio.Queue()
+        # connections of a pool share the queue of the pool
+        self._queue = queue if queue is not None else MessageQueue(queue_size or self.MAX_QUEUE_SIZE, overflow,
+                                                                  conflate_key)
         self._handle_read_loop = None
         self._ws_kwargs = kwargs
 
+    # This property returns the message queue, with its drop, conflation and high water counters
+    @property
+    def queue(self) -> MessageQueue:
+        return self._queue
+
     async def __aenter__(self):
         await self.connect()
         return self
@@ -88,6 +110,7 @@ class ReconnectingWebsocket:
         except:  # noqa
             await self._reconnect()
             return
+        self._decoder.reset()
         self.ws_state = WSListenerState.STREAMING
         self._reconnects = 0
         await self._after_connect()
@@ -109,15 +132,10 @@ class ReconnectingWebsocket:
         pass
 
     def _handle_message(self, evt):
-        if self._is_binary:
-            try:
-                evt = gzip.decompress(evt)
-            except (ValueError, OSError):
-                return None
         try:
-            return json.loads(evt)
-        except ValueError:
-            self._log.debug(f"error parsing evt json:{evt}")
+            return self._decoder.decode(evt)
+        except (ValueError, zlib.error):
+            self._log.debug(f"error decoding evt:{evt}")
             return None
 
     async def _read_loop(self):
@@ -144,19 +162,8 @@ class ReconnectingWebsocket:
                         )
                         res = self._handle_message(res)
                         if res:
-                            if self._queue.qsize() < self.MAX_QUEUE_SIZE:
-                                await self._queue.put(res)
-                            else:
-                                self._log.debug(
-                                    f"Queue overflow {self.MAX_QUEUE_SIZE}. Message not filled"
-                                )
-                                await self._queue.put(
-                                    {
-                                        "e": "error",
-                                        "m": "Queue overflow. Message not filled",
-                                    }
-                                )
-                                raise UnableToConnect
+                            # a full queue drops, conflates or waits for the reader depending on the policy
+                            await self._queue.put(res)
                 except asyncio.TimeoutError:
                     self._log.debug(f"no message in {self.TIMEOUT} seconds")
                     # _no_message_received_reconnect
@@ -296,6 +303,469 @@ class KeepAliveWebsocket(ReconnectingWebsocket):
             self._start_socket_timer()
 
 
+class SubscribingWebsocket(ReconnectingWebsocket):
+    """Combined stream connection: streams are subscribed and unsubscribed at runtime with SUBSCRIBE/UNSUBSCRIBE
+    requests, and subscribed again on every new connection. Messages are counted per stream to measure rates"""
+
+    # streams per request and seconds between requests, exchanges limit the incoming messages per connection
+    MAX_PARAMS = 100
+    REQUEST_INTERVAL = 0.2
+
+    # handover maps the streams that may also arrive on another connection to their last delivered update id,
+    # copies at or below it are dropped. A pool shares one handover between its connections
+    def __init__(self, url: str, path: str = "stream", prefix: str = "", handover: Optional[Dict[str, Any]] = None,
+                 **kwargs):
+        super().__init__(url=url, path=path, prefix=prefix, **kwargs)
+        self.streams = set()
+        # messages received per stream since the last take_counts
+        self.message_counts: Dict[str, int] = {}
+        self.handover = handover if handover is not None else {}
+        # copies dropped because another connection delivered them first
+        self.duplicates = 0
+        self._request_id = 0
+        self._next_request = 0.0
+
+    async def _request(self, method: str, streams: List[str]):
+        for i in range(0, len(streams), self.MAX_PARAMS):
+            wait = self._next_request - self._loop.time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            if not self.ws or self.ws_state != WSListenerState.STREAMING:
+                # sent again by _after_connect
+                return
+            self._request_id += 1
+            request = {"method": method, "params": streams[i:i + self.MAX_PARAMS], "id": self._request_id}
+            await self.ws.send(orjson.dumps(request).decode())
+            self._next_request = self._loop.time() + self.REQUEST_INTERVAL
+
+    async def subscribe(self, streams: Iterable[str]):
+        new = [stream for stream in streams if stream not in self.streams]
+        self.streams.update(new)
+        if new:
+            await self._request("SUBSCRIBE", new)
+
+    async def unsubscribe(self, streams: Iterable[str]):
+        old = [stream for stream in streams if stream in self.streams]
+        self.streams.difference_update(old)
+        for stream in old:
+            self.message_counts.pop(stream, None)
+        if old:
+            await self._request("UNSUBSCRIBE", old)
+
+    async def _after_connect(self):
+        if self.streams:
+            await self._request("SUBSCRIBE", sorted(self.streams))
+
+    def _handle_message(self, evt):
+        res = super()._handle_message(evt)
+        if isinstance(res, dict):
+            stream = res.get("stream")
+            if stream is not None:
+                if stream in self.handover:
+                    sequence = update_id(res.get("data"))
+                    if type(sequence) is int:
+                        last = self.handover[stream]
+                        if last is not None and sequence <= last:
+                            self.duplicates += 1
+                            return None
+                        self.handover[stream] = sequence
+                self.message_counts[stream] = self.message_counts.get(stream, 0) + 1
+            elif "id" in res and ("result" in res or "error" in res):
+                # reply to a request
+                if "error" in res:
+                    self._log.error(f"subscription request failed: {res}")
+                return None
+        return res
+
+    # Returns the message counts per stream and starts counting again
+    def take_counts(self) -> Dict[str, int]:
+        counts = self.message_counts
+        self.message_counts = {}
+        return counts
+
+    def load(self, rates: Dict[str, float]) -> float:
+        return sum(rates.get(stream, 0.0) for stream in self.streams)
+
+
+class WebsocketPool:
+    """Shards the streams of a combined stream endpoint across connections of at most max_streams streams,
+    a new stream goes to the connection with the lowest message rate and rebalance moves streams
+    from busy connections to quiet ones. All connections put their messages in one queue read with recv.
+    subscribe raises PoolFull when the streams do not fit in max_connections connections"""
+
+    # seconds between new connections, exchanges limit the connections per ip
+    CONNECT_INTERVAL = 0.5
+
+    def __init__(
+            self,
+            url: str,
+            path: str = "stream",
+            prefix: str = "",
+            max_streams: int = 200,
+            max_connections: int = 64,
+            queue_size: int = 1000,
+            overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+            conflate_key=symbol_channel_key,
+            loop=None,
+            **kwargs,
+    ):
+        self._loop = loop or asyncio.get_event_loop()
+        self._log = logging.getLogger(__name__)
+        self._url = url
+        self._path = path
+        self._prefix = prefix
+        self.max_streams = max_streams
+        self.max_connections = max_connections
+        self._queue = MessageQueue(queue_size, overflow, conflate_key)
+        self._ws_kwargs = kwargs
+        self.sockets: List[SubscribingWebsocket] = []
+        self._owners: Dict[str, SubscribingWebsocket] = {}
+        # last delivered update id of the streams moved by the last rebalance, shared by the connections
+        self._handover: Dict[str, Any] = {}
+        # message rate per stream measured by the last rebalance
+        self.rates: Dict[str, float] = {}
+        self._counted_at = time.monotonic()
+        self._next_connect = 0.0
+
+    @property
+    def queue(self) -> MessageQueue:
+        return self._queue
+
+    @property
+    def streams(self) -> List[str]:
+        return list(self._owners)
+
+    # This property returns the copies of moved streams dropped because both connections delivered them
+    @property
+    def duplicates(self) -> int:
+        return sum(socket.duplicates for socket in self.sockets)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _open_socket(self) -> SubscribingWebsocket:
+        if len(self.sockets) >= self.max_connections:
+            raise PoolFull(f"websocket pool is full: {self.max_connections} connections")
+        wait = self._next_connect - self._loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        socket = SubscribingWebsocket(
+            url=self._url, path=self._path, prefix=self._prefix, loop=self._loop, queue=self._queue,
+            handover=self._handover, **self._ws_kwargs,
+        )
+        self.sockets.append(socket)
+        await socket.connect()
+        self._next_connect = self._loop.time() + self.CONNECT_INTERVAL
+        return socket
+
+    # Returns the connection with the lowest message rate that has room for another stream
+    def _least_loaded(self, loads: Dict[SubscribingWebsocket, float]) -> Optional[SubscribingWebsocket]:
+        free = [socket for socket in self.sockets if len(socket.streams) < self.max_streams]
+        if not free:
+            return None
+        return min(free, key=lambda socket: (loads[socket], len(socket.streams)))
+
+    async def subscribe(self, streams: Iterable[str]):
+        new = list(dict.fromkeys(stream for stream in streams if stream not in self._owners))
+        room = sum(self.max_streams - len(socket.streams) for socket in self.sockets)
+        room += (self.max_connections - len(self.sockets)) * self.max_streams
+        if len(new) > room:
+            raise PoolFull(f"{len(new)} new streams, room for {room} in {self.max_connections} connections")
+        loads = {socket: socket.load(self.rates) for socket in self.sockets}
+        assignment: Dict[SubscribingWebsocket, List[str]] = {}
+        try:
+            for stream in new:
+                socket = self._least_loaded(loads)
+                if socket is None:
+                    socket = await self._open_socket()
+                    loads[socket] = 0.0
+                # the rate of a new stream is unknown, the mean rate keeps it from piling onto one connection
+                rate = self.rates.get(stream, sum(self.rates.values()) / len(self.rates) if self.rates else 1.0)
+                loads[socket] += rate
+                self._owners[stream] = socket
+                socket.streams.add(stream)
+                assignment.setdefault(socket, []).append(stream)
+        finally:
+            # the streams assigned before a failed connect are subscribed all the same
+            for socket, assigned in assignment.items():
+                socket.streams.difference_update(assigned)
+                await socket.subscribe(assigned)
+
+    async def unsubscribe(self, streams: Iterable[str]):
+        removal: Dict[SubscribingWebsocket, List[str]] = {}
+        for stream in streams:
+            socket = self._owners.pop(stream, None)
+            self._handover.pop(stream, None)
+            if socket is not None:
+                removal.setdefault(socket, []).append(stream)
+                self.rates.pop(stream, None)
+        for socket, old in removal.items():
+            await socket.unsubscribe(old)
+
+    # Returns the message rate per stream since the previous call
+    def measure(self) -> Dict[str, float]:
+        now = time.monotonic()
+        elapsed = max(now - self._counted_at, 1e-9)
+        self._counted_at = now
+        counts = {}
+        for socket in self.sockets:
+            counts.update(socket.take_counts())
+        self.rates = {stream: counts.get(stream, 0) / elapsed for stream in self._owners}
+        return self.rates
+
+    # Measures the stream rates and moves streams so that connection loads even out, when the busiest connection
+    # carries more than threshold times the mean load. A moved stream is subscribed on its new connection
+    # before it is unsubscribed from the old one, so no message is missed. Both connections deliver it meanwhile,
+    # copies at or below the last delivered update id are dropped (counted in duplicates) until the next
+    # rebalance, messages without an update id may arrive twice. Returns the number of moved streams
+    async def rebalance(self, threshold: float = 1.5) -> int:
+        self._handover.clear()
+        rates = self.measure()
+        if len(self.sockets) < 2:
+            return 0
+        loads = [socket.load(rates) for socket in self.sockets]
+        mean = sum(loads) / len(loads)
+        if mean <= 0 or max(loads) <= threshold * mean:
+            return 0
+        # largest rates first onto the least loaded connection
+        target = {socket: [] for socket in self.sockets}
+        totals = {socket: 0.0 for socket in self.sockets}
+        for stream in sorted(self._owners, key=lambda s: rates.get(s, 0.0), reverse=True):
+            socket = min((socket for socket in self.sockets if len(target[socket]) < self.max_streams),
+                         key=lambda socket: (totals[socket], len(target[socket])))
+            target[socket].append(stream)
+            totals[socket] += rates.get(stream, 0.0)
+        moves: Dict[SubscribingWebsocket, Dict[SubscribingWebsocket, List[str]]] = {}
+        for socket, streams in target.items():
+            for stream in streams:
+                owner = self._owners[stream]
+                if owner is not socket:
+                    moves.setdefault(socket, {}).setdefault(owner, []).append(stream)
+                    self._owners[stream] = socket
+                    self._handover[stream] = None
+        moved = 0
+        for socket, sources in moves.items():
+            for owner, streams in sources.items():
+                await socket.subscribe(streams)
+                await owner.unsubscribe(streams)
+                moved += len(streams)
+        self._log.debug(f"rebalanced {moved} streams across {len(self.sockets)} connections")
+        return moved
+
+    async def recv(self):
+        return await self._queue.get()
+
+    async def close(self):
+        for socket in self.sockets:
+            await socket.__aexit__(None, None, None)
+        self.sockets = []
+        self._owners = {}
+
+
+# This function returns the update id of a message payload: last update id, trade id, aggregate trade id
+# or event time, None when it has none
+def update_id(data) -> Optional[int]:
+    if not isinstance(data, dict):
+        return None
+    for field in ("u", "lastUpdateId", "t"):
+        sequence = data.get(field)
+        if type(sequence) is int:
+            return sequence
+    # "a" is the ask levels of depth updates and the best ask of tickers otherwise
+    sequence = data.get("a") if data.get("e") == "aggTrade" else data.get("E")
+    if type(sequence) is int:
+        return sequence
+    return None
+
+
+# This function returns the key that identifies a market data message across redundant connections:
+# (stream or symbol, event type, update id), None when it has none
+def update_id_key(message) -> Optional[Hashable]:
+    if not isinstance(message, dict):
+        return None
+    data = message.get("data", message)
+    sequence = update_id(data)
+    if sequence is None:
+        return None
+    return message.get("stream") or data.get("s"), data.get("e"), sequence
+
+
+class ArbitratedConnection(ReconnectingWebsocket):
+    """One of the redundant connections of an ArbitratedWebsocket, decoded messages go through the arbiter
+    and only the first copy of a message reaches the shared queue"""
+
+    def __init__(self, arbiter: "ArbitratedWebsocket", index: int, **kwargs):
+        super().__init__(**kwargs)
+        self._arbiter = arbiter
+        self.index = index
+
+    def _handle_message(self, evt):
+        res = super()._handle_message(evt)
+        if res is None:
+            return None
+        return self._arbiter.arrive(self.index, res)
+
+
+class ArbitratedWebsocket:
+    """Subscribes the same stream on several connections, optionally to different endpoints, and delivers
+    every message once, from the connection that received it first. Messages are matched by key,
+    the keys of the last window messages are remembered. Keys are (channel..., update id) tuples, the highest
+    update id delivered per channel is kept too, so a copy arriving after its key left the window is still dropped.
+
+    Every connection records its lag behind the first arrival of each message it received (0 when it won)
+    and counts its wins, the messages it never received within the window and the copies that arrived after it,
+    to find slow endpoints"""
+
+    def __init__(
+            self,
+            urls: Union[str, Sequence[str]],
+            path: str,
+            connections: int = 2,
+            prefix: str = "ws/",
+            key=update_id_key,
+            window: int = 4096,
+            queue_size: int = 1000,
+            overflow: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+            stats_capacity: int = 65536,
+            loop=None,
+            **kwargs,
+    ):
+        self._loop = loop or asyncio.get_event_loop()
+        self._log = logging.getLogger(__name__)
+        if isinstance(urls, str):
+            urls = [urls] * connections
+        self.urls = list(urls)
+        self.key = key
+        self._queue = MessageQueue(queue_size, overflow)
+        self.connections = [
+            ArbitratedConnection(self, i, url=url, path=path, prefix=prefix, loop=self._loop, queue=self._queue,
+                                 **kwargs)
+            for i, url in enumerate(self.urls)
+        ]
+        # keys of the last window messages and, per key, [first arrival ns, winner, mask of connections seen]
+        self.window = window
+        self._keys: List[Optional[Hashable]] = [None] * window
+        self._position = 0
+        self._seen: Dict[Hashable, List[int]] = {}
+        # highest update id delivered per channel, the key without its update id
+        self._delivered: Dict[Hashable, int] = {}
+        n = len(self.connections)
+        self.received = [0] * n
+        self.wins = [0] * n
+        self.missed = [0] * n
+        self.late = [0] * n
+        self.lags = [WaitStats(stats_capacity) for _ in range(n)]
+        self.unique = 0
+        self._active = (1 << n) - 1
+
+    @property
+    def queue(self) -> MessageQueue:
+        return self._queue
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def connect(self):
+        await asyncio.gather(*(connection.connect() for connection in self.connections))
+
+    # Forgets the oldest key to make room, connections that never received its message missed it
+    def _evict(self):
+        key = self._keys[self._position]
+        if key is None:
+            return
+        entry = self._seen.pop(key, None)
+        if entry is not None:
+            absent = self._active & ~entry[2]
+            i = 0
+            while absent:
+                if absent & 1:
+                    self.missed[i] += 1
+                absent >>= 1
+                i += 1
+
+    # Returns the message when it is the first copy, None for copies already delivered
+    def arrive(self, index: int, message) -> Any:
+        self.received[index] += 1
+        key = self.key(message)
+        if key is None:
+            # no key to match copies, every copy is delivered
+            return message
+        now = time.monotonic_ns()
+        entry = self._seen.get(key)
+        if entry is None:
+            if type(key) is tuple and type(key[-1]) is int:
+                channel = key[:-1]
+                delivered = self._delivered.get(channel)
+                if delivered is not None and key[-1] <= delivered:
+                    # delivered already and evicted, the connection was counted as missing it then
+                    self.late[index] += 1
+                    return None
+                self._delivered[channel] = key[-1]
+            self._evict()
+            self._keys[self._position] = key
+            self._position = (self._position + 1) % self.window
+            self._seen[key] = [now, index, 1 << index]
+            self.wins[index] += 1
+            self.unique += 1
+            self.lags[index].add(0)
+            return message
+        if not entry[2] & (1 << index):
+            entry[2] |= 1 << index
+            self.lags[index].add(now - entry[0])
+        return None
+
+    async def recv(self):
+        return await self._queue.get()
+
+    # Per connection: endpoint, messages received, wins, win rate, missed messages, copies that arrived after
+    # their key left the window and lag percentiles in ns
+    def stats(self) -> List[Dict[str, Any]]:
+        stats = []
+        for i, connection in enumerate(self.connections):
+            stats.append({
+                "index": i,
+                "url": self.urls[i],
+                "active": bool(self._active & (1 << i)),
+                "received": self.received[i],
+                "wins": self.wins[i],
+                "win_rate": self.wins[i] / self.unique if self.unique else 0.0,
+                "missed": self.missed[i],
+                "late": self.late[i],
+                "lag": self.lags[i].summary(),
+            })
+        return stats
+
+    def reset_stats(self):
+        n = len(self.connections)
+        self.received = [0] * n
+        self.wins = [0] * n
+        self.missed = [0] * n
+        self.late = [0] * n
+        self.unique = 0
+        for lag in self.lags:
+            lag.reset()
+
+    # Closes a slow connection, the others keep delivering
+    async def drop(self, index: int):
+        assert self._active & (1 << index), f"connection {index} is already dropped"
+        assert self._active != 1 << index, "cannot drop the last connection"
+        self._active &= ~(1 << index)
+        await self.connections[index].__aexit__(None, None, None)
+
+    async def close(self):
+        for i, connection in enumerate(self.connections):
+            if self._active & (1 << i):
+                await connection.__aexit__(None, None, None)
+        self._active = 0
+
+
 class WebsocketManager:
 
     def __init__(self, client: AsyncClient, user_timeout=KEEPALIVE_TIMEOUT, loop=None):
@@ -315,6 +785,7 @@ class WebsocketManager:
             prefix: str = "ws/",
             is_binary: bool = False,
             socket_type: str = "spot",
+            decoder: Optional[Decoder] = None,
     ) -> ReconnectingWebsocket:
         conn_id = f"{socket_type}_{path}"
         if conn_id not in self._conns:
@@ -324,10 +795,51 @@ class WebsocketManager:
                 prefix=prefix,
                 exit_coro=lambda p: self._exit_socket(f"{socket_type}_{p}"),
                 is_binary=is_binary,
+                decoder=decoder,
                 **self.ws_kwargs,
             )
         return self._conns[conn_id]
 
+    def _get_pool(
+            self,
+            stream_url: str,
+            path: str = "stream",
+            prefix: str = "",
+            socket_type: str = "spot",
+            **kwargs,
+    ) -> WebsocketPool:
+        conn_id = f"{socket_type}_pool_{path}"
+        if conn_id not in self._conns:
+            self._conns[conn_id] = WebsocketPool(
+                url=stream_url,
+                path=path,
+                prefix=prefix,
+                loop=self._loop,
+                **{**self.ws_kwargs, **kwargs},
+            )
+        return self._conns[conn_id]
+
+    async def multiplex_socket(
+            self,
+            streams: Iterable[str],
+            stream_url: str,
+            path: str = "stream",
+            socket_type: str = "spot",
+            **kwargs,
+    ) -> WebsocketPool:
+        """Subscribes streams on the combined stream pool of a socket type, sharded across connections
+
+        :param streams: stream names such as btcusdt@depth
+        :param stream_url: websocket endpoint
+        :param kwargs: WebsocketPool and connection options, such as max_streams or ping_interval,
+            they override ws_kwargs and only apply when the pool is created
+
+        :returns: the pool, read with recv and given more streams with subscribe and unsubscribe
+        """
+        pool = self._get_pool(stream_url, path=path, socket_type=socket_type, **kwargs)
+        await pool.subscribe(streams)
+        return pool
+
     async def _exit_socket(self, path: str):
         await self._stop_socket(path)
 
@@ -0,0 +1,58 @@
+import math
+import unittest
+
+import numpy as np
+
+from pytrading.md import analytics
+from pytrading.md.analytics import book_arrays, records_arrays
+from pytrading.md.book_matrix import BookMatrix
+from pytrading.md.lob import LOB
+
+
+class TestAnalytics(unittest.TestCase):
+
+    def setUp(self):
+        self.lob = LOB("BTCUSDT")
+        self.lob.bid_snapshot_update([(99.0, 2.0), (100.0, 1.0)])
+        self.lob.ask_snapshot_update([(101.0, 3.0), (102.0, 4.0)])
+        self.matrix = BookMatrix(["BTCUSDT", "ETHUSDT"], size=4)
+        self.matrix.update_from_lob(self.lob)
+
+    def test_microprice(self):
+        self.assertAlmostEqual(analytics.microprice(*book_arrays(self.lob)), (100.0 * 3.0 + 101.0 * 1.0) / 4.0)
+        self.assertAlmostEqual(analytics.microprice(*book_arrays(self.matrix.view("BTCUSDT"))),
+                               (100.0 * 3.0 + 101.0 * 1.0) / 4.0)
+        self.assertTrue(math.isnan(analytics.microprice(*book_arrays(self.matrix.view("ETHUSDT")))))
+
+    def test_imbalance(self):
+        arrays = book_arrays(self.lob)
+        self.assertAlmostEqual(analytics.imbalance(arrays[1], arrays[2], arrays[4], arrays[5]), -0.5)
+        self.assertAlmostEqual(analytics.imbalance(arrays[1], arrays[2], arrays[4], arrays[5], 2), -0.4)
+
+    def test_weighted_mid(self):
+        expected = (99.0 * 2.0 + 100.0 + 101.0 * 3.0 + 102.0 * 4.0) / 10.0
+        self.assertAlmostEqual(analytics.weighted_mid(*book_arrays(self.lob), 2), expected)
+
+    def test_cost_to_fill(self):
+        asks, ask_volumes, ask_size = book_arrays(self.lob)[3:]
+        self.assertAlmostEqual(analytics.cost_to_fill(asks, ask_volumes, ask_size, 2.0), 101.0)
+        self.assertAlmostEqual(analytics.cost_to_fill(asks, ask_volumes, ask_size, 5.0), (303.0 + 204.0) / 5.0)
+        self.assertTrue(math.isnan(analytics.cost_to_fill(asks, ask_volumes, ask_size, 8.0)))
+        out = np.empty(2)
+        analytics.slippage_curve(asks, ask_volumes, ask_size, np.array([1.0, 5.0]), out)
+        np.testing.assert_allclose(out, [0.0, 0.4])
+
+    def test_batch(self):
+        out = np.empty(len(self.matrix))
+        analytics.batch_microprice(*records_arrays(self.matrix.records), out)
+        self.assertAlmostEqual(out[0], analytics.microprice(*book_arrays(self.lob)))
+        self.assertTrue(math.isnan(out[1]))
+        bids, bid_volumes, bid_sizes = records_arrays(self.matrix.records)[:3]
+        analytics.batch_cost_to_fill(bids, bid_volumes, bid_sizes, 3.0, out)
+        self.assertAlmostEqual(out[0], (100.0 + 198.0) / 3.0)
+        analytics.batch_imbalance(*records_arrays(self.matrix.records), 1, out)
+        self.assertAlmostEqual(out[0], -0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
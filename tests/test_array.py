@@ -71,6 +71,57 @@ class TestResizableArray(unittest.TestCase):
         iter_elements = [x for x in self.array]
         self.assertEqual(iter_elements, elements)
 
+    def test_extend_values(self):
+        self.array.append(1)
+        self.array.extend(np.arange(2, 8, dtype=np.int32))
+        self.assertEqual(list(self.array), [1, 2, 3, 4, 5, 6, 7])
+        self.assertGreaterEqual(self.array.capacity, 7)
+
+    def test_insert_range(self):
+        self.array.extend(np.array([1, 5], dtype=np.int32))
+        self.array.insert_range(1, np.array([2, 3, 4], dtype=np.int32))
+        self.assertEqual(list(self.array), [1, 2, 3, 4, 5])
+        with self.assertRaises(IndexError):
+            self.array.insert_range(6, np.array([6], dtype=np.int32))
+
+    def test_delete_range(self):
+        self.array.extend(np.arange(6, dtype=np.int32))
+        self.array.delete_range(1, 4)
+        self.assertEqual(list(self.array), [0, 4, 5])
+        with self.assertRaises(IndexError):
+            self.array.delete_range(2, 4)
+
+    def test_shrink_to_fit(self):
+        self.array.extend(np.arange(5, dtype=np.int32))
+        self.array.shrink_to_fit()
+        self.assertEqual(self.array.capacity, 5)
+        self.assertEqual(len(self.array.underlying()), 5)
+        self.assertEqual(list(self.array), [0, 1, 2, 3, 4])
+
+    def test_sorted(self):
+        for value in [5, 1, 3, 3]:
+            self.array.sorted_insert(value)
+        self.assertEqual(list(self.array), [1, 3, 3, 5])
+        self.assertEqual(self.array.searchsorted(3), 1)
+        self.assertEqual(self.array.sorted_upsert(4), 3)
+        self.assertEqual(self.array.sorted_upsert(4), 3)
+        self.assertTrue(self.array.sorted_remove(3))
+        self.assertFalse(self.array.sorted_remove(2))
+        self.array.sorted_extend(np.array([6, 0, 3], dtype=np.int32))
+        self.assertEqual(list(self.array), [0, 1, 3, 3, 4, 5, 6])
+
+    def test_structured(self):
+        dtype = np.dtype([('price', '<f8'), ('qty', '<f8')])
+        array = ResizableArray(dtype, 2)
+        array.append((2.0, 1.0))
+        array.sorted_insert(np.array((1.0, 3.0), dtype=dtype), key='price')
+        array.sorted_upsert(np.array((2.0, 5.0), dtype=dtype), key='price')
+        array.extend(np.array([(3.0, 1.0)], dtype=dtype))
+        self.assertEqual(list(array.view()['price']), [1.0, 2.0, 3.0])
+        self.assertEqual(list(array.view()['qty']), [3.0, 5.0, 1.0])
+        self.assertTrue(array.sorted_remove(2.0, key='price'))
+        self.assertEqual(list(array.view()['price']), [1.0, 3.0])
+
 
 if __name__ == '__main__':
     unittest.main()
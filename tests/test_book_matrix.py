@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+
+from pytrading.md.book_matrix import BookMatrix
+from pytrading.md.lob import LOB
+
+
+class TestBookMatrix(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix = BookMatrix(["BTCUSDT", "ETHUSDT"], size=4, capacity=2)
+        lob = LOB("BTCUSDT")
+        lob.bid_snapshot_update([(99.0, 1.0), (100.0, 2.0), (98.0, 3.0), (97.0, 4.0), (96.0, 5.0)])
+        lob.ask_snapshot_update([(101.0, 1.0), (102.0, 2.0)])
+        lob.timestamp = 7
+        self.matrix.update_from_lob(lob)
+
+    def test_rows(self):
+        self.assertEqual(self.matrix.row("ETHUSDT"), 1)
+        self.assertEqual(self.matrix.add_symbol("SOLUSDT"), 2)
+        self.assertEqual(list(self.matrix.rows(["SOLUSDT", "BTCUSDT"])), [2, 0])
+        self.assertEqual(len(self.matrix), 3)
+
+    def test_update_from_lob(self):
+        book = self.matrix.view("BTCUSDT")
+        self.assertEqual(book.bid_size, 4)
+        self.assertEqual(list(book.bids), [97.0, 98.0, 99.0, 100.0])
+        self.assertEqual(book.ask_size, 2)
+        self.assertEqual(book.timestamp, 7)
+
+    def test_view_shares_memory(self):
+        book = self.matrix.view("ETHUSDT")
+        book.record['bid_size'] = 1
+        book.bids[0] = 10.0
+        self.assertEqual(self.matrix.best_bid()[1], 10.0)
+
+    def test_queries(self):
+        np.testing.assert_array_equal(self.matrix.best_bid(), [100.0, np.nan])
+        np.testing.assert_array_equal(self.matrix.best_ask(), [101.0, np.nan])
+        np.testing.assert_array_equal(self.matrix.spread(), [1.0, np.nan])
+        np.testing.assert_array_equal(self.matrix.mid(), [100.5, np.nan])
+        np.testing.assert_array_equal(self.matrix.bid_depth(2), [3.0, 0.0])
+        np.testing.assert_array_equal(self.matrix.ask_depth(3), [3.0, 0.0])
+
+    def test_update_levels(self):
+        rows = np.array([1])
+        self.matrix.update_levels(rows, np.array([[1.0, 2.0, 0.0, 0.0]]), np.array([[5.0, 6.0, 0.0, 0.0]]),
+                                  np.array([2]), np.array([[4.0, 3.0, 0.0, 0.0]]),
+                                  np.array([[7.0, 8.0, 0.0, 0.0]]), np.array([2]), timestamps=np.array([9]))
+        np.testing.assert_array_equal(self.matrix.mid(), [100.5, 2.5])
+        np.testing.assert_array_equal(self.matrix.bid_depth(1), [2.0, 6.0])
+        self.assertEqual(self.matrix.view("ETHUSDT").timestamp, 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import unittest
+
+import numpy as np
+
+from pytrading.data.book_recorder import BookRecorder, BookHistory
+from pytrading.ipc.mmap import MMapReadFileRegistry, MMapWriteFileRegistry
+from pytrading.md.lob import LOB, FixedLOB
+
+
+class TestBookRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = "test_book_recorder.bin"
+        self.recorder = BookRecorder(self.file_path, "BTCUSDT", size=2, capacity=2)
+        self.lob = LOB("BTCUSDT")
+        for i in range(5):
+            self.lob.bid_update(100.0 + i, 1.0)
+            self.lob.timestamp = 10 * i
+            self.lob.sequence = i
+            self.recorder.append_lob(self.lob)
+
+    def tearDown(self):
+        self.recorder.close()
+        self.assertNotIn(self.file_path, MMapReadFileRegistry)
+        self.assertNotIn(self.file_path, MMapWriteFileRegistry)
+        os.remove(self.file_path)
+
+    def test_recorder_grows(self):
+        self.assertEqual(len(self.recorder), 5)
+        self.assertGreaterEqual(self.recorder.capacity, 5)
+
+    def test_history(self):
+        history = BookHistory(self.file_path)
+        self.assertEqual(history.symbol, "BTCUSDT")
+        self.assertEqual(len(history), 5)
+        self.assertEqual(list(history.timestamps), [0, 10, 20, 30, 40])
+        self.assertEqual(list(history[4]['bids']), [103.0, 104.0])
+        self.assertEqual(len(history.between(10, 30)), 2)
+        self.assertEqual(history.index_of_sequence(3), 3)
+        book = history.book_at(25)
+        self.assertEqual(book.sequence, 2)
+        self.assertEqual(list(book.bids), [101.0, 102.0])
+        self.assertIsNone(history.book_at(-1))
+        self.assertFalse(history.records.flags.writeable)
+        del book
+        history.close()
+
+    def test_refresh(self):
+        history = BookHistory(self.file_path)
+        fixed = FixedLOB("BTCUSDT", 2)
+        fixed.record['timestamp'] = 50
+        self.recorder.append_many(np.repeat(fixed.record, 10))
+        self.assertEqual(len(history), 5)
+        history.refresh()
+        self.assertEqual(len(history), 15)
+        self.assertEqual(history.timestamps[-1], 50)
+        history.close()
+
+    def test_reopen(self):
+        mf = self.recorder.mf
+        self.recorder.close()
+        self.assertTrue(mf.mm.closed)
+        self.assertTrue(mf.file.closed)
+        self.recorder = BookRecorder(self.file_path, size=2)
+        self.assertEqual(len(self.recorder), 5)
+        self.assertEqual(self.recorder.symbol, "BTCUSDT")
+        self.recorder.close()
+        with self.assertRaises(AssertionError):
+            BookRecorder(self.file_path, size=3)
+        self.recorder = BookRecorder(self.file_path, size=2)
+        with self.assertRaises(AssertionError):
+            self.recorder.append_many(FixedLOB("BTCUSDT", 3).record)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from pytrading.md.conflation import BookConflator
+from pytrading.md.lob import LOB
+
+
+class TestBookConflator(unittest.TestCase):
+
+    def setUp(self):
+        self.conflator = BookConflator(size=2, capacity=1)
+        self.received = []
+        self.fast = self.conflator.add_consumer(lambda s, r: self.received.append(("fast", s, r)), 10)
+        self.slow = self.conflator.add_consumer(lambda s, r: self.received.append(("slow", s, r)), 100,
+                                                symbols=["ETHUSDT"])
+        self.btc = LOB("BTCUSDT")
+        self.eth = LOB("ETHUSDT")
+
+    def test_conflates_bursts(self):
+        for price in [100.0, 101.0, 102.0]:
+            self.btc.bid_update(price, 1.0)
+            self.conflator.update(self.btc)
+        self.eth.ask_update(10.0, 1.0)
+        self.conflator.update(self.eth)
+        self.assertEqual(self.conflator.poll(0), 3)
+        kind, symbols, records = self.received[0]
+        self.assertEqual((kind, symbols), ("fast", ["ETHUSDT", "BTCUSDT"]))
+        self.assertEqual(list(records['bids'][1]), [101.0, 102.0])
+        self.assertEqual(self.received[1][:2], ("slow", ["ETHUSDT"]))
+
+    def test_intervals(self):
+        self.conflator.update(self.btc)
+        self.conflator.poll(0)
+        self.conflator.update(self.btc)
+        self.conflator.update(self.eth)
+        self.assertEqual(self.conflator.poll(5), 0)
+        self.assertEqual(self.conflator.poll(10), 2)
+        self.assertEqual(self.conflator.poll(20), 0)
+        self.assertEqual(self.conflator.poll(100), 1)
+        self.assertEqual(self.fast.emitted, 3)
+        self.assertEqual(self.slow.emitted, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
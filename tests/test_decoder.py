@@ -0,0 +1,84 @@
+import asyncio
+import gzip
+import unittest
+import zlib
+
+from pytrading.md.lob import LOB
+from pytrading.network.decoder import DeflateDecoder, GzipDecoder, JsonDecoder, RawDecoder, ZlibDecoder
+from pytrading.network.websocket import ReconnectingWebsocket
+
+MESSAGE = b'{"e":"depthUpdate","s":"BTCUSDT","b":[["100.5","2"]],"a":[["101.0","3"]]}'
+
+
+def deflate(data: bytes) -> bytes:
+    compressor = zlib.compressobj(wbits=-15)
+    return compressor.compress(data) + compressor.flush()
+
+
+class TestDecoder(unittest.TestCase):
+
+    def test_json(self):
+        decoder = JsonDecoder()
+        self.assertEqual(decoder.decode(MESSAGE)["s"], "BTCUSDT")
+        self.assertEqual(decoder.decode(MESSAGE.decode())["s"], "BTCUSDT")
+        with self.assertRaises(ValueError):
+            decoder.decode(b"{")
+
+    def test_gzip(self):
+        decoder = GzipDecoder()
+        self.assertEqual(decoder.decode(gzip.compress(MESSAGE))["e"], "depthUpdate")
+        # text frames are not compressed
+        self.assertEqual(decoder.decode('{"result":null}'), {"result": None})
+        with self.assertRaises(zlib.error):
+            decoder.decode(b"not gzip")
+
+    def test_deflate(self):
+        self.assertEqual(DeflateDecoder().decode(deflate(MESSAGE))["a"], [["101.0", "3"]])
+
+    def test_streaming(self):
+        compressor = zlib.compressobj(wbits=-15)
+        frames = [compressor.compress(MESSAGE.replace(b"BTCUSDT", symbol)) + compressor.flush(zlib.Z_SYNC_FLUSH)
+                  for symbol in (b"BTCUSDT", b"ETHUSDT", b"SOLUSDT")]
+        decoder = DeflateDecoder(streaming=True)
+        self.assertEqual([decoder.decode(frame)["s"] for frame in frames], ["BTCUSDT", "ETHUSDT", "SOLUSDT"])
+        # a later frame depends on the history of the stream, a new connection starts a new stream
+        decoder.reset()
+        with self.assertRaises(zlib.error):
+            decoder.decode(frames[2])
+
+    def test_streaming_gzip_members(self):
+        decoder = GzipDecoder(streaming=True)
+        self.assertEqual(decoder.decode(gzip.compress(MESSAGE))["s"], "BTCUSDT")
+        self.assertEqual(decoder.decode(gzip.compress(MESSAGE))["s"], "BTCUSDT")
+        # a corrupt frame does not break the frames after it
+        with self.assertRaises(zlib.error):
+            decoder.decode(b"not gzip")
+        self.assertEqual(decoder.decode(gzip.compress(MESSAGE))["s"], "BTCUSDT")
+
+    def test_raw(self):
+        lob = LOB("BTCUSDT")
+        decoder = GzipDecoder(RawDecoder(lob.delta_update_json))
+        self.assertIsNone(decoder.decode(gzip.compress(MESSAGE)))
+        self.assertEqual(lob.bid_size, 1)
+        self.assertEqual(lob.bids[0], 100.5)
+        self.assertEqual(lob.asks[0], 101.0)
+        self.assertEqual(RawDecoder(len).decode(MESSAGE.decode()), len(MESSAGE))
+
+    def test_websocket_decoder(self):
+        loop = asyncio.new_event_loop()
+        try:
+            ws = ReconnectingWebsocket(url="ws://test.url", path="test_path", loop=loop)
+            self.assertEqual(ws._handle_message(MESSAGE.decode())["s"], "BTCUSDT")
+            self.assertIsNone(ws._handle_message("{"))
+            ws = ReconnectingWebsocket(url="ws://test.url", path="test_path", is_binary=True, loop=loop)
+            self.assertEqual(ws._handle_message(gzip.compress(MESSAGE))["s"], "BTCUSDT")
+            self.assertIsNone(ws._handle_message(b"not gzip"))
+            ws = ReconnectingWebsocket(url="ws://test.url", path="test_path", loop=loop,
+                                       decoder=ZlibDecoder(inner=RawDecoder(bytes)))
+            self.assertEqual(ws._handle_message(zlib.compress(MESSAGE)), MESSAGE)
+        finally:
+            loop.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import os
+import unittest
+
+import numpy as np
+
+from pytrading.ipc.directory import MMapDirectory
+from pytrading.ipc.mmap import MMapMode, MMapReadFileRegistry, MMapWriteFileRegistry
+from pytrading.md.lob import fix_lob_factory
+
+
+class TestMMapDirectory(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = "test_directory.bin"
+        self.publisher = MMapDirectory(self.file_path, MMapMode.WRITE, capacity=8, size=1024)
+        self.consumer = MMapDirectory(self.file_path, MMapMode.READ)
+
+    def tearDown(self):
+        self.publisher.close()
+        self.consumer.close()
+        MMapReadFileRegistry.clear()
+        MMapWriteFileRegistry.clear()
+        os.remove(self.file_path)
+
+    def test_publish_attach(self):
+        dtype = fix_lob_factory(2)
+        writer = self.publisher.publish("BTCUSDT", dtype, ring_size=4)
+        self.assertIsNone(self.consumer.attach("ETHUSDT"))
+        reader = self.consumer.attach("BTCUSDT")
+        self.assertEqual(self.consumer.dtype("BTCUSDT"), dtype)
+        record = np.zeros(1, dtype=dtype)
+        record['bids'] = [99.0, 100.0]
+        record['sequence'] = 7
+        writer.write(record)
+        sequence, data = reader.read_next()
+        self.assertEqual(sequence, 1)
+        self.assertEqual(list(np.frombuffer(data, dtype=dtype)['bids'][0]), [99.0, 100.0])
+        self.assertIn("BTCUSDT", self.consumer)
+        self.assertEqual(len(self.consumer), 1)
+
+    def test_growth_keeps_attached_rings(self):
+        writer = self.publisher.publish("S0", np.int64, ring_size=4)
+        reader = self.consumer.attach("S0")
+        writer.write(np.array([1], dtype=np.int64))
+        size = self.publisher.mf.size
+        for i in range(1, 8):
+            self.publisher.publish(f"S{i}", np.int64, ring_size=64)
+        self.assertGreater(self.publisher.mf.size, size)
+        self.assertEqual(sorted(self.consumer.symbols()), [f"S{i}" for i in range(8)])
+        writer.write(np.array([2], dtype=np.int64))
+        self.assertEqual([s for s, _ in reader.read_all()], [1, 2])
+        self.publisher.publish("S7", np.int64, ring_size=64).write(np.array([3], dtype=np.int64))
+        self.assertEqual(self.consumer.attach("S7").latest(), (1, np.array([3], dtype=np.int64).tobytes()))
+
+    def test_republish(self):
+        self.publisher.publish("BTCUSDT", np.float64, ring_size=4).write(np.array([1.0]))
+        writer = self.publisher.publish("BTCUSDT", np.float64, ring_size=4)
+        self.assertEqual(writer.write(np.array([2.0])), 2)
+        self.assertEqual(len(self.publisher), 1)
+        with self.assertRaises(AssertionError):
+            self.publisher.publish("BTCUSDT", np.int32, ring_size=4)
+
+    def test_full(self):
+        for i in range(8):
+            self.publisher.publish(f"S{i}", np.int64, ring_size=1)
+        with self.assertRaises(AssertionError):
+            self.publisher.publish("S8", np.int64, ring_size=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import asyncio
+import socket
+import unittest
+
+import aiohttp
+from aiohttp import web
+
+from pytrading.network.http import AsyncClient, TIMING_PHASES, low_latency_socket
+
+
+class TestAsyncClientTransport(unittest.TestCase):
+
+    def run_with_server(self, test):
+        async def run():
+            hits = []
+
+            async def ping(request):
+                hits.append(request.transport.get_extra_info("peername"))
+                return web.json_response({})
+
+            app = web.Application()
+            app.router.add_get("/ping", ping)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            client = AsyncClient()
+            try:
+                await test(client, f"http://127.0.0.1:{port}/ping", hits)
+            finally:
+                await client.close_connection()
+                await runner.cleanup()
+
+        asyncio.run(run())
+
+    def test_connector(self):
+        async def test(client, url, hits):
+            connector = client.session.connector
+            self.assertIsInstance(connector, aiohttp.TCPConnector)
+            self.assertEqual(connector.limit_per_host, AsyncClient.CONNECTOR_PARAMS["limit_per_host"])
+            self.assertTrue(connector.use_dns_cache)
+            self.assertEqual(await client.warmup([url]), 1)
+
+        self.run_with_server(test)
+
+    def test_low_latency_socket(self):
+        addr_info = (socket.AF_INET, socket.SOCK_STREAM, socket.IPPROTO_TCP, "", ("127.0.0.1", 0))
+        with low_latency_socket(addr_info) as sock:
+            self.assertEqual(sock.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 1)
+            self.assertEqual(sock.getsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE), 1)
+
+    def test_connector_params(self):
+        async def run():
+            client = AsyncClient(connector_params={"limit_per_host": 2})
+            self.assertEqual(client.session.connector.limit_per_host, 2)
+            self.assertEqual(client.session.connector.limit, AsyncClient.CONNECTOR_PARAMS["limit"])
+            await client.close_connection()
+
+        asyncio.run(run())
+
+    def test_warmup_and_timings(self):
+        async def test(client, url, hits):
+            self.assertEqual(await client.warmup([url], connections=3), 3)
+            self.assertEqual(len(set(hits)), 3)
+            self.assertEqual(len(client.timings), 3)
+            self.assertFalse(client.timings.last["reused"])
+            self.assertGreater(client.timings.last["connect"], 0)
+            # the next requests reuse the warm connections
+            await client._request("get", url, False)
+            self.assertTrue(client.timings.last["reused"])
+            self.assertEqual(client.timings.last["connect"], 0)
+            self.assertEqual(client.timings.last["status"], 200)
+            self.assertLess(len(set(hits)), len(hits))
+            summary = client.timings.summary()
+            self.assertEqual(set(summary), set(TIMING_PHASES))
+            self.assertEqual(summary["total"]["count"], 4)
+            self.assertEqual(summary["connect"]["count"], 3)
+            self.assertGreaterEqual(summary["ttfb"]["p99"], summary["ttfb"]["p50"])
+            client.timings.reset()
+            self.assertIsNone(client.timings.last)
+
+        self.run_with_server(test)
+
+    def test_warmup_failure(self):
+        async def run():
+            client = AsyncClient()
+            with socket.socket() as s:
+                s.bind(("127.0.0.1", 0))
+                port = s.getsockname()[1]
+            self.assertEqual(await client.warmup([f"http://127.0.0.1:{port}/ping"]), 0)
+            await client.close_connection()
+
+        asyncio.run(run())
+
+    def test_keepalive(self):
+        async def test(client, url, hits):
+            client.start_keepalive([url], connections=2, interval=0.05)
+            await asyncio.sleep(0.2)
+            self.assertGreaterEqual(len(hits), 4)
+            client.stop_keepalive()
+            n = len(hits)
+            await asyncio.sleep(0.1)
+            self.assertEqual(len(hits), n)
+            with self.assertRaises(AssertionError):
+                client.start_keepalive([url], interval=1000)
+
+        self.run_with_server(test)
+
+
+if __name__ == '__main__':
+    unittest.main()
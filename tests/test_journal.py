@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pytrading.ipc.journal import JournalWriter, JournalReader, journal_files
+from pytrading.ipc.mmap import MMapReadFileRegistry, MMapWriteFileRegistry
+
+HOUR = 3600 * 10 ** 9
+T0 = 1_700_000_000 * 10 ** 9 - 1_700_000_000 * 10 ** 9 % HOUR
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.writer = JournalWriter(self.directory, "orders", rollover="hour", chunk_size=256, index_interval=4)
+        self.reader = JournalReader(self.directory, "orders")
+
+    def tearDown(self):
+        self.writer.close()
+        self.reader.close()
+        MMapReadFileRegistry.clear()
+        MMapWriteFileRegistry.clear()
+        shutil.rmtree(self.directory)
+
+    def write(self, n, start=0, step=HOUR // 10):
+        for i in range(start, start + n):
+            self.writer.write(f"message {i}".encode(), msg_type=i % 3, timestamp=T0 + i * step)
+
+    def test_tail(self):
+        self.assertIsNone(self.reader.read())
+        self.write(3)
+        self.assertEqual(self.reader.read(), (1, T0, 0, b"message 0"))
+        self.assertEqual([m[0] for m in self.reader], [2, 3])
+        self.assertIsNone(self.reader.read())
+        self.write(2, start=3)
+        self.assertEqual(self.reader.read()[3], b"message 3")
+
+    def test_growth_and_rollover(self):
+        self.write(45)
+        self.assertEqual(len(journal_files(self.directory, "orders")), 5)
+        messages = list(self.reader)
+        self.assertEqual([m[0] for m in messages], list(range(1, 46)))
+        self.assertEqual(messages[-1][3], b"message 44")
+        self.write(1, start=45)
+        self.assertEqual(self.reader.read()[0], 46)
+
+    def test_seek(self):
+        self.write(45)
+        self.reader.seek_sequence(23)
+        self.assertEqual(self.reader.read()[0], 23)
+        self.reader.seek_sequence(1)
+        self.assertEqual(self.reader.read()[0], 1)
+        self.reader.seek_timestamp(T0 + 31 * HOUR // 10 + 1)
+        self.assertEqual(self.reader.read()[0], 33)
+        self.reader.seek_sequence(100)
+        self.assertIsNone(self.reader.read())
+        self.reader.seek_end()
+        self.write(1, start=45)
+        self.assertEqual(self.reader.read()[0], 46)
+
+    def test_writer_restart(self):
+        self.write(5)
+        self.writer.close()
+        self.writer = JournalWriter(self.directory, "orders", rollover="hour", chunk_size=256, index_interval=4)
+        self.assertEqual(self.writer.write(b"restart", timestamp=T0 + HOUR // 2), 6)
+        self.assertEqual([m[0] for m in self.reader], list(range(1, 7)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -45,5 +45,50 @@ class TestLMDB(unittest.TestCase):
         self.assertTrue(self.lmdb_write.put(key, value2))
         self.assertEqual(self.lmdb_read.get(key), value2)
 
+
+class TestLMDBBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = "test_lmdb_batch.db"
+        self.lmdb = LMDB(self.db_path, mode=LMDBMode.WRITE)
+        self.records = {b"a:1": b"1", b"a:2": b"2", b"a\xff": b"3", b"b:1": b"4", b"c": b"5"}
+        self.assertEqual(self.lmdb.put_many(self.records), 5)
+
+    def tearDown(self):
+        del self.lmdb
+        os.remove(self.db_path + "-lock")
+        os.remove(self.db_path)
+
+    def test_put_many_get_many(self):
+        self.assertEqual(self.lmdb.put_many([(b"c", b"6"), (b"d", b"7")], overwrite=False), 1)
+        self.assertEqual(self.lmdb.get_many([b"a:1", b"x", b"c", b"d"]), [b"1", None, b"5", b"7"])
+        self.assertEqual(self.lmdb.delete_many([b"d", b"x"]), 1)
+        self.assertIsNone(self.lmdb.get(b"d"))
+
+    def test_range(self):
+        self.assertEqual([k for k, _ in self.lmdb.range(b"a:2", b"c")], [b"a:2", b"a\xff", b"b:1"])
+        self.assertEqual([k for k, _ in self.lmdb.range(b"a:2", b"c", reverse=True)], [b"b:1", b"a\xff", b"a:2"])
+        self.assertEqual([k for k, _ in self.lmdb.range(None, None, reverse=True)][0], b"c")
+        self.assertEqual(list(self.lmdb.keys(b"b")), [b"b:1", b"c"])
+
+    def test_prefix(self):
+        self.assertEqual(list(self.lmdb.prefix(b"a:")), [(b"a:1", b"1"), (b"a:2", b"2")])
+        self.assertEqual([k for k, _ in self.lmdb.prefix(b"a")], [b"a:1", b"a:2", b"a\xff"])
+        self.assertEqual(list(self.lmdb.prefix(b"z")), [])
+
+    def test_buffers(self):
+        values = [bytes(v) for _, v in self.lmdb.prefix(b"a:", buffers=True)]
+        self.assertEqual(values, [b"1", b"2"])
+
+    def test_reused_read_txn(self):
+        with self.lmdb.reading():
+            self.lmdb.put(b"e", b"8")
+            self.assertIsNone(self.lmdb.get(b"e"))
+            self.assertEqual(self.lmdb.get_many([b"c"]), [b"5"])
+            self.lmdb.refresh()
+            self.assertEqual(self.lmdb.get(b"e"), b"8")
+        self.assertEqual(self.lmdb.get(b"e"), b"8")
+
+
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
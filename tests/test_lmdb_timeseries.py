@@ -0,0 +1,77 @@
+import os
+import unittest
+
+import numpy as np
+
+from pytrading.ipc.lmdb import LMDBMode
+from pytrading.ipc.lmdb_timeseries import TimeSeriesStore, encode_key, decode_key
+from pytrading.md.lob import fix_lob_factory
+
+bar_dtype = np.dtype([('open', '<f8'), ('close', '<f8'), ('volume', '<f8')])
+
+
+class TestLMDBTimeSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.db_path = "test_lmdb_timeseries.db"
+        self.store = TimeSeriesStore(self.db_path, LMDBMode.WRITE, map_size=1 << 24)
+        self.bars = self.store.dataset("bars", bar_dtype)
+        records = np.zeros(10, dtype=bar_dtype)
+        records['close'] = np.arange(10)
+        self.assertEqual(self.bars.put_many("BTCUSDT", np.arange(10) * 60 - 120, records), 10)
+        self.bars.put("ETHUSDT", 0, np.array((1.0, 2.0, 3.0), dtype=bar_dtype))
+        self.bars.put("BTC", 0, np.array((1.0, 2.0, 3.0), dtype=bar_dtype))
+
+    def tearDown(self):
+        del self.bars, self.store
+        os.remove(self.db_path + "-lock")
+        os.remove(self.db_path)
+
+    def test_keys(self):
+        self.assertLess(encode_key(b"A", -1), encode_key(b"A", 0))
+        self.assertLess(encode_key(b"A", 2 ** 40), encode_key(b"AB", -5))
+        self.assertEqual(decode_key(encode_key(b"A", -7, 3)), (b"A", -7, 3))
+        self.assertEqual(decode_key(encode_key(b"A", 7)), (b"A", 7, None))
+
+    def test_range(self):
+        keys, records = self.bars.range("BTCUSDT", -60, 120)
+        self.assertEqual(list(keys['timestamp']), [-60, 0, 60])
+        self.assertEqual(list(records['close']), [1.0, 2.0, 3.0])
+        keys, records = self.bars.range("BTCUSDT", capacity=2)
+        self.assertEqual(len(records), 10)
+        self.assertEqual(list(records['close']), list(range(10)))
+        self.assertEqual(len(self.bars.range("BTCUSDT", limit=4)[1]), 4)
+        self.assertEqual(len(self.bars.range("XRPUSDT")[1]), 0)
+
+    def test_get_latest(self):
+        self.assertEqual(self.bars.get("BTCUSDT", 60)['close'], 3.0)
+        self.assertIsNone(self.bars.get("BTCUSDT", 61))
+        timestamp, record = self.bars.latest("BTCUSDT")
+        self.assertEqual((timestamp, record['close']), (420, 9.0))
+        self.assertEqual(self.bars.latest("ETHUSDT")[0], 0)
+        self.assertIsNone(self.bars.latest("XRPUSDT"))
+
+    def test_symbols_delete(self):
+        self.assertEqual(self.bars.symbols(), ["BTC", "BTCUSDT", "ETHUSDT"])
+        self.assertEqual(self.bars.delete_range("BTCUSDT", 0, 240), 4)
+        self.assertEqual(list(self.bars.range("BTCUSDT")[0]['timestamp']), [-120, -60, 240, 300, 360, 420])
+        self.assertEqual(self.bars.delete_range("BTC"), 1)
+        self.assertEqual(self.bars.symbols(), ["BTCUSDT", "ETHUSDT"])
+
+    def test_sequence_dataset(self):
+        books = self.store.dataset("books", fix_lob_factory(2), sequence=True)
+        lob = np.zeros(1, dtype=fix_lob_factory(2))
+        for sequence in range(3):
+            lob['sequence'] = sequence
+            books.put("BTCUSDT", 100, lob[0], sequence=sequence)
+        keys, records = books.range("BTCUSDT", 100, 101)
+        self.assertEqual(list(keys['sequence']), [0, 1, 2])
+        self.assertEqual(list(records['sequence']), [0, 1, 2])
+        self.assertEqual(sorted(self.store.datasets()), ["bars", "books"])
+        self.store._datasets.clear()
+        self.assertEqual(self.store["books"].dtype, fix_lob_factory(2))
+        self.assertTrue(self.store["books"].sequence)
+
+
+if __name__ == '__main__':
+    unittest.main()
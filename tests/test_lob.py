@@ -0,0 +1,78 @@
+import unittest
+
+import numpy as np
+
+from pytrading.md.lob import LOB
+
+
+class TestLOBDelta(unittest.TestCase):
+
+    def setUp(self):
+        self.lob = LOB("BTCUSDT", capacity=2)
+        self.lob.bid_snapshot_update([(99.0, 1.0), (100.0, 2.0), (98.0, 3.0)])
+        self.lob.ask_snapshot_update([(102.0, 1.0), (101.0, 2.0), (103.0, 3.0)])
+
+    def test_snapshot_larger_than_capacity(self):
+        self.assertEqual(self.lob.bid_size, 3)
+        self.assertEqual(list(self.lob.bids), [98.0, 99.0, 100.0])
+        self.assertEqual(list(self.lob.asks), [103.0, 102.0, 101.0])
+
+    def test_bid_update(self):
+        self.lob.bid_update(99.5, 4.0)
+        self.lob.bid_update(100.0, 5.0)
+        self.assertEqual(list(self.lob.bids), [98.0, 99.0, 99.5, 100.0])
+        self.assertEqual(list(self.lob.bid_volumes), [3.0, 1.0, 4.0, 5.0])
+        self.lob.bid_remove(99.0)
+        self.lob.bid_remove(97.0)
+        self.assertEqual(list(self.lob.bids), [98.0, 99.5, 100.0])
+        self.assertEqual(list(self.lob.bid_volumes), [3.0, 4.0, 5.0])
+
+    def test_ask_update(self):
+        self.lob.ask_update(100.5, 4.0)
+        self.lob.ask_update(104.0, 1.0)
+        self.lob.ask_remove(102.0)
+        self.assertEqual(list(self.lob.asks), [104.0, 103.0, 101.0, 100.5])
+        self.assertEqual(list(self.lob.ask_volumes), [1.0, 3.0, 2.0, 4.0])
+
+    def test_delta_update(self):
+        self.lob.bid_delta_update(np.array([100.0, 101.0, 97.0, 98.0]), np.array([0.0, 1.5, 2.5, 0.0]))
+        self.assertEqual(list(self.lob.bids), [97.0, 99.0, 101.0])
+        self.assertEqual(list(self.lob.bid_volumes), [2.5, 1.0, 1.5])
+        self.lob.ask_delta_update(np.array([101.0, 101.5, 105.0]), np.array([0.0, 6.0, 1.0]))
+        self.assertEqual(list(self.lob.asks), [105.0, 103.0, 102.0, 101.5])
+        self.assertEqual(list(self.lob.ask_volumes), [1.0, 3.0, 1.0, 6.0])
+
+
+class TestLOBRaw(unittest.TestCase):
+
+    def setUp(self):
+        self.lob = LOB("BTCUSDT", capacity=2)
+
+    def test_snapshot_update_raw(self):
+        self.lob.bid_snapshot_update_raw([["100.5", "1.25"], ["100.4", "2"], ["100.45", "3"]])
+        self.lob.ask_snapshot_update_raw(np.array([["100.6", "1"], ["100.7", "2"]], dtype=np.bytes_))
+        self.assertEqual(list(self.lob.bids), [100.4, 100.45, 100.5])
+        self.assertEqual(list(self.lob.bid_volumes), [2.0, 3.0, 1.25])
+        self.assertEqual(list(self.lob.asks), [100.7, 100.6])
+
+    def test_delta_update_raw(self):
+        self.lob.bid_snapshot_update_raw([["100.5", "1"], ["100.4", "2"]])
+        self.lob.bid_delta_update_raw([["100.5", "0.00000000"], ["100.3", "4"], ["100.6", "5"]])
+        self.assertEqual(list(self.lob.bids), [100.3, 100.4, 100.6])
+        self.lob.ask_delta_update_raw([])
+        self.assertEqual(self.lob.ask_size, 0)
+
+    def test_json(self):
+        self.lob.snapshot_update_json(b'{"lastUpdateId":1,"bids":[["100.5","1"],["100.4","2"]],'
+                                      b'"asks":[["100.6","3","0","1"],["100.7","4","0","2"]]}')
+        self.assertEqual(list(self.lob.bids), [100.4, 100.5])
+        self.assertEqual(list(self.lob.asks), [100.7, 100.6])
+        self.assertEqual(list(self.lob.ask_volumes), [4.0, 3.0])
+        self.lob.delta_update_json(b'{"e":"depthUpdate","U":1,"u":2,"b":[["100.5","0"]],'
+                                   b'"a":[["100.65","1.5"],["100.8","2"],["100.9","3"]]}')
+        self.assertEqual(list(self.lob.bids), [100.4])
+        self.assertEqual(list(self.lob.asks), [100.9, 100.8, 100.7, 100.65, 100.6])
+
+
+if __name__ == '__main__':
+    unittest.main()
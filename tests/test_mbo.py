@@ -0,0 +1,89 @@
+import unittest
+
+import numpy as np
+
+from pytrading.md import mbo
+from pytrading.md.mbo import MBOBook, BID, ASK
+
+
+class TestMBOBook(unittest.TestCase):
+
+    def setUp(self):
+        self.book = MBOBook("ESZ4", order_capacity=2, level_capacity=1)
+        self.book.add(1, BID, 100.0, 1.0)
+        self.book.add(2, BID, 100.0, 2.0)
+        self.book.add(3, BID, 99.0, 3.0)
+        self.book.add(4, ASK, 101.0, 4.0)
+        self.book.add(5, ASK, 102.0, 5.0)
+
+    def test_add(self):
+        self.assertEqual(len(self.book), 5)
+        self.assertFalse(self.book.add(1, BID, 98.0, 1.0))
+        self.assertEqual(list(self.book.prices(BID)), [99.0, 100.0])
+        self.assertEqual(list(self.book.volumes(BID)), [3.0, 3.0])
+        self.assertEqual(list(self.book.prices(ASK)), [102.0, 101.0])
+
+    def test_queue_position(self):
+        self.assertEqual(self.book.queue_position(1), (0.0, 0))
+        self.assertEqual(self.book.queue_position(2), (1.0, 1))
+        self.assertIsNone(self.book.queue_position(42))
+
+    def test_cancel_and_execute(self):
+        self.assertTrue(self.book.execute(1, 0.5))
+        self.assertEqual(self.book.queue_position(2), (0.5, 1))
+        self.assertTrue(self.book.cancel(1))
+        self.assertEqual(self.book.queue_position(2), (0.0, 0))
+        self.assertTrue(self.book.cancel(3))
+        self.assertEqual(list(self.book.prices(BID)), [100.0])
+        self.assertFalse(self.book.cancel(3))
+        self.assertEqual(len(self.book), 3)
+
+    def test_modify(self):
+        self.assertTrue(self.book.modify(1, 100.0, 0.5))
+        self.assertEqual(self.book.queue_position(2), (0.5, 1))
+        self.assertTrue(self.book.modify(1, 100.0, 2.0))
+        self.assertEqual(self.book.queue_position(1), (2.0, 1))
+        self.assertTrue(self.book.modify(2, 98.0, 2.0))
+        self.assertEqual(list(self.book.prices(BID)), [98.0, 99.0, 100.0])
+        self.assertEqual(list(self.book.volumes(BID)), [2.0, 3.0, 2.0])
+        self.assertEqual(self.book.order(2)['price'], 98.0)
+
+    def test_reuse_slots(self):
+        for order_id in range(1, 6):
+            self.book.cancel(order_id)
+        self.assertEqual(len(self.book), 0)
+        self.assertEqual(self.book.bid_size, 0)
+        capacity = len(self.book.orders)
+        for order_id in range(10, 10 + capacity):
+            self.book.add(order_id, ASK, 100.0 + order_id, 1.0)
+        self.assertEqual(len(self.book.orders), capacity)
+
+    def test_apply(self):
+        actions = np.array([mbo.ADD, mbo.CANCEL, mbo.MODIFY, mbo.TRADE, mbo.CANCEL, mbo.ADD], dtype=np.uint8)
+        sides = np.array([ASK, ASK, BID, ASK, BID, BID])
+        prices = np.array([103.0, 0.0, 99.5, 101.0, 0.0, 97.0])
+        qtys = np.array([1.0, 2.0, 1.0, 1.0, 0.0, 1.0])
+        order_ids = np.array([6, 5, 3, 0, 42, 7])
+        self.book.apply(actions, sides, prices, qtys, order_ids)
+        self.assertEqual(list(self.book.prices(ASK)), [103.0, 102.0, 101.0])
+        self.assertEqual(list(self.book.volumes(ASK)), [1.0, 3.0, 4.0])
+        self.assertEqual(list(self.book.prices(BID)), [97.0, 99.5, 100.0])
+        self.assertEqual(self.book.error_count, 1)
+        self.book.apply(np.array([mbo.CLEAR], dtype=np.uint8), sides[:1], prices[:1], qtys[:1], order_ids[:1])
+        self.assertEqual(len(self.book), 0)
+        self.assertTrue(self.book.add(1, BID, 100.0, 1.0))
+
+    def test_aggregate(self):
+        lob = self.book.to_lob()
+        self.assertEqual(list(lob.bids), [99.0, 100.0])
+        self.assertEqual(list(lob.bid_volumes), [3.0, 3.0])
+        self.assertEqual(list(lob.asks), [102.0, 101.0])
+        fixed = self.book.to_fixed_lob(size=1)
+        self.assertEqual(fixed.bid_size, 1)
+        self.assertEqual(fixed.bids[0], 100.0)
+        self.assertEqual(fixed.bid_volumes[0], 3.0)
+        self.assertEqual(fixed.asks[0], 101.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import asyncio
+import unittest
+
+from pytrading.network.message_queue import MessageQueue, OverflowPolicy, symbol_channel_key
+
+
+def trade(symbol, price):
+    return {"e": "trade", "s": symbol, "p": price}
+
+
+class TestMessageQueue(unittest.TestCase):
+
+    def test_fifo(self):
+        queue = MessageQueue(4)
+        for i in range(3):
+            queue.put_nowait(i)
+        self.assertEqual(queue.qsize(), 3)
+        self.assertEqual([queue.get_nowait() for _ in range(3)], [0, 1, 2])
+        self.assertTrue(queue.empty())
+        with self.assertRaises(asyncio.QueueEmpty):
+            queue.get_nowait()
+
+    def test_drop_oldest(self):
+        queue = MessageQueue(3, OverflowPolicy.DROP_OLDEST)
+        for i in range(5):
+            self.assertTrue(queue.put_nowait(i))
+        self.assertTrue(queue.full())
+        self.assertEqual(queue.dropped, 2)
+        self.assertEqual(queue.high_water, 3)
+        self.assertEqual([queue.get_nowait() for _ in range(3)], [2, 3, 4])
+
+    def test_conflate(self):
+        queue = MessageQueue(3, OverflowPolicy.CONFLATE)
+        queue.put_nowait(trade("BTCUSDT", 1))
+        queue.put_nowait(trade("ETHUSDT", 2))
+        queue.put_nowait(trade("BTCUSDT", 3))
+        # nothing is conflated while there is room
+        self.assertEqual((queue.qsize(), queue.conflated), (3, 0))
+        # the latest BTCUSDT trade replaces the latest queued one in place
+        queue.put_nowait(trade("BTCUSDT", 4))
+        self.assertEqual((queue.conflated, queue.dropped), (1, 0))
+        # messages without a key make room by dropping the oldest
+        queue.put_nowait({"e": "error", "m": "not conflated"})
+        self.assertEqual(queue.dropped, 1)
+        self.assertEqual(queue.get_nowait(), trade("ETHUSDT", 2))
+        self.assertEqual(queue.get_nowait(), trade("BTCUSDT", 4))
+        # a consumed key is queued again instead of replacing the consumed message
+        queue.put_nowait(trade("BTCUSDT", 5))
+        queue.put_nowait(trade("ETHUSDT", 6))
+        queue.put_nowait(trade("ETHUSDT", 7))
+        self.assertEqual([queue.get_nowait() for _ in range(3)],
+                         [{"e": "error", "m": "not conflated"}, trade("BTCUSDT", 5), trade("ETHUSDT", 7)])
+
+    def test_conflate_keeps_diffs(self):
+        queue = MessageQueue(2, OverflowPolicy.CONFLATE)
+        diff = {"e": "depthUpdate", "s": "BTCUSDT", "U": 1, "u": 1}
+        queue.put_nowait(diff)
+        queue.put_nowait(dict(diff, U=2, u=2))
+        queue.put_nowait(dict(diff, U=3, u=3))
+        self.assertEqual((queue.conflated, queue.dropped), (0, 1))
+        self.assertEqual([queue.get_nowait()["u"] for _ in range(2)], [2, 3])
+
+    def test_symbol_channel_key(self):
+        self.assertEqual(symbol_channel_key(trade("BTCUSDT", 1)), ("BTCUSDT", "trade"))
+        self.assertEqual(symbol_channel_key({"stream": "btcusdt@trade", "data": {"e": "trade"}}),
+                         ("btcusdt@trade", "trade"))
+        self.assertEqual(symbol_channel_key({"stream": "btcusdt@depth20@100ms", "data": {"lastUpdateId": 1}}),
+                         ("btcusdt@depth20@100ms", None))
+        self.assertIsNone(symbol_channel_key({"stream": "btcusdt@depth@100ms", "data": {"e": "depthUpdate"}}))
+        self.assertIsNone(symbol_channel_key({"stream": "btcusdt@depth", "data": {}}))
+        self.assertIsNone(symbol_channel_key({"e": "depthUpdate", "s": "BTCUSDT"}))
+        self.assertIsNone(symbol_channel_key([1, 2]))
+
+    def test_block(self):
+        async def run():
+            queue = MessageQueue(2, OverflowPolicy.BLOCK)
+            await queue.put(0)
+            await queue.put(1)
+            self.assertFalse(queue.put_nowait(2))
+            put = asyncio.ensure_future(queue.put(2))
+            await asyncio.sleep(0)
+            self.assertFalse(put.done())
+            self.assertEqual(queue.blocked, 1)
+            self.assertEqual(await queue.get(), 0)
+            await put
+            self.assertEqual([await queue.get(), await queue.get()], [1, 2])
+            self.assertEqual(queue.dropped, 0)
+
+        asyncio.run(run())
+
+    def test_get_waits(self):
+        async def run():
+            queue = MessageQueue(2)
+            get = asyncio.ensure_future(queue.get())
+            await asyncio.sleep(0)
+            self.assertFalse(get.done())
+            queue.put_nowait("message")
+            self.assertEqual(await asyncio.wait_for(get, 1), "message")
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(queue.get(), 0.01)
+            self.assertEqual(len(queue._getters), 0)
+
+        asyncio.run(run())
+
+    def test_cancelled_after_wakeup(self):
+        async def run():
+            queue = MessageQueue(1, OverflowPolicy.BLOCK)
+            first = asyncio.ensure_future(queue.get())
+            second = asyncio.ensure_future(queue.get())
+            await asyncio.sleep(0)
+            queue.put_nowait("message")
+            # the wakeup of the first getter is passed on when it is cancelled before running
+            first.cancel()
+            self.assertEqual(await asyncio.wait_for(second, 1), "message")
+            queue.put_nowait(0)
+            first = asyncio.ensure_future(queue.put(1))
+            second = asyncio.ensure_future(queue.put(2))
+            await asyncio.sleep(0)
+            queue.get_nowait()
+            first.cancel()
+            await asyncio.wait_for(second, 1)
+            self.assertEqual(queue.get_nowait(), 2)
+
+        asyncio.run(run())
+
+    def test_reset_stats(self):
+        queue = MessageQueue(2)
+        for i in range(3):
+            queue.put_nowait(i)
+        queue.get_nowait()
+        queue.reset_stats()
+        self.assertEqual((queue.dropped, queue.high_water), (0, 1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,12 @@
 import os
 import unittest
+from unittest.mock import patch
 
-from pytrading.ipc.mmap import MMapMode, MMapFile, MMapRecord, MMapReadFileRegistry, MMapWriteFileRegistry
+import numpy as np
+
+from pytrading.ipc.mmap import MMapMode, MMapAdvice, MMapFile, MMapRecord, MMapReadFileRegistry, MMapWriteFileRegistry
+from pytrading.md.book_matrix import BookMatrix
+from pytrading.md.lob import FixedLOB, fix_lob_factory, fixed_lobs_from_mmap
 
 
 class TestMMapFile(unittest.TestCase):
@@ -40,5 +45,99 @@ class TestMMapFile(unittest.TestCase):
         self.assertEqual(record.offset, offset)
         self.assertEqual(record.size, size)
 
+
+class TestMMapFixedLOB(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = "test_mmap_lob.bin"
+        self.record_size = fix_lob_factory(4).itemsize
+        self.mmap_file_write = MMapFile(self.file_path, MMapMode.WRITE, size=self.record_size * 2)
+        self.mmap_file_read = MMapFile(self.file_path, MMapMode.READ)
+
+    def tearDown(self):
+        del self.mmap_file_read
+        MMapReadFileRegistry.clear()
+        del self.mmap_file_write
+        MMapWriteFileRegistry.clear()
+        os.remove(self.file_path)
+
+    def test_as_array(self):
+        writer = MMapRecord(self.file_path, 8, 16, MMapMode.WRITE).as_array(np.int64)
+        reader = MMapRecord(self.file_path, 8, 16).as_array(np.int64)
+        writer[1] = 42
+        self.assertEqual(reader[1], 42)
+        self.assertFalse(reader.flags.writeable)
+        del writer, reader
+
+    def test_fixed_lob_views(self):
+        size = self.record_size * 2
+        publisher = fixed_lobs_from_mmap(["BTCUSDT", "ETHUSDT"], MMapRecord(self.file_path, 0, size, MMapMode.WRITE), 4)
+        subscriber = FixedLOB.from_mmap("ETHUSDT", MMapRecord(self.file_path, 0, size), 4, index=1)
+        publisher[1].record['bid_size'] = 1
+        publisher[1].bids[0] = 100.0
+        self.assertEqual(subscriber.bid_size, 1)
+        self.assertEqual(subscriber.bids[0], 100.0)
+        matrix = BookMatrix.from_mmap(MMapRecord(self.file_path, 0, size), ["BTCUSDT", "ETHUSDT"], 4)
+        np.testing.assert_array_equal(matrix.best_bid(), [np.nan, 100.0])
+        del publisher, subscriber, matrix
+
+
+class TestMMapOptions(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = "test_mmap_options.bin"
+
+    def tearDown(self):
+        MMapReadFileRegistry.clear()
+        MMapWriteFileRegistry.clear()
+        os.remove(self.file_path)
+
+    def test_populate_advice(self):
+        mf = MMapFile(self.file_path, MMapMode.WRITE, size=1 << 16, populate=True, advice=MMapAdvice.SEQUENTIAL)
+        mf.extend(1 << 17)
+        mf.mm[-1] = 1
+        reader = MMapFile(self.file_path, MMapMode.READ, populate=True, advice=MMapAdvice.RANDOM)
+        self.assertEqual(reader.mm[-1], 1)
+        del reader, mf
+
+    def test_populate_fallback(self):
+        # kernels without MADV_POPULATE_WRITE prefault by writing the pages of the fresh range only
+        with patch.object(MMapFile, "_populate", return_value=False) as populate:
+            mf = MMapFile(self.file_path, MMapMode.WRITE, size=1 << 16, populate=True)
+            mf.mm[:4] = b"data"
+            other = MMapFile(self.file_path, MMapMode.WRITE, populate=True)
+            mf.extend(3 << 15)
+            self.assertEqual(populate.call_args.args[1:], (1 << 16, 1 << 15))
+        self.assertEqual(other.mm[:4], b"data")
+        self.assertEqual(mf.mm[:4], b"data")
+        del other, mf
+
+    def test_lock(self):
+        try:
+            mf = MMapFile(self.file_path, MMapMode.WRITE, size=4096, lock=True)
+        except OSError:
+            self.skipTest("mlock not permitted")
+        self.assertTrue(mf.lock)
+        del mf
+
+    def test_shared_records(self):
+        mf = MMapFile(self.file_path, MMapMode.WRITE, size=1024)
+        first = MMapRecord(self.file_path, 0, 512, MMapMode.WRITE)
+        second = MMapRecord(self.file_path, 512, 512, MMapMode.WRITE)
+        self.assertIs(first.mf, second.mf)
+        self.assertEqual(mf.refs, 3)
+        first.close()
+        second.close()
+        self.assertEqual(mf.refs, 1)
+        del mf
+        MMapWriteFileRegistry.clear()
+        reader = MMapRecord(self.file_path, 0, 512)
+        self.assertIs(MMapReadFileRegistry[self.file_path], reader.mf)
+        mf = reader.mf
+        reader.close()
+        self.assertNotIn(self.file_path, MMapReadFileRegistry)
+        self.assertTrue(mf.mm.closed)
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
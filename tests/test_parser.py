@@ -0,0 +1,40 @@
+import unittest
+
+import numpy as np
+
+from pytrading.md.parser import as_bytes, find_json_array, parse_decimal, sort_levels
+
+
+class TestParser(unittest.TestCase):
+
+    def parse(self, text):
+        buf = as_bytes(text)
+        return parse_decimal(buf, 0, len(buf))
+
+    def test_parse_decimal(self):
+        for text in ["0", "1", "-1.5", "65432.10000000", "0.00000001", "123456789.123456789", "1e-5", "2.5E+3"]:
+            self.assertEqual(self.parse(text), float(text))
+        self.assertEqual(self.parse('12.5"'), 12.5)
+        # leading zeros are not significant digits
+        for text in ["0.000000000000000012345", "00000000000000000000001.5"]:
+            self.assertEqual(self.parse(text), float(text))
+
+    def test_sort_levels(self):
+        prices = np.array([3.0, 1.0, 2.0])
+        volumes = np.array([30.0, 10.0, 20.0])
+        sort_levels(prices, volumes, 3, False)
+        self.assertEqual(list(prices), [3.0, 2.0, 1.0])
+        self.assertEqual(list(volumes), [30.0, 20.0, 10.0])
+        sort_levels(prices, volumes, 3, True)
+        self.assertEqual(list(prices), [1.0, 2.0, 3.0])
+        self.assertEqual(list(volumes), [10.0, 20.0, 30.0])
+
+    def test_find_json_array(self):
+        buf = as_bytes(b'{"a": [[1, 2]], "b":[]}')
+        self.assertEqual(find_json_array(buf, as_bytes(b"a")), (6, 14))
+        self.assertEqual(find_json_array(buf, as_bytes(b"b")), (20, 22))
+        self.assertEqual(find_json_array(buf, as_bytes(b"c")), (-1, -1))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import os
+import struct
+import unittest
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapMode, MMapFile, MMapRecord, MMapReadFileRegistry, MMapWriteFileRegistry
+from pytrading.ipc.record_cache import RingBuffer, RecordCacheReader, RecordCacheWriter, BUSY
+
+
+class TestRecordCache(unittest.TestCase):
+
+    def setUp(self):
+        self.file_path = "test_record_cache.bin"
+        self.size = 4
+        self.record_size = 16
+        itemsize = (self.record_size + 8) * self.size + 8
+        self.mmap_file_write = MMapFile(self.file_path, MMapMode.WRITE, size=itemsize)
+        self.mmap_file_read = MMapFile(self.file_path, MMapMode.READ)
+        self.writer = RecordCacheWriter(self.ring(MMapMode.WRITE))
+        self.reader = RecordCacheReader(self.ring(MMapMode.READ))
+
+    def tearDown(self):
+        del self.writer, self.reader
+        del self.mmap_file_read
+        MMapReadFileRegistry.clear()
+        del self.mmap_file_write
+        MMapWriteFileRegistry.clear()
+        os.remove(self.file_path)
+
+    def ring(self, mode):
+        itemsize = (self.record_size + 8) * self.size + 8
+        return RingBuffer(self.size, self.record_size, MMapRecord(self.file_path, 0, itemsize, mode))
+
+    def record(self, i):
+        return struct.pack("<QQ", i, i * 10)
+
+    def test_empty(self):
+        self.assertIsNone(self.reader.latest())
+        self.assertIsNone(self.reader.read_next())
+        self.assertEqual(self.reader.version, 1)
+
+    def test_latest(self):
+        for i in range(1, 4):
+            self.assertEqual(self.writer.write(self.record(i)), i)
+        self.assertEqual(self.reader.latest(), (3, self.record(3)))
+
+    def test_read_next(self):
+        self.writer.write(self.record(1))
+        self.writer.write(self.record(2))
+        self.assertEqual(self.reader.read_next(), (1, self.record(1)))
+        self.assertEqual(self.reader.read_next(), (2, self.record(2)))
+        self.assertIsNone(self.reader.read_next())
+        self.writer.write(self.record(3))
+        self.assertEqual(self.reader.read_next(), (3, self.record(3)))
+
+    def test_lapped_reader(self):
+        for i in range(1, 11):
+            self.writer.write(self.record(i))
+        self.assertEqual(self.reader.read_next(), (7, self.record(7)))
+        self.assertEqual(self.reader.missed, 6)
+        self.assertEqual(self.reader.read_since(8), (9, self.record(9)))
+
+    def test_torn_record(self):
+        self.writer.write(self.record(1))
+        self.writer.ring.set_sequence(1, BUSY)
+        self.assertIsNone(self.reader.read_next())
+        self.writer.ring.set_sequence(1, 1)
+        self.assertEqual(self.reader.read_next(), (1, self.record(1)))
+
+    def test_writer_restart(self):
+        for i in range(1, 6):
+            self.writer.write(self.record(i))
+        writer = RecordCacheWriter(self.ring(MMapMode.WRITE))
+        self.assertEqual(writer.write(self.record(6)), 6)
+        self.assertEqual(self.reader.version, 2)
+        self.assertEqual(self.reader.latest(), (6, self.record(6)))
+
+    def test_changed_since(self):
+        self.assertEqual(list(self.writer.ring.changed_since(0)), [])
+        for i in range(1, 7):
+            self.writer.write(self.record(i))
+        self.assertEqual(list(self.reader.ring.changed_since(3)), [0, 1, 2])
+        self.writer.ring.set_sequence(1, BUSY)
+        self.assertEqual(list(self.reader.ring.changed_since(3)), [0, 2])
+        self.assertEqual(list(self.reader.ring.get_sequences()), [4, BUSY, 6, 3])
+
+    def test_read_all(self):
+        for i in range(1, 7):
+            self.writer.write(self.record(i))
+        self.reader.sequence = 1
+        self.assertEqual(self.reader.read_all(), [(i, self.record(i)) for i in range(3, 7)])
+        self.assertEqual(self.reader.missed, 1)
+        self.assertEqual(self.reader.read_all(), [])
+
+    def test_read_next_into(self):
+        out = np.zeros(self.record_size, dtype=np.uint8)
+        self.assertEqual(self.reader.read_next_into(out), 0)
+        self.writer.write(np.frombuffer(self.record(1), dtype=np.uint8))
+        self.assertEqual(self.reader.read_next_into(out), 1)
+        self.assertEqual(out.tobytes(), self.record(1))
+        self.assertEqual(self.reader.read_next_into(out), 0)
+
+    def test_lapped_reader_into(self):
+        out = np.zeros(self.record_size, dtype=np.uint8)
+        for i in range(1, 11):
+            self.writer.write(self.record(i))
+        # slot 1 holds record 9, the oldest record still in the ring is 7
+        self.assertEqual(self.reader.read_next_into(out), 7)
+        self.assertEqual(out.tobytes(), self.record(7))
+        self.assertEqual(self.reader.missed, 6)
+        self.assertEqual([self.reader.read_next_into(out) for _ in range(4)], [8, 9, 10, 0])
+        self.assertEqual(out.tobytes(), self.record(10))
+        self.assertEqual(self.reader.missed, 6)
+
+    def test_unaligned_record(self):
+        self.record_size = 13
+        ring = self.ring(MMapMode.READ)
+        self.assertIsNone(ring._words)
+        self.assertEqual(ring.get_sequence(0), 0)
+        self.assertEqual(ring.get_latest_idx(), 0)
+        del ring
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+
+import numpy as np
+from numba import njit
+
+from pytrading.container import CircularBuffer
+from pytrading.container.ring import ring_push, ring_mean
+
+
+class TestCircularBuffer(unittest.TestCase):
+
+    def setUp(self):
+        self.buffer = CircularBuffer(capacity=4)
+
+    def test_append(self):
+        for i in range(6):
+            self.buffer.append(float(i), ts=i)
+        self.assertEqual(len(self.buffer), 4)
+        self.assertEqual(list(self.buffer.last()), [2.0, 3.0, 4.0, 5.0])
+        self.assertEqual(list(self.buffer.last(2)), [4.0, 5.0])
+        self.assertEqual(list(self.buffer.last_times(2)), [4, 5])
+        self.assertEqual(self.buffer.latest(), 5.0)
+
+    def test_last_is_view(self):
+        self.buffer.extend(np.arange(3.0))
+        self.assertTrue(np.shares_memory(self.buffer.last(), self.buffer.values))
+
+    def test_statistics(self):
+        data = np.random.default_rng(0).normal(size=100)
+        for i, value in enumerate(data):
+            self.buffer.append(value, ts=i)
+            window = data[max(i - 3, 0):i + 1]
+            self.assertAlmostEqual(self.buffer.sum(), window.sum())
+            self.assertAlmostEqual(self.buffer.mean(), window.mean())
+            self.assertAlmostEqual(self.buffer.min(), window.min())
+            self.assertAlmostEqual(self.buffer.max(), window.max())
+            if len(window) > 1:
+                self.assertAlmostEqual(self.buffer.var(), window.var(ddof=1))
+
+    def test_evict_before(self):
+        self.buffer.extend(np.array([3.0, 1.0, 4.0, 2.0]), np.array([10, 20, 30, 40]))
+        self.assertEqual(self.buffer.evict_before(25), 2)
+        self.assertEqual(list(self.buffer.last()), [4.0, 2.0])
+        self.assertEqual(self.buffer.min(), 2.0)
+        self.assertEqual(self.buffer.max(), 4.0)
+        self.assertEqual(self.buffer.evict_before(100), 2)
+        self.assertEqual(len(self.buffer), 0)
+        self.assertTrue(np.isnan(self.buffer.mean()))
+        self.buffer.append(7.0, ts=110)
+        self.assertEqual(self.buffer.min(), 7.0)
+
+    def test_njit_kernels(self):
+        @njit
+        def signal(values, times, istate, fstate, min_queue, max_queue, data):
+            for i in range(len(data)):
+                ring_push(values, times, istate, fstate, min_queue, max_queue, data[i], i)
+            return ring_mean(istate, fstate)
+
+        b = self.buffer
+        mean = signal(b.values, b.times, b.istate, b.fstate, b.min_queue, b.max_queue, np.arange(10.0))
+        self.assertEqual(mean, 7.5)
+        self.assertEqual(b.max(), 9.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
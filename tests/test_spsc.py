@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from pytrading.ipc.mmap import MMapReadFileRegistry, MMapWriteFileRegistry
+from pytrading.ipc.spsc import SPSCQueue, OrderChannel, order_command_dtype, NEW, CANCEL, ACCEPTED, BUY
+
+
+def produce(file_path, n, started=None):
+    queue = SPSCQueue(file_path, np.int64, capacity=8)
+    value = np.zeros(1, dtype=np.int64)
+    i = 0
+    while i < n:
+        value[0] = i
+        if queue.try_push(value[0]):
+            i += 1
+            if started is not None and i == 1:
+                started.set()
+    queue.close()
+
+
+class TestSPSCQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.directory, "test_spsc.bin")
+        self.queue = SPSCQueue(self.file_path, np.int64, capacity=4)
+
+    def tearDown(self):
+        self.queue.close()
+        MMapReadFileRegistry.clear()
+        MMapWriteFileRegistry.clear()
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def test_backpressure(self):
+        for i in range(4):
+            self.assertTrue(self.queue.try_push(i))
+        self.assertTrue(self.queue.full())
+        self.assertFalse(self.queue.try_push(4))
+        self.assertEqual(self.queue.rejected, 1)
+        out = np.zeros(1, dtype=np.int64)
+        self.assertTrue(self.queue.try_pop(out))
+        self.assertEqual(out[0], 0)
+        self.assertTrue(self.queue.try_push(4))
+        self.assertEqual(len(self.queue), 4)
+
+    def test_wrap_around(self):
+        out = np.zeros(8, dtype=np.int64)
+        for i in range(3):
+            self.queue.try_push(i)
+        self.assertEqual(self.queue.pop_many(out[:2]), 2)
+        for i in range(3, 6):
+            self.queue.try_push(i)
+        self.assertEqual(self.queue.pop_many(out), 4)
+        self.assertEqual(list(out[:4]), [2, 3, 4, 5])
+        self.assertTrue(self.queue.empty())
+        self.assertEqual(self.queue.pop_many(out), 0)
+        self.assertFalse(self.queue.try_pop(out))
+
+    def test_claim_peek(self):
+        slot = self.queue.claim()
+        slot[...] = 7
+        self.assertIsNone(self.queue.peek())
+        self.queue.publish()
+        self.assertEqual(self.queue.peek(), 7)
+        self.queue.advance()
+        self.assertIsNone(self.queue.peek())
+
+    def test_other_process(self):
+        n = 1000
+        process = multiprocessing.get_context("fork").Process(target=produce, args=(self.file_path + "2", n))
+        consumer = SPSCQueue(self.file_path + "2", np.int64, capacity=8)
+        process.start()
+        out = np.zeros(8, dtype=np.int64)
+        received = []
+        while len(received) < n:
+            received.extend(out[:consumer.pop_many(out)])
+        process.join()
+        self.assertEqual(received, list(range(n)))
+        consumer.close()
+
+    def test_attach_while_pushing(self):
+        n = 1000
+        file_path = self.file_path + "3"
+        SPSCQueue(file_path, np.int64, capacity=8).close()
+        context = multiprocessing.get_context("fork")
+        started = context.Event()
+        process = context.Process(target=produce, args=(file_path, n, started))
+        process.start()
+        self.assertTrue(started.wait(10))
+        # prefaulting the pages the producer is writing must not change them
+        consumer = SPSCQueue(file_path, np.int64, capacity=8, populate=True)
+        out = np.zeros(8, dtype=np.int64)
+        received = []
+        while len(received) < n:
+            received.extend(out[:consumer.pop_many(out)])
+        process.join()
+        self.assertEqual(received, list(range(n)))
+        consumer.close()
+
+    def test_order_channel(self):
+        strategy = OrderChannel(os.path.join(self.directory, "orders"), capacity=4)
+        gateway = OrderChannel(os.path.join(self.directory, "orders"), capacity=4)
+        order = strategy.commands.claim()
+        order['command'] = NEW
+        order['side'] = BUY
+        order['request_id'] = 1
+        order['price'] = 100.5
+        order['quantity'] = 2.0
+        order['symbol'] = b"BTCUSDT"
+        strategy.commands.publish()
+        command = np.zeros(1, dtype=order_command_dtype)
+        command['command'] = CANCEL
+        strategy.commands.try_push(command[0])
+        received = np.zeros(2, dtype=order_command_dtype)
+        self.assertEqual(gateway.commands.pop_many(received), 2)
+        self.assertEqual(received[0]['symbol'], b"BTCUSDT")
+        self.assertEqual(received[1]['command'], CANCEL)
+        ack = gateway.acks.claim()
+        ack['status'] = ACCEPTED
+        ack['request_id'] = received[0]['request_id']
+        gateway.acks.publish()
+        self.assertEqual(strategy.acks.peek()['request_id'], 1)
+        del order, ack
+        strategy.close()
+        gateway.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
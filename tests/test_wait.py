@@ -0,0 +1,89 @@
+import os
+import struct
+import tempfile
+import threading
+import time
+import unittest
+
+from pytrading.ipc.mmap import MMapMode, MMapFile, MMapRecord, MMapReadFileRegistry, MMapWriteFileRegistry
+from pytrading.ipc.record_cache import RingBuffer, RecordCacheReader, RecordCacheWriter
+from pytrading.ipc.wait import BusySpinWait, SpinYieldWait, BackoffWait, EventfdWait, PipeWait, WaitFanout
+
+
+class TestWaitStrategies(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.dir, "test_wait.bin")
+        itemsize = (8 + 8) * 4 + 8
+        self.mmap_file = MMapFile(self.file_path, MMapMode.WRITE, size=itemsize)
+        self.ring = RingBuffer(4, 8, MMapRecord(self.file_path, 0, itemsize, MMapMode.WRITE))
+        self.writer = RecordCacheWriter(self.ring)
+        self.reader = RecordCacheReader(self.ring)
+
+    def tearDown(self):
+        del self.writer, self.reader, self.ring
+        del self.mmap_file
+        MMapReadFileRegistry.clear()
+        MMapWriteFileRegistry.clear()
+        os.remove(self.file_path)
+
+    def write_later(self, value, delay=0.01):
+        def run():
+            time.sleep(delay)
+            self.writer.write(struct.pack("<q", value))
+        thread = threading.Thread(target=run)
+        thread.start()
+        return thread
+
+    def check(self, strategy):
+        self.writer.notifier = strategy
+        thread = self.write_later(5)
+        self.assertEqual(self.reader.wait_next(strategy, timeout_ns=5_000_000_000), (1, struct.pack("<q", 5)))
+        thread.join()
+        self.assertIsNone(self.reader.wait_next(strategy, timeout_ns=1_000_000))
+        self.assertEqual(strategy.stats.count, 1)
+        self.assertEqual(strategy.stats.timeouts, 1)
+        self.assertGreaterEqual(strategy.stats.percentile(99), 0)
+        self.assertIn("p99.9", strategy.stats.summary())
+
+    def test_busy_spin(self):
+        self.check(BusySpinWait())
+
+    def test_spin_yield(self):
+        self.check(SpinYieldWait(spins=10))
+
+    def test_backoff(self):
+        self.check(BackoffWait(spins=10, yields=10))
+
+    def test_eventfd(self):
+        strategy = EventfdWait()
+        self.check(strategy)
+        self.assertGreater(strategy.stats.latencies()[0], 0)
+        strategy.close()
+
+    def test_pipe(self):
+        strategy = PipeWait(os.path.join(self.dir, "test_wait.fifo"))
+        self.check(strategy)
+        self.assertGreater(strategy.stats.latencies()[0], 0)
+        strategy.close()
+        os.remove(strategy.path)
+
+    def test_signal_before_wait(self):
+        strategy = EventfdWait()
+        self.writer.notifier = WaitFanout(strategy, BusySpinWait())
+        self.writer.write(struct.pack("<q", 1))
+        self.assertEqual(self.reader.wait_next(strategy, timeout_ns=1_000_000)[0], 1)
+        # the signal of the record read without blocking was drained with it
+        self.assertEqual(strategy._signalled[0], 0)
+        self.assertEqual(strategy._drain(), 0)
+        self.writer.notifier = strategy
+        thread = self.write_later(2, delay=0.05)
+        self.assertEqual(self.reader.wait_next(strategy, timeout_ns=5_000_000_000)[0], 2)
+        thread.join()
+        self.assertLess(strategy.stats.latencies()[0], 50_000_000)
+        strategy.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from pytrading.network.websocket import ArbitratedConnection, ArbitratedWebsocket, update_id_key
+
+
+def depth(u):
+    return '{"e":"depthUpdate","s":"BTCUSDT","U":%d,"u":%d,"b":[["1.0","2"]],"a":[["1.1","3"]]}' % (u, u)
+
+
+class TestArbitratedWebsocket(unittest.TestCase):
+
+    def test_update_id_key(self):
+        self.assertEqual(update_id_key({"e": "depthUpdate", "s": "BTCUSDT", "u": 7, "a": []}),
+                         ("BTCUSDT", "depthUpdate", 7))
+        self.assertEqual(update_id_key({"stream": "btcusdt@trade", "data": {"e": "trade", "t": 3}}),
+                         ("btcusdt@trade", "trade", 3))
+        self.assertEqual(update_id_key({"lastUpdateId": 5, "bids": []}), (None, None, 5))
+        self.assertEqual(update_id_key({"e": "aggTrade", "s": "BTCUSDT", "a": 9, "E": 2}), ("BTCUSDT", "aggTrade", 9))
+        # the best ask of a ticker is not an update id, only integers are
+        self.assertEqual(update_id_key({"e": "24hrTicker", "s": "BTCUSDT", "a": "101.0", "E": 2}),
+                         ("BTCUSDT", "24hrTicker", 2))
+        self.assertIsNone(update_id_key({"e": "24hrTicker", "s": "BTCUSDT", "a": "101.0"}))
+        self.assertIsNone(update_id_key({"result": None, "id": 1}))
+        self.assertIsNone(update_id_key([1, 2]))
+
+    def test_first_arrival(self):
+        async def run():
+            feed = ArbitratedWebsocket(["wss://a/", "wss://b/", "wss://c/"], "btcusdt@depth",
+                                       loop=asyncio.get_running_loop())
+            a, b, c = feed.connections
+            self.assertIsInstance(a, ArbitratedConnection)
+            self.assertTrue(all(connection.queue is feed.queue for connection in feed.connections))
+            self.assertEqual(a._handle_message(depth(1))["u"], 1)
+            self.assertIsNone(b._handle_message(depth(1)))
+            self.assertIsNone(c._handle_message(depth(1)))
+            self.assertEqual(b._handle_message(depth(2))["u"], 2)
+            self.assertIsNone(a._handle_message(depth(2)))
+            # a copy received twice by one connection counts once
+            self.assertIsNone(a._handle_message(depth(2)))
+            # messages without a key are not arbitrated
+            self.assertEqual(a._handle_message('{"result":null,"id":1}'), {"result": None, "id": 1})
+            stats = feed.stats()
+            self.assertEqual([s["wins"] for s in stats], [1, 1, 0])
+            self.assertEqual([s["win_rate"] for s in stats], [0.5, 0.5, 0.0])
+            self.assertEqual([s["received"] for s in stats], [4, 2, 1])
+            self.assertEqual([s["lag"]["count"] for s in stats], [2, 2, 1])
+            self.assertGreaterEqual(stats[2]["lag"]["p50"], 0)
+            self.assertEqual(stats[1]["url"], "wss://b/")
+
+        asyncio.run(run())
+
+    def test_tickers_sharing_best_ask(self):
+        async def run():
+            feed = ArbitratedWebsocket("wss://a/", "btcusdt@ticker", connections=2, loop=asyncio.get_running_loop())
+            a, b = feed.connections
+            first = '{"e":"24hrTicker","E":1,"s":"BTCUSDT","p":"1.0","a":"101.0"}'
+            second = '{"e":"24hrTicker","E":2,"s":"BTCUSDT","p":"2.0","a":"101.0"}'
+            self.assertEqual(a._handle_message(first)["p"], "1.0")
+            self.assertEqual(a._handle_message(second)["p"], "2.0")
+            self.assertIsNone(b._handle_message(second))
+            self.assertEqual(feed.unique, 2)
+
+        asyncio.run(run())
+
+    def test_missed(self):
+        async def run():
+            feed = ArbitratedWebsocket("wss://a/", "btcusdt@depth", connections=2, window=2,
+                                       loop=asyncio.get_running_loop())
+            a, b = feed.connections
+            for u in range(1, 5):
+                a._handle_message(depth(u))
+                if u != 2:
+                    b._handle_message(depth(u))
+            # messages 1 and 2 left the window, b never received 2
+            self.assertEqual(feed.missed, [0, 1])
+            self.assertEqual(feed.wins, [4, 0])
+            feed.reset_stats()
+            self.assertEqual(feed.stats()[0]["received"], 0)
+
+        asyncio.run(run())
+
+    def test_lag_beyond_window(self):
+        async def run():
+            feed = ArbitratedWebsocket("wss://a/", "btcusdt@depth", connections=2, window=3,
+                                       loop=asyncio.get_running_loop())
+            a, b = feed.connections
+            self.assertEqual([a._handle_message(depth(u))["u"] for u in range(1, 6)], [1, 2, 3, 4, 5])
+            # b lags by more than the window, none of its copies is delivered again
+            self.assertEqual([b._handle_message(depth(u)) for u in range(1, 6)], [None] * 5)
+            self.assertEqual(feed.wins, [5, 0])
+            self.assertEqual(feed.unique, 5)
+            # 1 and 2 left the window before b received them, 3 to 5 were still in it
+            self.assertEqual(feed.missed, [0, 2])
+            self.assertEqual(feed.late, [0, 2])
+            self.assertEqual(feed.stats()[1]["lag"]["count"], 3)
+            self.assertEqual(b._handle_message(depth(6))["u"], 6)
+            self.assertEqual(feed.wins, [5, 1])
+
+        asyncio.run(run())
+
+    def test_drop(self):
+        async def run():
+            feed = ArbitratedWebsocket("wss://a/", "btcusdt@depth", connections=2, loop=asyncio.get_running_loop())
+            with patch.object(ArbitratedConnection, "__aexit__", AsyncMock()) as aexit:
+                await feed.drop(1)
+                self.assertEqual([s["active"] for s in feed.stats()], [True, False])
+                with self.assertRaises(AssertionError):
+                    await feed.drop(0)
+                await feed.close()
+                self.assertEqual(aexit.await_count, 2)
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()
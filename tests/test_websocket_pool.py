@@ -0,0 +1,192 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import orjson
+
+from pytrading.network.websocket import PoolFull, SubscribingWebsocket, WebsocketManager, WebsocketPool, \
+    WSListenerState
+
+
+def streaming(socket: SubscribingWebsocket) -> AsyncMock:
+    socket.ws = AsyncMock()
+    socket.ws_state = WSListenerState.STREAMING
+    return socket.ws.send
+
+
+def requests(send: AsyncMock):
+    return [orjson.loads(call.args[0]) for call in send.call_args_list]
+
+
+class TestSubscribingWebsocket(unittest.TestCase):
+
+    def run_async(self, coro):
+        return asyncio.run(coro)
+
+    def test_subscribe(self):
+        async def run():
+            socket = SubscribingWebsocket(url="wss://test.url/", loop=asyncio.get_running_loop())
+            socket.REQUEST_INTERVAL = 0
+            # before the connection streams are only recorded
+            await socket.subscribe(["btcusdt@trade"])
+            send = streaming(socket)
+            await socket.subscribe(["btcusdt@trade", "ethusdt@trade"])
+            await socket.unsubscribe(["btcusdt@trade", "solusdt@trade"])
+            self.assertEqual(socket.streams, {"ethusdt@trade"})
+            self.assertEqual([(r["method"], r["params"]) for r in requests(send)],
+                             [("SUBSCRIBE", ["ethusdt@trade"]), ("UNSUBSCRIBE", ["btcusdt@trade"])])
+            self.assertEqual(requests(send)[1]["id"], 2)
+
+        self.run_async(run())
+
+    def test_resubscribe_after_connect(self):
+        async def run():
+            socket = SubscribingWebsocket(url="wss://test.url/", loop=asyncio.get_running_loop())
+            socket.REQUEST_INTERVAL = 0
+            socket.MAX_PARAMS = 2
+            await socket.subscribe(["a@trade", "b@trade", "c@trade"])
+            send = streaming(socket)
+            await socket._after_connect()
+            self.assertEqual([r["params"] for r in requests(send)], [["a@trade", "b@trade"], ["c@trade"]])
+
+        self.run_async(run())
+
+    def test_message_counts(self):
+        async def run():
+            socket = SubscribingWebsocket(url="wss://test.url/", loop=asyncio.get_running_loop())
+            message = '{"stream":"btcusdt@trade","data":{"p":"1"}}'
+            self.assertEqual(socket._handle_message(message)["data"], {"p": "1"})
+            socket._handle_message(message)
+            # replies to requests are not queued
+            self.assertIsNone(socket._handle_message('{"result":null,"id":1}'))
+            self.assertIsNone(socket._handle_message('{"error":{"code":2},"id":2}'))
+            self.assertEqual(socket.take_counts(), {"btcusdt@trade": 2})
+            self.assertEqual(socket.message_counts, {})
+
+        self.run_async(run())
+
+
+@patch.object(SubscribingWebsocket, "connect", AsyncMock())
+class TestWebsocketPool(unittest.TestCase):
+
+    def test_sharding(self):
+        async def run():
+            pool = WebsocketPool("wss://test.url/", max_streams=2, loop=asyncio.get_running_loop())
+            pool.CONNECT_INTERVAL = 0
+            await pool.subscribe([f"s{i}@trade" for i in range(5)])
+            self.assertEqual(len(pool.sockets), 3)
+            self.assertEqual(sorted(len(socket.streams) for socket in pool.sockets), [1, 2, 2])
+            self.assertEqual(sorted(pool.streams), [f"s{i}@trade" for i in range(5)])
+            # connections share the queue of the pool
+            self.assertTrue(all(socket.queue is pool.queue for socket in pool.sockets))
+            await pool.unsubscribe(["s0@trade", "s1@trade"])
+            self.assertEqual(sum(len(socket.streams) for socket in pool.sockets), 3)
+            await pool.subscribe(["s0@trade"])
+            self.assertEqual(len(pool.sockets), 3)
+
+        asyncio.run(run())
+
+    def test_rebalance(self):
+        async def run():
+            pool = WebsocketPool("wss://test.url/", max_streams=4, loop=asyncio.get_running_loop())
+            pool.CONNECT_INTERVAL = 0
+            await pool.subscribe(["a", "b", "c", "d", "e"])
+            first, second = pool.sockets
+            self.assertEqual((len(first.streams), len(second.streams)), (4, 1))
+            for stream in first.streams:
+                first.message_counts[stream] = 100
+            second.message_counts["e"] = 1
+            moved = await pool.rebalance()
+            self.assertGreater(moved, 0)
+            self.assertEqual(len(first.streams) + len(second.streams), 5)
+            self.assertEqual(len(first.streams & second.streams), 0)
+            self.assertAlmostEqual(abs(first.load(pool.rates) - second.load(pool.rates)), pool.rates["e"])
+            # balanced loads are left alone
+            for socket in pool.sockets:
+                for stream in socket.streams:
+                    socket.message_counts[stream] = 100 if stream != "e" else 1
+            self.assertEqual(await pool.rebalance(), 0)
+
+        asyncio.run(run())
+
+    def test_pool_full(self):
+        async def run():
+            pool = WebsocketPool("wss://test.url/", max_streams=1, max_connections=2,
+                                 loop=asyncio.get_running_loop())
+            pool.CONNECT_INTERVAL = 0
+            with self.assertRaises(PoolFull):
+                await pool.subscribe(["a", "b", "c"])
+            # nothing was assigned or opened
+            self.assertEqual((pool.streams, pool.sockets), ([], []))
+            await pool.subscribe(["a", "b"])
+            self.assertEqual(sorted(pool.streams), ["a", "b"])
+            with self.assertRaises(PoolFull):
+                await pool.subscribe(["c"])
+
+        asyncio.run(run())
+
+    def test_connect_failure_keeps_assigned(self):
+        async def run():
+            pool = WebsocketPool("wss://test.url/", max_streams=1, loop=asyncio.get_running_loop())
+            pool.CONNECT_INTERVAL = 0
+            with patch.object(SubscribingWebsocket, "subscribe", AsyncMock()) as subscribe:
+                with patch.object(SubscribingWebsocket, "connect", AsyncMock(side_effect=[None, OSError])):
+                    with self.assertRaises(OSError):
+                        await pool.subscribe(["a", "b"])
+                # the stream assigned before the failed connect was subscribed
+                self.assertEqual(pool.streams, ["a"])
+                self.assertEqual(subscribe.await_args.args, (["a"],))
+
+        asyncio.run(run())
+
+    def test_rebalance_handover(self):
+        async def run():
+            pool = WebsocketPool("wss://test.url/", max_streams=2, loop=asyncio.get_running_loop())
+            pool.CONNECT_INTERVAL = 0
+            await pool.subscribe(["a", "b", "c"])
+            first, second = pool.sockets
+            sent = []
+            for name, socket in (("first", first), ("second", second)):
+                socket.REQUEST_INTERVAL = 0
+                streaming(socket).side_effect = lambda request, name=name: sent.append((name, orjson.loads(request)))
+            first.message_counts.update({"a": 100, "b": 100})
+            second.message_counts["c"] = 1
+            self.assertEqual(await pool.rebalance(), 2)
+            # the new connection subscribes before the old one unsubscribes
+            self.assertEqual([(name, r["method"], r["params"]) for name, r in sent],
+                             [("first", "SUBSCRIBE", ["c"]), ("second", "UNSUBSCRIBE", ["c"]),
+                              ("second", "SUBSCRIBE", ["b"]), ("first", "UNSUBSCRIBE", ["b"])])
+            # both connections deliver b during the handover, every update reaches the queue once
+            message = '{"stream":"b","data":{"e":"depthUpdate","U":%d,"u":%d}}'
+            self.assertEqual(second._handle_message(message % (1, 1))["data"]["u"], 1)
+            self.assertIsNone(first._handle_message(message % (1, 1)))
+            self.assertEqual(first._handle_message(message % (2, 2))["data"]["u"], 2)
+            self.assertIsNone(second._handle_message(message % (2, 2)))
+            self.assertIsNone(first._handle_message(message % (1, 1)))
+            self.assertEqual(pool.duplicates, 3)
+            # streams that did not move are not checked
+            for _ in range(2):
+                self.assertEqual(first._handle_message('{"stream":"a","data":{"u":1}}')["stream"], "a")
+            self.assertEqual(pool.duplicates, 3)
+
+        asyncio.run(run())
+
+    def test_manager(self):
+        async def run():
+            manager = WebsocketManager(SimpleNamespace(testnet=False), loop=asyncio.get_running_loop())
+            manager.ws_kwargs = {"ping_interval": 10, "max_queue_size": 5}
+            pool = await manager.multiplex_socket(["a@trade", "b@trade"], "wss://test.url/", max_streams=1,
+                                                  ping_interval=20)
+            self.assertIsInstance(pool, WebsocketPool)
+            self.assertEqual(sorted(pool.streams), ["a@trade", "b@trade"])
+            self.assertEqual(len(pool.sockets), 2)
+            self.assertEqual(pool._ws_kwargs, {"ping_interval": 20, "max_queue_size": 5})
+            self.assertIs(await manager.multiplex_socket(["c@trade"], "wss://test.url/"), pool)
+            self.assertEqual(len(pool.streams), 3)
+
+        asyncio.run(run())
+
+
+if __name__ == '__main__':
+    unittest.main()